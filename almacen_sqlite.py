@@ -0,0 +1,377 @@
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from participantes import convertir_a_float, _texto
+from puntuacion import DECIMALES, FORMULAS
+
+# ========== ALMACÉN SQLITE ==========
+#
+# Alternativa al snapshot JSON + diario (ALMACEN=sqlite). Los participantes,
+# sus intentos y sus pesos válidos viven en tablas normalizadas de una base
+# SQLite en modo WAL; cada cambio es una transacción con unas pocas
+# actualizaciones de filas por clave primaria. Expone la misma interfaz que
+# persistencia.Diario, y además consultas de ranking y de tablas de
+# movimiento servidas por SQL indexado.
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor
+);
+CREATE TABLE IF NOT EXISTS participantes (
+    cat_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    orden INTEGER NOT NULL,
+    id_planilla,
+    nombre TEXT NOT NULL,
+    carrera TEXT,
+    bw REAL NOT NULL DEFAULT 0,
+    extra TEXT,
+    PRIMARY KEY (cat_id, id)
+);
+CREATE INDEX IF NOT EXISTS participantes_orden ON participantes (cat_id, orden);
+CREATE INDEX IF NOT EXISTS participantes_nombre ON participantes (cat_id, nombre);
+CREATE TABLE IF NOT EXISTS intentos (
+    cat_id TEXT NOT NULL,
+    participante_id INTEGER NOT NULL,
+    mov_id TEXT NOT NULL,
+    intento INTEGER NOT NULL,
+    peso REAL,
+    resultado TEXT,
+    PRIMARY KEY (cat_id, participante_id, mov_id, intento)
+);
+CREATE INDEX IF NOT EXISTS intentos_movimiento ON intentos (cat_id, mov_id, participante_id);
+CREATE TABLE IF NOT EXISTS validos (
+    cat_id TEXT NOT NULL,
+    participante_id INTEGER NOT NULL,
+    mov_id TEXT NOT NULL,
+    valido REAL NOT NULL,
+    PRIMARY KEY (cat_id, participante_id, mov_id)
+);
+CREATE INDEX IF NOT EXISTS validos_movimiento ON validos (cat_id, mov_id, participante_id);
+"""
+
+
+class Columnas:
+    """Qué representa cada clave del formato de backup (col_N, res_*) en una categoría"""
+
+    def __init__(self, config):
+        self.intento_de_col = {}
+        self.intento_de_res = {}
+        self.mov_de_valido = {}
+        self.movimientos = {}
+        for mov_id, mov in config["movimientos"].items():
+            self.movimientos[mov_id] = mov["intentos"]
+            for i in range(1, mov["intentos"] + 1):
+                self.intento_de_col[mov[f'intento{i}']] = (mov_id, i)
+                self.intento_de_res[f'res_{mov_id}_{i}'] = (mov_id, i)
+            self.mov_de_valido[mov["valido"]] = mov_id
+
+
+class AlmacenSQLite:
+    """Persistencia en SQLite con la interfaz de persistencia.Diario"""
+
+    def __init__(self, archivo, files_config):
+        self.archivo_snapshot = archivo
+        self.files_config = files_config
+        self.columnas = {cat_id: Columnas(config) for cat_id, config in files_config.items()}
+        self.seq = 0
+        self.pendientes = 0
+        self.siguiente_orden = {}
+        # Las escrituras van por su propia conexión, desde un hilo del pool
+        # (app.fuera_del_hub); las consultas del hub usan la otra y, con WAL,
+        # leen el último estado confirmado sin ver una transacción a medias
+        self.escritor = sqlite3.connect(archivo, isolation_level=None, check_same_thread=False)
+        self.escritor.execute("PRAGMA journal_mode=WAL")
+        # Cada cambio confirmado queda en disco, como con el diario
+        self.escritor.execute("PRAGMA synchronous=FULL")
+        self.escritor.executescript(ESQUEMA)
+        self.conexion = sqlite3.connect(archivo, isolation_level=None, check_same_thread=False)
+        self.conexion.create_function("puntaje", 3, self._puntaje, deterministic=True)
+
+    def _puntaje(self, cat_id, total, bw):
+        config = self.files_config[cat_id]
+        puntos = FORMULAS[config.get("formula", "fuerza_relativa")](np.array([total]), np.array([bw]), config)
+        return float(np.round(puntos, DECIMALES)[0])
+
+    def existe(self):
+        return self.conexion.execute("SELECT 1 FROM meta WHERE clave = 'seq'").fetchone() is not None
+
+    # --- Interfaz de Diario ---
+
+    def cargar(self):
+        """Devuelve (datos, []) con los registros de cada categoría en orden de planilla"""
+        fila = self.conexion.execute("SELECT valor FROM meta WHERE clave = 'seq'").fetchone()
+        self.seq = fila[0] if fila else 0
+
+        datos = {}
+        por_clave = {}
+        renumerar = []
+        for cat_id, id, orden, id_planilla, nombre, carrera, bw, extra in self.conexion.execute(
+                "SELECT cat_id, id, orden, id_planilla, nombre, carrera, bw, extra "
+                "FROM participantes ORDER BY cat_id, orden").fetchall():
+            d = {"ID": id, "ID_Planilla": id_planilla, "Nombre": nombre, "Carrera": carrera, "BW": bw}
+            d.update(json.loads(extra) if extra else {})
+            lista = datos.setdefault(cat_id, [])
+            if orden != len(lista):
+                renumerar.append((len(lista), cat_id, id))
+            lista.append(d)
+            por_clave[(cat_id, id)] = d
+
+        # La categoría en memoria numera el orden de planilla desde 0 al cargar;
+        # la base queda igual para que el desempate del ranking coincida
+        if renumerar:
+            with self._transaccion() as cur:
+                cur.executemany("UPDATE participantes SET orden = ? WHERE cat_id = ? AND id = ?", renumerar)
+        self.siguiente_orden = {cat_id: len(lista) for cat_id, lista in datos.items()}
+
+        for cat_id, pid, mov_id, intento, peso, resultado in self.conexion.execute(
+                "SELECT cat_id, participante_id, mov_id, intento, peso, resultado FROM intentos"):
+            d = por_clave.get((cat_id, pid))
+            config = self.files_config.get(cat_id)
+            if d is None or config is None or mov_id not in config["movimientos"]:
+                continue
+            if peso is not None:
+                d[f'col_{config["movimientos"][mov_id][f"intento{intento}"]}'] = peso
+            if resultado is not None:
+                d[f'res_{mov_id}_{intento}'] = resultado
+
+        for cat_id, pid, mov_id, valido in self.conexion.execute(
+                "SELECT cat_id, participante_id, mov_id, valido FROM validos"):
+            d = por_clave.get((cat_id, pid))
+            config = self.files_config.get(cat_id)
+            if d is None or config is None or mov_id not in config["movimientos"]:
+                continue
+            d[f'col_{config["movimientos"][mov_id]["valido"]}'] = valido
+
+        return datos, []
+
+    @property
+    def debe_compactar(self):
+        return False
+
+    def bloqueo(self):
+        return nullcontext()
+
+    def leer_nuevos(self):
+        return []
+
+    def cerrar(self):
+        self.conexion.close()
+        self.escritor.close()
+
+    def registrar(self, registro):
+        """Aplica el cambio como actualizaciones de filas en una transacción"""
+        self.seq += 1
+        registro["seq"] = self.seq
+        with self._transaccion() as cur:
+            cambios = registro["cambios"] if registro["op"] == "lote" else [registro]
+            for cambio in cambios:
+                self._aplicar(cur, cambio)
+            self._guardar_seq(cur)
+
+    def compactar(self, datos):
+        """Reescribe todas las tablas con el estado completo (carga inicial o migración)"""
+        with self._transaccion() as cur:
+            cur.execute("DELETE FROM participantes")
+            cur.execute("DELETE FROM intentos")
+            cur.execute("DELETE FROM validos")
+            for cat_id, lista in datos.items():
+                for orden, d in enumerate(lista):
+                    self._insertar(cur, cat_id, d, orden)
+            self._guardar_seq(cur)
+        self.siguiente_orden = {cat_id: len(lista) for cat_id, lista in datos.items()}
+
+    # --- Escritura ---
+
+    @contextmanager
+    def _transaccion(self):
+        cur = self.escritor.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            yield cur
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        cur.execute("COMMIT")
+
+    def _guardar_seq(self, cur):
+        cur.execute("INSERT INTO meta (clave, valor) VALUES ('seq', ?) "
+                    "ON CONFLICT(clave) DO UPDATE SET valor = excluded.valor", (self.seq,))
+
+    def _insertar(self, cur, cat_id, d, orden):
+        columnas = self.columnas[cat_id]
+        pid = d["ID"]
+        extra = {}
+        for clave, valor in d.items():
+            if clave.startswith('col_'):
+                col = int(clave[4:])
+                if col not in columnas.intento_de_col and col not in columnas.mov_de_valido:
+                    extra[clave] = convertir_a_float(valor)
+            elif clave.startswith('res_') and clave not in columnas.intento_de_res:
+                extra[clave] = valor
+            elif clave == "Version":
+                extra[clave] = int(valor)
+
+        cur.execute(
+            "INSERT INTO participantes (cat_id, id, orden, id_planilla, nombre, carrera, bw, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (cat_id, pid, orden, _texto(d.get("ID_Planilla")), str(d.get("Nombre")),
+             _texto(d.get("Carrera")), convertir_a_float(d.get("BW")),
+             json.dumps(extra, ensure_ascii=False) if extra else None)
+        )
+        self._actualizar(cur, cat_id, pid, {
+            clave: valor for clave, valor in d.items()
+            if clave.startswith(('col_', 'res_')) and clave not in extra
+        })
+
+    def _actualizar(self, cur, cat_id, pid, campos):
+        columnas = self.columnas[cat_id]
+        for clave, valor in campos.items():
+            if clave == "BW":
+                cur.execute("UPDATE participantes SET bw = ? WHERE cat_id = ? AND id = ?",
+                            (convertir_a_float(valor), cat_id, pid))
+            elif clave == "Nombre":
+                cur.execute("UPDATE participantes SET nombre = ? WHERE cat_id = ? AND id = ?",
+                            (str(valor), cat_id, pid))
+            elif clave == "Carrera":
+                cur.execute("UPDATE participantes SET carrera = ? WHERE cat_id = ? AND id = ?",
+                            (_texto(valor), cat_id, pid))
+            elif clave == "Version":
+                self._actualizar_extra(cur, cat_id, pid, clave, int(valor))
+            elif clave.startswith('col_'):
+                col = int(clave[4:])
+                if col in columnas.intento_de_col:
+                    mov_id, intento = columnas.intento_de_col[col]
+                    cur.execute(
+                        "INSERT INTO intentos (cat_id, participante_id, mov_id, intento, peso) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(cat_id, participante_id, mov_id, intento) DO UPDATE SET peso = excluded.peso",
+                        (cat_id, pid, mov_id, intento, convertir_a_float(valor))
+                    )
+                elif col in columnas.mov_de_valido:
+                    cur.execute(
+                        "INSERT INTO validos (cat_id, participante_id, mov_id, valido) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(cat_id, participante_id, mov_id) DO UPDATE SET valido = excluded.valido",
+                        (cat_id, pid, columnas.mov_de_valido[col], convertir_a_float(valor))
+                    )
+                else:
+                    self._actualizar_extra(cur, cat_id, pid, clave, convertir_a_float(valor))
+            elif clave in columnas.intento_de_res:
+                mov_id, intento = columnas.intento_de_res[clave]
+                cur.execute(
+                    "INSERT INTO intentos (cat_id, participante_id, mov_id, intento, resultado) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(cat_id, participante_id, mov_id, intento) DO UPDATE SET resultado = excluded.resultado",
+                    (cat_id, pid, mov_id, intento, valor)
+                )
+            elif clave.startswith('res_'):
+                self._actualizar_extra(cur, cat_id, pid, clave, valor)
+
+    def _actualizar_extra(self, cur, cat_id, pid, clave, valor):
+        fila = cur.execute("SELECT extra FROM participantes WHERE cat_id = ? AND id = ?", (cat_id, pid)).fetchone()
+        extra = json.loads(fila[0]) if fila and fila[0] else {}
+        extra[clave] = valor
+        cur.execute("UPDATE participantes SET extra = ? WHERE cat_id = ? AND id = ?",
+                    (json.dumps(extra, ensure_ascii=False), cat_id, pid))
+
+    def _aplicar(self, cur, cambio):
+        cat_id = cambio["cat"]
+        if cat_id not in self.columnas:
+            return
+        op = cambio["op"]
+        if op == "add":
+            orden = self.siguiente_orden.get(cat_id, 0)
+            self.siguiente_orden[cat_id] = orden + 1
+            self._insertar(cur, cat_id, cambio["participante"], orden)
+        elif op == "set":
+            self._actualizar(cur, cat_id, cambio["id"], cambio["campos"])
+        elif op == "del":
+            for tabla, columna in (("participantes", "id"), ("intentos", "participante_id"), ("validos", "participante_id")):
+                cur.execute(f"DELETE FROM {tabla} WHERE cat_id = ? AND {columna} = ?", (cat_id, cambio["id"]))
+
+    # --- Consultas ---
+
+    def ranking(self, cat_id):
+        """Filas de /ranking ordenadas por SQL: puntaje descendente y orden de planilla"""
+        filas = self.conexion.execute(
+            "SELECT p.id, p.orden, p.nombre, p.carrera, p.bw, "
+            "       COALESCE(json_extract(p.extra, '$.Version'), 1), "
+            "       puntaje(p.cat_id, COALESCE(SUM(v.valido), 0.0), p.bw) AS pts "
+            "FROM participantes p "
+            "LEFT JOIN validos v ON v.cat_id = p.cat_id AND v.participante_id = p.id "
+            "WHERE p.cat_id = ? "
+            "GROUP BY p.id "
+            "ORDER BY pts DESC, p.orden",
+            (cat_id,)
+        )
+        return [
+            {"Lugar": lugar, "ID": id, "Orden": orden, "Nombre": nombre, "Carrera": carrera,
+             "BW": bw, "Version": version, "Total_Fuerza_Relativa": pts}
+            for lugar, (id, orden, nombre, carrera, bw, version, pts) in enumerate(filas, start=1)
+        ]
+
+    def tabla_movimiento(self, cat_id, mov_id):
+        """Filas de /movimiento en orden de planilla, con intentos y mejor peso"""
+        intentos = self.columnas[cat_id].movimientos[mov_id]
+        filas = {}
+        for id, nombre, carrera, bw, valido, intento, peso, resultado in self.conexion.execute(
+                "SELECT p.id, p.nombre, p.carrera, p.bw, v.valido, i.intento, i.peso, i.resultado "
+                "FROM participantes p "
+                "LEFT JOIN validos v ON v.cat_id = p.cat_id AND v.participante_id = p.id AND v.mov_id = ? "
+                "LEFT JOIN intentos i ON i.cat_id = p.cat_id AND i.participante_id = p.id AND i.mov_id = ? "
+                "WHERE p.cat_id = ? "
+                "ORDER BY p.orden",
+                (mov_id, mov_id, cat_id)):
+            fila = filas.get(id)
+            if fila is None:
+                fila = filas[id] = {"Lugar": len(filas) + 1, "ID": id, "Nombre": nombre, "Carrera": carrera, "BW": bw}
+                for i in range(1, intentos + 1):
+                    fila[f"Intento{i}"] = 0.0
+                    fila[f"Res{i}"] = None
+                fila["Mejor"] = valido if valido is not None else 0.0
+            if intento is not None and intento <= intentos:
+                fila[f"Intento{intento}"] = peso if peso is not None else 0.0
+                fila[f"Res{intento}"] = resultado
+        return list(filas.values())
+
+
+def migrar(archivo_backup, archivo_db, files_config):
+    """Copia un competencia_backup.json (y su diario) a una base SQLite nueva"""
+    from participantes import Categoria
+    from persistencia import Diario
+
+    diario = Diario(archivo_backup)
+    snapshot, registros = diario.cargar()
+    datos = {
+        cat_id: Categoria.desde_registros(cat_id, files_config[cat_id], lista)
+        for cat_id, lista in snapshot.items() if cat_id in files_config
+    }
+    for registro in registros:
+        for cambio in registro["cambios"] if registro["op"] == "lote" else [registro]:
+            if cambio["cat"] in datos:
+                datos[cambio["cat"]].aplicar(cambio)
+
+    almacen = AlmacenSQLite(archivo_db, files_config)
+    almacen.seq = diario.seq
+    almacen.compactar({cat_id: cat.a_registros() for cat_id, cat in datos.items()})
+    return {cat_id: len(cat) for cat_id, cat in datos.items()}
+
+
+if __name__ == "__main__":
+    # Uso: python almacen_sqlite.py [competencia_backup.json] [competencia.db]
+    from configuracion import FILES_CONFIG
+
+    origen = sys.argv[1] if len(sys.argv) > 1 else 'competencia_backup.json'
+    destino = sys.argv[2] if len(sys.argv) > 2 else 'competencia.db'
+    if not os.path.exists(origen):
+        sys.exit(f"❌ No existe {origen}")
+    if os.path.exists(destino):
+        sys.exit(f"❌ {destino} ya existe; bórrala o elige otro destino")
+
+    for cat_id, n in migrar(origen, destino, FILES_CONFIG).items():
+        print(f"   ✅ {cat_id}: {n} participantes")
+    print(f"💾 Migración completa: {origen} -> {destino}")
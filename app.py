@@ -1,13 +1,33 @@
-import pandas as pd
-import json
-import math
 import os
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, abort, g, jsonify, make_response, request, send_file
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import csv
+import glob
+import hmac
 import io
+import logging
+import tempfile
+import time
 from datetime import datetime
+from functools import wraps
+from eventlet import patcher, tpool
+from configuracion import ALIAS_CARRERAS, FILES_CONFIG, PUNTOS_EQUIPOS
+from persistencia import Diario, DiarioCompartido
+from almacen_sqlite import AlmacenSQLite
+from participantes import (ORDENES, ORDENES_MOVIMIENTO, Categoria, Categorias, convertir_a_float,
+                           registros_de_planilla)
+from cache_planillas import CachePlanillas
+from planillas import leer_planilla
+from recarga import fusionar
+from notificaciones import Coalescedor, Suscripciones, sala_categoria, sala_equipos
+from competencias import Competencia, Competencias
+from historial import Historial, marcas_de_categorias
+from metricas import Metricas
+from perfilado import ORDENES_PERFIL, Perfilador
+import bitacora
+import exportacion
+import fragmentos
 
 # Configuración de Flask
 app = Flask(__name__, static_url_path='', static_folder='.')
@@ -19,444 +39,1109 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
 # Archivo donde se guardarán los datos
 BACKUP_FILE = 'competencia_backup.json'
+# Los cambios se agregan a este diario y se compactan en BACKUP_FILE cada N registros
+JOURNAL_FILE = 'competencia_backup.journal'
+COMPACTAR_CADA = int(os.environ.get('COMPACTAR_CADA', 500))
+# ALMACEN=sqlite guarda los datos en SQLITE_FILE en vez de BACKUP_FILE + diario.
+# Para pasar un backup existente: python almacen_sqlite.py competencia_backup.json competencia.db
+ALMACEN = os.environ.get('ALMACEN', 'json')
+SQLITE_FILE = os.environ.get('SQLITE_FILE', 'competencia.db')
+# CSVs ya leídos; se reutilizan mientras las planillas no cambien
+PLANILLAS_CACHE = 'competencia_planillas.cache'
+# ZIP con la exportación completa, uno por versión de los datos (seq del diario)
+EXPORTACIONES_DIR = 'exportaciones'
+# Levantadores que se avisan por Socket.IO (en plataforma, en espera, preparándose)
+EN_ESPERA = 3
+# Ventana (ms) en la que se fusionan los cambios de una misma categoría antes de emitir
+COALESCER_MS = int(os.environ.get('COALESCER_MS', 100))
+# Con WORKERS > 1 (gunicorn -w N, ver Procfile) el diario es compartido entre
+# procesos: las escrituras se serializan con un lock de archivo y cada worker
+# sigue el diario para aplicar y difundir a sus clientes los cambios de los demás.
+WORKERS = int(os.environ.get('WORKERS', 1))
+MULTIPROCESO = WORKERS > 1
+# Cada cuánto (ms) un worker revisa el diario en busca de cambios de otros workers
+SINCRONIZAR_MS = int(os.environ.get('SINCRONIZAR_MS', 50))
+# Cada cuánto (ms) se revisa si cambió alguna planilla de FILES_CONFIG (0 = no se vigilan)
+RECARGAR_PLANILLAS_MS = int(os.environ.get('RECARGAR_PLANILLAS_MS', 1000))
+# Varias competencias en el mismo servidor: la principal usa este directorio y
+# configuracion.py; cada una de las demás, COMPETENCIAS_DIR/<id>/ con su
+# configuracion.json ({"FILES_CONFIG": ..., y opcionales "PUNTOS_EQUIPOS" y
+# "ALIAS_CARRERAS"}), sus planillas y sus propios archivos de datos.
+COMPETENCIA_PRINCIPAL = os.environ.get('COMPETENCIA_PRINCIPAL', 'principal')
+COMPETENCIAS_DIR = os.environ.get('COMPETENCIAS_DIR', 'competencias')
+# Presupuesto para las competencias cargadas: al pasarse se descargan las menos usadas
+MEMORIA_COMPETENCIAS_MB = int(os.environ.get('MEMORIA_COMPETENCIAS_MB', 256))
+MAX_COMPETENCIAS = int(os.environ.get('MAX_COMPETENCIAS', 8))
+# Historial de competencias archivadas (ver historial.py para importar backups y exportaciones)
+HISTORIAL_FILE = os.environ.get('HISTORIAL_FILE', 'historial.db')
+# Logs: nivel (DEBUG, INFO, WARNING, ERROR) y formato ("texto" o "json", una línea por mensaje)
+NIVEL_LOG = os.environ.get('NIVEL_LOG', 'INFO')
+FORMATO_LOG = os.environ.get('FORMATO_LOG', 'texto')
 
-# --- CONFIGURACIÓN CON MOVIMIENTOS ---
-FILES_CONFIG = {
-    "damas_iniciantes": {
-        "file": "damas_iniciantes.csv",
-        "skiprows": 3,
-        "col_nombre": 1,
-        "movimientos": {
-            "peso_muerto": {
-                "intento1": 4, "intento2": 5, "valido": 6,
-                "nombre": "Peso Muerto", "intentos": 2
-            }
-        }
-    },
-    "damas_avanzadas": {
-        "file": "damas_avanzadas.csv",
-        "skiprows": 4,
-        "col_nombre": 1,
-        "movimientos": {
-            "sentadilla": {
-                "intento1": 4, "intento2": 5, "valido": 6,
-                "nombre": "Sentadilla", "intentos": 2
-            },
-            "peso_muerto": {
-                "intento1": 7, "intento2": 8, "valido": 9,
-                "nombre": "Peso Muerto", "intentos": 2
-            }
-        }
-    },
-    "damas_overall": {
-        "file": "damas_overall.csv",
-        "skiprows": 3,
-        "col_nombre": 1,
-        "movimientos": {
-            "sentadilla": {
-                "intento1": 4, "intento2": 5, "intento3": 6, "valido": 7,
-                "nombre": "Sentadilla", "intentos": 3
-            },
-            "press_banca": {
-                "intento1": 8, "intento2": 9, "intento3": 10, "valido": 11,
-                "nombre": "Press Banca", "intentos": 3
-            },
-            "peso_muerto": {
-                "intento1": 12, "intento2": 13, "intento3": 14, "valido": 15,
-                "nombre": "Peso Muerto", "intentos": 3
-            }
-        }
-    },
-    "varones_iniciantes": {
-        "file": "varones_iniciantes.csv",
-        "skiprows": 3,
-        "col_nombre": 1,
-        "movimientos": {
-            "peso_muerto": {
-                "intento1": 4, "intento2": 5, "valido": 6,
-                "nombre": "Peso Muerto", "intentos": 2
-            }
-        }
-    },
-    "varones_avanzados": {
-        "file": "varones_avanzados.csv",
-        "skiprows": 3,
-        "col_nombre": 1,
-        "movimientos": {
-            "press_banca": {
-                "intento1": 4, "intento2": 5, "valido": 6,
-                "nombre": "Press Banca", "intentos": 2
-            },
-            "peso_muerto": {
-                "intento1": 7, "intento2": 8, "valido": 9,
-                "nombre": "Peso Muerto", "intentos": 2
-            }
-        }
-    },
-    "varones_overall": {
-        "file": "varones_overall.csv",
-        "skiprows": 3,
-        "col_nombre": 1,
-        "movimientos": {
-            "sentadilla": {
-                "intento1": 4, "intento2": 5, "intento3": 6, "valido": 7,
-                "nombre": "Sentadilla", "intentos": 3
-            },
-            "press_banca": {
-                "intento1": 8, "intento2": 9, "intento3": 10, "valido": 11,
-                "nombre": "Press Banca", "intentos": 3
-            },
-            "peso_muerto": {
-                "intento1": 12, "intento2": 13, "intento3": 14, "valido": 15,
-                "nombre": "Peso Muerto", "intentos": 3
-            }
-        }
-    }
-}
+# Perfilado con cProfile: 1 de cada PERFILAR_CADA peticiones (0 = desactivado), o una
+# petición suelta con la cabecera "X-Perfilar: 1" (o ?perfilar=1) y el token de administración
+PERFILAR_CADA = int(os.environ.get('PERFILAR_CADA', 0))
+PERFILES_DIR = 'perfiles'
+# Token para las rutas de administración (cabecera X-Admin-Token o ?token=); sin token quedan cerradas
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+bitacora.configurar(NIVEL_LOG, FORMATO_LOG)
+log = logging.getLogger('competencia')
 
-datos_globales = {}
+# ========== MÉTRICAS ==========
+#
+# Expuestas en /metrics (formato Prometheus). Los valores de clientes,
+# participantes y cache se leen al exponer; lo demás se registra al pasar.
+
+metricas = Metricas('competencia')
+m_peticiones = metricas.histograma(
+    'http_duracion_segundos', 'Duración de las peticiones HTTP', ('metodo', 'ruta', 'estado'))
+m_backup = metricas.histograma('backup_duracion_segundos', 'Duración de guardar_backup (snapshot completo)')
+m_backup_bytes = metricas.contador('backup_bytes_total', 'Bytes escritos por guardar_backup')
+m_diario = metricas.histograma('diario_duracion_segundos', 'Duración de agregar un cambio al diario (con fsync)')
+m_notificaciones = metricas.contador(
+    'notificaciones_total', 'Mensajes de cambios por categoría, antes de fusionarlos', ('competencia', 'categoria'))
+m_emision = metricas.histograma('emision_duracion_segundos', 'Duración de cada emit de datos_actualizados')
+m_destinatarios = metricas.contador(
+    'emision_destinatarios_total', 'Clientes a los que se envió datos_actualizados', ('sala',))
+m_recargas = metricas.histograma(
+    'recarga_planilla_segundos', 'Duración de releer una planilla modificada e incorporarla', ('competencia', 'categoria'))
+m_carga = metricas.valor('carga_segundos', 'Duración de la última carga de cada competencia', ('competencia', 'origen'))
+metricas.valor('emitidos_total', 'Emits de datos_actualizados', tipo='counter',
+               leer=lambda: {(): coalescedor.emitidos})
+metricas.valor('fusionados_total', 'Mensajes fusionados con otro antes de emitir', tipo='counter',
+               leer=lambda: {(): coalescedor.fusionados})
+metricas.valor('clientes_conectados', 'Clientes Socket.IO conectados',
+               leer=lambda: {(): len(suscripciones.salas_de)})
+metricas.valor('suscriptores', 'Clientes suscritos a cada sala (categoría o equipos de una competencia)', ('sala',),
+               leer=lambda: {(sala,): n for sala, n in suscripciones.conteo.items()})
+metricas.valor('participantes', 'Participantes por categoría de las competencias cargadas',
+               ('competencia', 'categoria'),
+               leer=lambda: {(comp.id, cat_id): comp.datos.cuantos(cat_id)
+                             for comp in competencias.cargadas.values() for cat_id in comp.datos})
+metricas.valor('cache_respuestas_total', 'Consultas al cache de respuestas', ('competencia', 'ruta', 'resultado'),
+               tipo='counter',
+               leer=lambda: {(comp.id, ruta, resultado): n for comp in competencias.cargadas.values()
+                             for ruta, stats in comp.cache.estadisticas.items() for resultado, n in stats.items()})
+metricas.valor('competencias_cargadas', 'Competencias en memoria',
+               leer=lambda: {(): len(competencias.cargadas)})
+metricas.valor('competencia_memoria_bytes', 'Memoria aproximada de cada competencia cargada', ('competencia',),
+               leer=lambda: {(comp.id,): comp.memoria() for comp in competencias.cargadas.values()})
+metricas.valor('competencias_cargas_total', 'Competencias cargadas bajo demanda', tipo='counter',
+               leer=lambda: {(): competencias.cargas})
+metricas.valor('competencias_descargas_total', 'Competencias descargadas por falta de presupuesto', tipo='counter',
+               leer=lambda: {(): competencias.descargas})
 
 # ========== FUNCIONES DE PERSISTENCIA ==========
+#
+# Cada competencia tiene su propio diario (o base SQLite) en su directorio.
+
+if ALMACEN == 'sqlite' and MULTIPROCESO:
+    raise RuntimeError("El modo multiproceso (WORKERS > 1) usa el diario compartido; no es compatible con ALMACEN=sqlite")
 
-def cargar_backup():
-    """Carga datos desde el archivo de backup si existe"""
-    if os.path.exists(BACKUP_FILE):
+def crear_diario(directorio, files_config):
+    if ALMACEN == 'sqlite':
+        return AlmacenSQLite(os.path.join(directorio, SQLITE_FILE), files_config)
+    snapshot = os.path.join(directorio, BACKUP_FILE)
+    diario = os.path.join(directorio, JOURNAL_FILE)
+    if MULTIPROCESO:
+        return DiarioCompartido(snapshot, diario, compactar_cada=COMPACTAR_CADA)
+    return Diario(snapshot, diario, compactar_cada=COMPACTAR_CADA)
+
+def desplegar(registro):
+    """Cambios individuales de un registro del diario (un lote trae varios)"""
+    return registro["cambios"] if registro["op"] == "lote" else [registro]
+
+def cargar_backup(comp):
+    """Carga el snapshot de backup y reaplica los cambios del diario"""
+    diario = comp.diario
+    if diario.existe():
         try:
-            with open(BACKUP_FILE, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
-                print(f"✅ Backup cargado desde {BACKUP_FILE}")
-                return datos
+            snapshot, registros = diario.cargar()
+            datos = Categorias()
+            for cat_id in snapshot:
+                if cat_id not in comp.config:
+                    log.warning(f"⚠️ Categoría '{cat_id}' del backup no está en FILES_CONFIG, se ignora")
+            for cat_id, config in comp.config.items():
+                if cat_id in snapshot:
+                    datos.pendiente(cat_id, config, snapshot[cat_id])
+            # Los cambios de una categoría sin construir se reaplican cuando se use
+            for registro in registros:
+                for cambio in desplegar(registro):
+                    if cambio["cat"] in datos:
+                        datos.aplicar(cambio["cat"], cambio)
+            log.info(f"✅ Backup cargado desde {diario.archivo_snapshot} (seq {diario.seq}, {len(registros)} cambios reaplicados)")
+            return datos
         except Exception as e:
-            print(f"⚠️ Error al cargar backup: {e}")
+            log.exception(f"⚠️ Error al cargar backup: {e}")
             return {}
     return {}
 
-def guardar_backup():
-    """Guarda los datos actuales en el archivo de backup"""
+def fuera_del_hub(f, *args):
+    """Ejecuta una escritura a disco en un hilo del pool de eventlet.
+
+    Con el worker eventlet de gunicorn (threading parcheado) el greenlet que
+    escribe espera el fsync sin bloquear el hub: las demás peticiones y los
+    emits siguen mientras tanto, y las escrituras siguen en fila detrás del
+    bloqueo de la competencia, que también es verde. Sin parchear (servidor
+    de desarrollo, scripts) ese bloqueo es de hilos y no ordenaría a dos
+    greenlets, así que la escritura se hace en el momento.
+    """
+    if patcher.is_monkey_patched('thread'):
+        return tpool.execute(f, *args)
+    return f(*args)
+
+def guardar_backup(comp):
+    """Guarda un snapshot completo de los datos actuales y vacía el diario"""
     try:
-        with open(BACKUP_FILE, 'w', encoding='utf-8') as f:
-            json.dump(datos_globales, f, ensure_ascii=False, indent=2)
-        print("💾 Backup guardado correctamente")
+        with m_backup.cronometrar():
+            # Los registros se copian aquí; el hilo solo serializa y escribe
+            fuera_del_hub(comp.diario.compactar, comp.datos.a_registros())
+        m_backup_bytes.incrementar(cantidad=os.path.getsize(comp.diario.archivo_snapshot))
+        log.info(f"💾 Backup de '{comp.id}' guardado correctamente")
     except Exception as e:
-        print(f"❌ Error al guardar backup: {e}")
+        log.error(f"❌ Error al guardar backup de '{comp.id}': {e}")
 
-def notificar_cambios(cat_id):
-    """Notifica a todos los clientes conectados que hubo un cambio"""
-    socketio.emit('datos_actualizados', {'categoria': cat_id}, broadcast=True)
+def guardar_cambio(comp, cat_id, registro):
+    """Agrega un cambio al diario (costo constante, independiente del tamaño de la competencia).
 
-# ========== FUNCIONES AUXILIARES ==========
-
-def convertir_a_float(valor):
-    if valor is None or valor == '':
-        return 0.0
+    Vuelve cuando el cambio ya está en disco; devuelve False si no se pudo guardar.
+    """
+    if cat_id is not None:
+        registro["cat"] = cat_id
     try:
-        resultado = float(str(valor).strip() or 0)
-        if math.isnan(resultado):
-            return 0.0
-        return resultado
-    except (ValueError, TypeError):
-        return 0.0
+        with m_diario.cronometrar():
+            fuera_del_hub(comp.diario.registrar, registro)
+    except Exception as e:
+        log.error(f"❌ Error al guardar cambio: {e}")
+        return False
+    if comp.diario.debe_compactar:
+        guardar_backup(comp)
+    return True
+
+def registro_inverso(cat, registro):
+    """Registro "set" que deshace `registro` en memoria; se calcula antes de aplicarlo"""
+    p = cat.por_id[registro["id"]]
+    return {"op": "set", "id": p.id, "campos": p.valores(list(registro["campos"]) + ["Version"])}
+
+def aplicar_cambio(comp, cat_id, registro):
+    """Registra un cambio en el diario y recién entonces lo aplica sobre la categoría y difunde el delta.
+
+    Mientras el greenlet espera el fsync las lecturas siguen viendo el estado
+    anterior, que es el que queda si no se pudo guardar. La versión de la
+    categoría es el número de secuencia del diario, así que sigue creciendo
+    entre reinicios.
+    """
+    cat = comp.datos[cat_id]
+    cat.preparar([registro])
+    if not guardar_cambio(comp, cat_id, registro):
+        raise ErrorOperacion("No se pudo guardar el cambio", 503)
+    c, cambio = cat.aplicar_con_delta(registro)
+    comp.cache.invalidar(cat_id)
+    notificar_cambios(comp, cat_id, cat.versionar([cambio], comp.diario.seq))
+    comprobar_records(comp, cat, registro)
+    return c
+
+def medir_emision(sala, segundos):
+    m_emision.observar(segundos)
+    m_destinatarios.incrementar(sala, cantidad=suscripciones.conteo.get(sala, 0))
+
+coalescedor = Coalescedor(socketio, ventana=COALESCER_MS / 1000, al_emitir=medir_emision)
+suscripciones = Suscripciones()
+
+def notificar_cambios(comp, cat_id, mensaje):
+    """Notifica el delta versionado a los clientes suscritos a la categoría"""
+    m_notificaciones.incrementar(comp.id, cat_id)
+    coalescedor.notificar(sala_categoria(comp.id, cat_id), mensaje)
+    notificar_orden(comp, comp.datos[cat_id])
+    notificar_equipos(comp, comp.datos[cat_id])
+
+def proximos(cat):
+    """Próximos EN_ESPERA levantadores de cada movimiento de la categoría"""
+    return {mov_id: cat.orden_levantamiento(mov_id, EN_ESPERA) for mov_id in cat.movimientos}
+
+def notificar_orden(comp, cat):
+    """Avisa a la sala de la categoría cuando cambian los próximos levantadores de un movimiento.
+
+    No pasa por el coalescedor: la plataforma tiene que enterarse en el momento.
+    """
+    for mov_id, orden in proximos(cat).items():
+        if comp.ultimo_orden.get((cat.id, mov_id)) == orden["siguientes"]:
+            continue
+        comp.ultimo_orden[(cat.id, mov_id)] = orden["siguientes"]
+        socketio.emit('orden_levantamiento', orden, to=sala_categoria(comp.id, cat.id))
+
+# ========== CLASIFICACIÓN POR EQUIPOS ==========
+#
+# Se arma la primera vez que alguien pide /equipos (sumar todas las
+# categorías obliga a construirlas); desde entonces cada cambio actualiza
+# solo el aporte de su categoría.
+
+def tabla_equipos(comp):
+    if not comp.equipos.iniciada:
+        comp.equipos.iniciar(comp.datos[cat_id] for cat_id in comp.datos)
+    return comp.equipos
+
+def notificar_equipos(comp, cat):
+    """Avisa a la sala de equipos cuando un cambio en la categoría mueve la clasificación"""
+    if comp.equipos.iniciada and comp.equipos.actualizar(cat):
+        socketio.emit('equipos_actualizados', comp.equipos.resumen(), to=sala_equipos(comp.id))
+
+# ========== RÉCORDS ==========
+#
+# Solo los cambios que tocan un peso válido (un éxito que lo sube o un
+# intento borrado que lo baja) se comparan con los récords del historial.
+
+historial = Historial(HISTORIAL_FILE)
+
+def comprobar_records(comp, cat, registro):
+    if registro["op"] != "set":
+        return
+    claves_valido = {mov.clave_valido for mov in cat.movimientos.values()}
+    if claves_valido.isdisjoint(registro["campos"]):
+        return
+    p = cat.por_id.get(registro["id"])
+    if p is None:
+        return
+    for record in historial.comprobar(comp.id, cat, p):
+        log.info(f"🏆 Récord de {record['movimiento']} ({record['sexo'] or 'sin sexo'}): "
+                 f"{record['atleta']} {record['peso']} kg en {comp.id}/{cat.id}")
+        socketio.emit('record_batido', record, to=sala_categoria(comp.id, cat.id))
+
+# ========== SINCRONIZACIÓN ENTRE WORKERS ==========
+
+def sincronizar(comp):
+    """Aplica los cambios que otros workers escribieron en el diario y los difunde
+    a los clientes de este proceso. Con un solo proceso no hay nada que leer."""
+    with comp.bloqueo:
+        for registro in comp.diario.leer_nuevos():
+            if registro["op"] == "snapshot":
+                recargar_snapshot(comp, registro)
+                continue
+            
+            por_categoria = {}
+            for cambio in desplegar(registro):
+                cat = comp.datos.get(cambio.get("cat"))
+                if cat is None:
+                    continue
+                _, delta = cat.aplicar_con_delta(cambio)
+                if delta is not None:
+                    por_categoria.setdefault(cat.id, (cat, []))[1].append(delta)
+                    comprobar_records(comp, cat, cambio)
+            
+            for cat_id, (cat, cambios) in por_categoria.items():
+                comp.cache.invalidar(cat_id)
+                notificar_cambios(comp, cat_id, cat.versionar(cambios, registro["seq"]))
+
+def recargar_snapshot(comp, registro):
+    """Reconstruye las categorías que cambiaron en cambios que solo quedaron en el snapshot"""
+    datos = comp.datos
+    for cat_id, lista in registro["datos"].items():
+        if cat_id not in datos:
+            continue
+        if not datos.cargada(cat_id):
+            # Nadie la ha usado todavía en este proceso: basta con cambiar lo pendiente
+            datos.pendiente(cat_id, comp.config[cat_id], lista, registro["seq"])
+            continue
+        if datos[cat_id].a_registros() == list(lista):
+            continue
+        
+        cat = Categoria.desde_registros(cat_id, comp.config[cat_id], lista)
+        cat.version = registro["seq"]
+        datos[cat_id] = cat
+        comp.cache.invalidar(cat_id)
+        # Sin "anterior" el cliente no puede aplicar deltas y pide el estado completo
+        notificar_cambios(comp, cat_id, {"categoria": cat_id, "version": cat.version, "anterior": None, "cambios": []})
+        log.info(f"🔄 {comp.id}/{cat_id} recargada desde el snapshot (seq {registro['seq']})")
+
+def escritura(f):
+    """Ruta que modifica datos: exclusiva entre workers y validada contra el último estado"""
+    @wraps(f)
+    def envoltura(*args, **kwargs):
+        comp = competencia()
+        with comp.bloqueo, comp.diario.bloqueo():
+            sincronizar(comp)
+            return f(*args, **kwargs)
+    return envoltura
+
+def seguir_diario():
+    """Tarea de fondo: trae los cambios de otros workers aunque no lleguen peticiones"""
+    while True:
+        socketio.sleep(SINCRONIZAR_MS / 1000)
+        for comp in list(competencias.cargadas.values()):
+            comp.en_uso += 1
+            try:
+                sincronizar(comp)
+            except Exception as e:
+                log.exception(f"❌ Error al sincronizar '{comp.id}' con el diario: {e}")
+            finally:
+                comp.en_uso -= 1
+
+# ========== CACHE DE RESPUESTAS ==========
+
+def responder_cacheado(ruta, cat_id, clave, version, generar, mimetype='application/json', headers=None):
+    """Sirve bytes cacheados por versión de categoría, con ETag/304 y gzip precomprimido"""
+    cache = competencia().cache
+    entrada = cache.obtener(ruta, cat_id, clave, version, generar, mimetype)
+    
+    usar_gzip = entrada.cuerpo_gzip is not None and request.accept_encodings['gzip'] > 0
+    etag = entrada.etag + '-gz' if usar_gzip else entrada.etag
+    
+    if request.if_none_match.contains(etag):
+        cache.contar_no_modificado(ruta)
+        respuesta = Response(status=304)
+    else:
+        respuesta = Response(entrada.cuerpo_gzip if usar_gzip else entrada.cuerpo, mimetype=entrada.mimetype)
+        if usar_gzip:
+            respuesta.headers['Content-Encoding'] = 'gzip'
+        for nombre, valor in (headers or {}).items():
+            respuesta.headers[nombre] = valor
+    
+    respuesta.set_etag(etag)
+    respuesta.headers['Vary'] = 'Accept-Encoding'
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+def json_bytes(datos):
+    return app.json.response(datos).get_data()
+
+# ========== FUNCIONES AUXILIARES ==========
 
 def cargar_csv(archivo, skiprows, col_nombre):
     try:
-        df = pd.read_csv(
-            archivo, skiprows=skiprows, header=None,
-            delimiter=';', encoding='windows-1252'
-        )
-        
-        if col_nombre >= len(df.columns):
-            return []
-        
-        df_limpio = pd.DataFrame({
-            'ID_Planilla': df.iloc[:, 0],
-            'Nombre': df.iloc[:, col_nombre],
-            'Carrera': df.iloc[:, col_nombre+1] if col_nombre+1 < len(df.columns) else None,
-            'BW': df.iloc[:, col_nombre+2] if col_nombre+2 < len(df.columns) else None
-        })
-        
-        for col in range(len(df.columns)):
-            if col >= col_nombre + 3:
-                df_limpio[f'col_{col}'] = df.iloc[:, col]
-        
-        df_limpio = df_limpio.dropna(subset=['Nombre'])
-        df_limpio['Nombre'] = df_limpio['Nombre'].astype(str)
-        df_limpio = df_limpio[df_limpio['Nombre'].str.strip() != '']
-        df_limpio = df_limpio[df_limpio['Nombre'].str.strip() != 'nan']
-        df_limpio = df_limpio[df_limpio['Nombre'].str.upper() != 'NOMBRE / APELLIDOS']
-        df_limpio = df_limpio.where(pd.notnull(df_limpio), None)
-        
-        return df_limpio.to_dict('records')
-        
+        return list(leer_planilla(archivo, skiprows, col_nombre))
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        log.error(f"❌ Error al leer {archivo}: {e}")
         return []
 
 def calcular_fuerza_relativa_total(cat_id, participante):
-    if cat_id not in FILES_CONFIG:
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
         return 0.0
     
-    config = FILES_CONFIG[cat_id]
-    bw = convertir_a_float(participante.get("BW"))
-    
-    if bw <= 0:
-        return 0.0
-    
-    suma_pesos = 0.0
+    return cat.fuerza_relativa(participante)
+
+def leer_intento(data, mov):
+    """Número de intento de la petición, o None si no existe en el movimiento"""
+    try:
+        intento = int(data.get("intento"))
+    except (TypeError, ValueError):
+        return None
+    return intento if 1 <= intento <= mov.intentos else None
+
+def leer_consulta(ordenes, por_defecto):
+    """Parámetros de paginación y filtro (?offset, limit, carrera, q, orden), o None si no viene ninguno"""
+    args = request.args
+    if not any(clave in args for clave in ("offset", "limit", "carrera", "q", "orden")):
+        return None
     
-    for mov_id, mov_config in config["movimientos"].items():
-        peso_valido = convertir_a_float(participante.get(f'col_{mov_config["valido"]}'))
-        suma_pesos += peso_valido
+    orden = args.get("orden", por_defecto)
+    if orden.lstrip('-') not in ordenes:
+        raise ErrorOperacion(f"Orden inválido; opciones: {', '.join(ordenes)} (con '-' para invertir)")
     
-    fuerza_relativa = round(suma_pesos / bw, 4)
+    offset = args.get("offset", 0, type=int)
+    limit = args.get("limit", type=int)
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ErrorOperacion("offset y limit deben ser positivos")
     
-    return fuerza_relativa
+    return {"orden": orden, "carrera": args.get("carrera"), "q": args.get("q"), "offset": offset, "limit": limit}
+
+def pagina(consulta, total, filas, version):
+    """Página de /ranking o /movimiento; la versión dice a qué estado de la categoría corresponde"""
+    return {"version": version, "total": total, "offset": consulta["offset"], "limit": consulta["limit"], "datos": filas}
+
+def buscar_participante(cat, data):
+    """Busca por 'id' si la petición lo trae; si no, por 'nombre'"""
+    return cat.buscar(data.get("id"), data.get("nombre"))
 
 # ========== CARGAR ARCHIVOS ==========
-print("\n" + "="*60)
-print("🔄 INICIANDO CARGA DE DATOS...")
-print("="*60)
-
-backup_data = cargar_backup()
-
-if backup_data:
-    datos_globales = backup_data
-    print("\n📦 Datos cargados desde backup")
-    for cat_id in datos_globales:
-        print(f"   ✅ {cat_id}: {len(datos_globales[cat_id])} participantes")
-else:
-    print("\n📂 No se encontró backup, cargando desde CSVs...")
-    
-    for cat_id, config in FILES_CONFIG.items():
-        archivo = config["file"]
-        skiprows = config["skiprows"]
-        col_nombre = config["col_nombre"]
-        
-        print(f"\n📄 {archivo} (skiprows={skiprows})")
-        
-        movimientos = list(config["movimientos"].keys())
-        print(f"   Movimientos: {', '.join([config['movimientos'][m]['nombre'] for m in movimientos])}")
-        
-        datos = cargar_csv(archivo, skiprows, col_nombre)
-        datos_globales[cat_id] = datos
+
+def cargar_competencia(comp):
+    """Carga los datos de la competencia desde su backup o, si no hay, desde sus CSVs"""
+    inicio_carga = time.perf_counter()
+    
+    # Con varios workers, solo uno a la vez lee el backup o crea el inicial
+    with comp.diario.bloqueo():
+        backup_data = cargar_backup(comp)
         
-        if len(datos) > 0:
-            print(f"   ✅ {len(datos)} registros | Primero: {datos[0]['Nombre']}")
+        if backup_data:
+            comp.datos = backup_data
+            origen_carga = 'backup'
+            log.info(f"📦 Datos de '{comp.id}' cargados desde backup")
+            for cat_id in comp.datos:
+                log.info(f"✅ {cat_id}: {comp.datos.cuantos(cat_id)} participantes")
+            if comp.diario.debe_compactar:
+                guardar_backup(comp)
         else:
-            print(f"   ⚠️ 0 registros")
+            origen_carga = 'csv'
+            log.info(f"📂 '{comp.id}' no tiene backup, cargando desde CSVs...")
+            cache_planillas = CachePlanillas(comp.ruta(PLANILLAS_CACHE))
+            
+            for cat_id, config in comp.config.items():
+                archivo = comp.ruta(config["file"])
+                skiprows = config["skiprows"]
+                col_nombre = config["col_nombre"]
+                
+                movimientos = list(config["movimientos"].keys())
+                log.debug(f"📄 {archivo} (skiprows={skiprows}) | Movimientos: "
+                          f"{', '.join([config['movimientos'][m]['nombre'] for m in movimientos])}")
+                
+                datos = cache_planillas.obtener(archivo, (skiprows, col_nombre),
+                                                lambda: cargar_csv(archivo, skiprows, col_nombre))
+                # Como las del backup, se construye cuando alguien la use
+                comp.datos.pendiente(cat_id, config, registros_de_planilla(datos))
+                
+                if len(datos) > 0:
+                    log.info(f"✅ {archivo}: {len(datos)} registros | Primero: {datos[0]['Nombre']}")
+                else:
+                    log.warning(f"⚠️ {archivo}: 0 registros")
+            
+            cache_planillas.guardar()
+            guardar_backup(comp)
+            log.info("💾 Backup inicial creado")
     
-    guardar_backup()
-    print("\n💾 Backup inicial creado")
+    comp.datos.fijar_version(comp.diario.seq)
+    m_carga.fijar(time.perf_counter() - inicio_carga, comp.id, origen_carga)
+    log.info(f"📊 '{comp.id}': {len(comp.datos)} categorías | carga desde {origen_carga} en "
+             f"{time.perf_counter() - inicio_carga:.3f} s")
 
-print("\n" + "="*60)
-print(f"📊 Total categorías: {len(datos_globales)}")
-print("="*60 + "\n")
+def abrir_competencia(id, directorio, config):
+    """Crea una competencia de COMPETENCIAS_DIR a partir de su configuracion.json y carga sus datos"""
+    files_config = config["FILES_CONFIG"]
+    comp = Competencia(id, directorio, files_config, crear_diario(directorio, files_config),
+                       config.get("PUNTOS_EQUIPOS", PUNTOS_EQUIPOS), config.get("ALIAS_CARRERAS", ALIAS_CARRERAS))
+    try:
+        cargar_competencia(comp)
+    except Exception:
+        comp.cerrar()
+        raise
+    return comp
+
+log.info("🔄 Iniciando carga de datos...")
+
+competencias = Competencias(COMPETENCIAS_DIR, abrir_competencia,
+                            MEMORIA_COMPETENCIAS_MB * 2**20, MAX_COMPETENCIAS)
+
+# La principal se carga al arrancar y no se descarga nunca
+principal = Competencia(COMPETENCIA_PRINCIPAL, '.', FILES_CONFIG, crear_diario('.', FILES_CONFIG),
+                        PUNTOS_EQUIPOS, ALIAS_CARRERAS)
+cargar_competencia(principal)
+competencias.fijar(principal)
+# Las carreras del historial se agrupan con los alias de la principal
+historial.equipo = principal.equipos.equipo
+
+if MULTIPROCESO:
+    socketio.start_background_task(seguir_diario)
+    log.info(f"🔀 Modo multiproceso: diario compartido, sincronización cada {SINCRONIZAR_MS} ms")
+
+# ========== COMPETENCIA DE CADA PETICIÓN ==========
+#
+# Cada ruta de una competencia se registra dos veces: sin prefijo para la
+# principal (las URLs de siempre) y con /c/<competencia> para las demás.
+
+RUTAS_DE_COMPETENCIA = set()
+
+def ruta(regla, **opciones):
+    """Como app.route, para una ruta que pertenece a una competencia"""
+    def registrar(f):
+        app.add_url_rule(regla, view_func=f, **opciones)
+        app.add_url_rule('/c/<competencia>' + regla, view_func=f, **opciones)
+        RUTAS_DE_COMPETENCIA.add(f.__name__)
+        return f
+    return registrar
+
+@app.url_value_preprocessor
+def elegir_competencia(endpoint, values):
+    if endpoint not in RUTAS_DE_COMPETENCIA:
+        return
+    comp = competencias.obtener(values.pop('competencia', COMPETENCIA_PRINCIPAL))
+    if comp is None:
+        abort(make_response(jsonify({"error": "Competencia no encontrada"}), 404))
+    comp.en_uso += 1
+    g.competencia = comp
+
+@app.teardown_request
+def soltar_competencia(error):
+    comp = g.pop('competencia', None)
+    if comp is not None:
+        comp.en_uso -= 1
+
+def competencia():
+    """Competencia de la petición en curso"""
+    return g.competencia
+
+# ========== OPERACIONES DE ESCRITURA ==========
+#
+# Cada operación valida una petición contra el estado actual y devuelve
+# (cat_id, registro) sin aplicarlo. Las rutas individuales y /lote comparten
+# estas funciones.
+
+class ErrorOperacion(Exception):
+    # En un lote, posición de la operación que falló (None: falló el lote entero)
+    indice = None
+
+    def __init__(self, mensaje, status=400, datos=None):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+        self.datos = datos or {}
+
+    def respuesta(self):
+        return jsonify(dict(self.datos, error=self.mensaje)), self.status
+
+@app.errorhandler(ErrorOperacion)
+def responder_error_operacion(e):
+    return e.respuesta()
+
+def comprobar_version(c, data):
+    """Con expected_version, rechaza la operación si el participante cambió desde que el cliente lo leyó"""
+    esperada = data.get("expected_version")
+    if esperada is None:
+        return
+    try:
+        esperada = int(esperada)
+    except (TypeError, ValueError):
+        raise ErrorOperacion("expected_version inválida")
+    if esperada != c.version:
+        raise ErrorOperacion("El participante fue modificado por otra petición", 409,
+                             {"id": c.id, "version": c.version})
+
+def _categoria_y_movimiento(comp, data):
+    cat = comp.datos.get(data.get("cat_id"))
+    if not cat:
+        raise ErrorOperacion("Categoría inválida")
+    
+    mov = cat.movimientos.get(data.get("mov_id"))
+    if mov is None:
+        raise ErrorOperacion("Movimiento inválido")
+    
+    intento = leer_intento(data, mov)
+    if intento is None:
+        raise ErrorOperacion("Intento inválido")
+    
+    c = buscar_participante(cat, data)
+    if c is None:
+        raise ErrorOperacion("No encontrado", 404)
+    comprobar_version(c, data)
+    
+    return cat, mov, intento, c
+
+def op_registrar_intento(comp, data):
+    cat, mov, intento, c = _categoria_y_movimiento(comp, data)
+    resultado = data.get("resultado")
+    
+    campos = {mov.claves_res[intento - 1]: resultado}
+    
+    if resultado == "exito":
+        peso_intento = mov.peso(c, intento)
+        
+        if peso_intento > mov.valido(c):
+            campos[mov.clave_valido] = peso_intento
+    
+    return cat.id, {"op": "set", "id": c.id, "campos": campos}
+
+def op_actualizar_peso(comp, data):
+    cat, mov, intento, c = _categoria_y_movimiento(comp, data)
+    peso = convertir_a_float(data.get("peso"))
+    
+    return cat.id, {"op": "set", "id": c.id, "campos": {mov.claves_intento[intento - 1]: peso}}
+
+def op_borrar_intento(comp, data):
+    cat, mov, intento, c = _categoria_y_movimiento(comp, data)
+    
+    mejor = mov.mejor_exitoso(c, sin_intento=intento)
+    
+    return cat.id, {"op": "set", "id": c.id, "campos": {
+        mov.claves_res[intento - 1]: None,
+        mov.clave_valido: mejor
+    }}
+
+def op_editar_bw(comp, data):
+    cat = comp.datos.get(data.get("cat_id"))
+    if not cat:
+        raise ErrorOperacion("Categoría inválida")
+    
+    c = buscar_participante(cat, data)
+    if c is None:
+        raise ErrorOperacion("No encontrado", 404)
+    comprobar_version(c, data)
+    
+    return cat.id, {"op": "set", "id": c.id, "campos": {"BW": convertir_a_float(data.get("bw"))}}
+
+def op_editar_intento1(comp, data):
+    cat_id = data.get('cat_id')
+    mov_id = data.get('mov_id')
+    
+    try:
+        nuevo_peso = float(data.get('nuevo_peso'))
+    except (TypeError, ValueError):
+        raise ErrorOperacion("Peso inválido")
+    
+    if cat_id not in comp.datos:
+        raise ErrorOperacion("Categoría no válida")
+    
+    cat = comp.datos[cat_id]
+    
+    if mov_id not in cat.movimientos:
+        raise ErrorOperacion(f"Movimiento '{mov_id}' no válido")
+    
+    participante = buscar_participante(cat, data)
+    if participante is None:
+        raise ErrorOperacion(f"Participante '{data.get('nombre')}' no encontrado", 404)
+    comprobar_version(participante, data)
+    
+    return cat_id, {"op": "set", "id": participante.id, "campos": {cat.movimientos[mov_id].claves_intento[0]: nuevo_peso}}
+
+OPERACIONES = {
+    "registrar_intento": op_registrar_intento,
+    "actualizar_peso": op_actualizar_peso,
+    "borrar_intento": op_borrar_intento,
+    "editar_bw": op_editar_bw,
+    "editar_intento1": op_editar_intento1,
+}
+
+def aplicar_lote(comp, operaciones):
+    """Valida y aplica una lista de operaciones: todas o ninguna.
+
+    Cada operación se valida contra el estado que dejaron las anteriores,
+    así que se van aplicando en memoria y al final se deshacen todas: la
+    validación no cede el hub, nadie llega a ver ese estado intermedio. Si
+    alguna falla se lanza ErrorOperacion con el índice de la que falló; si
+    no, el lote pasa por confirmar_lote como un solo registro del diario.
+    """
+    aplicados = []
+    
+    try:
+        for indice, op in enumerate(operaciones):
+            if not isinstance(op, dict):
+                raise ErrorOperacion("Operación inválida")
+            funcion = OPERACIONES.get(op.get("tipo"))
+            if funcion is None:
+                raise ErrorOperacion(f"Tipo de operación desconocido: {op.get('tipo')}")
+            
+            cat_id, registro = funcion(comp, op)
+            registro["cat"] = cat_id
+            cat = comp.datos[cat_id]
+            deshacer = registro_inverso(cat, registro)
+            # Deja en el registro la Version que después se vuelve a aplicar
+            cat.aplicar(registro)
+            aplicados.append((cat, registro, deshacer))
+    except ErrorOperacion as e:
+        e.indice = indice
+        raise
+    finally:
+        for cat, _, deshacer in reversed(aplicados):
+            cat.aplicar(deshacer)
+    
+    return confirmar_lote(comp, [(cat, registro) for cat, registro, _ in aplicados])
+
+def confirmar_lote(comp, cambios):
+    """Registra los cambios en el diario como un lote y recién entonces los aplica y difunde.
+
+    `cambios` son pares (categoría, registro) sin aplicar y completos (ver
+    Categoria.preparar). Se difunde un mensaje por categoría afectada. Si no
+    se pueden guardar se lanza ErrorOperacion y la memoria queda como estaba.
+    """
+    if not cambios:
+        return []
+    
+    if not guardar_cambio(comp, None, {"op": "lote", "cambios": [registro for _, registro in cambios]}):
+        raise ErrorOperacion("No se pudo guardar el cambio", 503)
+    
+    por_categoria = {}
+    for cat, registro in cambios:
+        _, cambio = cat.aplicar_con_delta(registro)
+        por_categoria.setdefault(cat.id, (cat, []))[1].append(cambio)
+    
+    for cat_id, (cat, deltas) in por_categoria.items():
+        comp.cache.invalidar(cat_id)
+        notificar_cambios(comp, cat_id, cat.versionar(deltas, comp.diario.seq))
+    
+    for cat, registro in cambios:
+        comprobar_records(comp, cat, registro)
+    
+    return [registro for _, registro in cambios]
+
+# ========== RECARGA DE PLANILLAS ==========
+#
+# Una tarea de fondo revisa el tamaño y la fecha de las planillas de las
+# competencias cargadas. Cuando una cambia se relee solo esa planilla y lo
+# nuevo (atletas, BW, carreras e intentos declarados) entra como un lote
+# más: queda en el diario y se difunde como cualquier otro cambio, sin
+# tocar los resultados ya registrados. Con varios workers cada uno la
+# detecta, pero el primero deja el estado al día y los demás no encuentran
+# diferencias.
+
+def firma_planilla(archivo):
+    try:
+        estado = os.stat(archivo)
+    except OSError:
+        return None
+    return (estado.st_size, estado.st_mtime_ns)
+
+def recargar_planilla(comp, cat_id):
+    """Relee la planilla de la categoría e incorpora sus cambios; devuelve los registros aplicados"""
+    config = comp.config[cat_id]
+    archivo = comp.ruta(config["file"])
+    parametros = (config["skiprows"], config["col_nombre"])
+    inicio = time.perf_counter()
+    
+    cache_planillas = CachePlanillas(comp.ruta(PLANILLAS_CACHE))
+    try:
+        # La clave se toma antes de leer: si el archivo cambia mientras tanto,
+        # queda guardado con la firma vieja y la próxima revisión lo relee
+        clave = cache_planillas.clave(archivo, parametros)
+        registros = list(leer_planilla(archivo, *parametros))
+    except Exception as e:
+        # Puede estar a medio guardar: se reintenta en la próxima revisión
+        log.warning(f"⚠️ No se pudo releer {archivo}: {e}")
+        return None
+    
+    anteriores = cache_planillas.anteriores(archivo)
+    
+    with comp.bloqueo, comp.diario.bloqueo():
+        sincronizar(comp)
+        cat = comp.datos[cat_id]
+        aplicados = cat.preparar(fusionar(cat, registros, anteriores))
+        for registro in aplicados:
+            registro["cat"] = cat_id
+        confirmar_lote(comp, [(cat, registro) for registro in aplicados])
+    
+    # La lectura de ahora es la base para comparar la próxima vez
+    cache_planillas.registrar(archivo, clave, registros)
+    cache_planillas.guardar()
+    comp.planillas[cat_id] = clave[:2]
+    
+    segundos = time.perf_counter() - inicio
+    m_recargas.observar(segundos, comp.id, cat_id)
+    nuevos = sum(1 for registro in aplicados if registro["op"] == "add")
+    log.info(f"🔄 Planilla {comp.id}/{cat_id} recargada: {nuevos} nuevos, "
+             f"{len(aplicados) - nuevos} actualizados en {segundos * 1000:.1f} ms")
+    return aplicados
+
+def revisar_planillas(comp):
+    cache_planillas = None
+    for cat_id, config in comp.config.items():
+        archivo = comp.ruta(config["file"])
+        firma = firma_planilla(archivo)
+        if cat_id not in comp.planillas:
+            # Se compara con la última lectura guardada: lo editado con el servidor apagado también entra
+            cache_planillas = cache_planillas or CachePlanillas(comp.ruta(PLANILLAS_CACHE))
+            comp.planillas[cat_id] = cache_planillas.firma(archivo) or firma
+        if firma is None or firma == comp.planillas[cat_id]:
+            continue
+        try:
+            recargar_planilla(comp, cat_id)
+        except ErrorOperacion as e:
+            log.error(f"❌ No se pudo incorporar la planilla {comp.id}/{cat_id}: {e.mensaje}")
+
+def vigilar_planillas():
+    """Tarea de fondo: recarga las planillas que cambiaron en disco desde la última revisión"""
+    while True:
+        for comp in list(competencias.cargadas.values()):
+            comp.en_uso += 1
+            try:
+                revisar_planillas(comp)
+            except Exception as e:
+                log.exception(f"❌ Error al revisar las planillas de '{comp.id}': {e}")
+            finally:
+                comp.en_uso -= 1
+        socketio.sleep(RECARGAR_PLANILLAS_MS / 1000)
+
+if RECARGAR_PLANILLAS_MS > 0:
+    socketio.start_background_task(vigilar_planillas)
 
 # --- RUTAS HTTP ---
 
-@app.route("/")
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+@app.after_request
+def registrar_duracion(respuesta):
+    inicio = g.get('inicio_peticion')
+    if inicio is not None:
+        # La regla de la ruta (no la URL) para no crear una serie por categoría o archivo
+        ruta = request.url_rule.rule if request.url_rule is not None else 'sin_ruta'
+        m_peticiones.observar(time.perf_counter() - inicio, request.method, ruta, str(respuesta.status_code))
+    return respuesta
+
+# Perfilado: el gancho cuesta un contador mientras la petición no se perfila
+
+perfilador = Perfilador(PERFILES_DIR, cada=PERFILAR_CADA)
+
+def es_admin():
+    token = request.headers.get('X-Admin-Token') or request.args.get('token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+@app.before_request
+def iniciar_perfil():
+    pedido = request.headers.get('X-Perfilar') or request.args.get('perfilar')
+    if perfilador.muestrear() or (pedido and es_admin()):
+        g.perfil = perfilador.iniciar()
+
+def terminar_perfil():
+    perfil = g.pop('perfil', None)
+    if perfil is None:
+        return None
+    ruta = request.url_rule.rule if request.url_rule is not None else request.path
+    categoria = (request.view_args or {}).get('cat_id')
+    if categoria is None and request.is_json:
+        categoria = (request.get_json(silent=True) or {}).get('cat_id')
+    try:
+        return perfilador.terminar(perfil, request.method, ruta, categoria)
+    except OSError as e:
+        log.error(f"❌ No se pudo guardar el perfil: {e}")
+        return None
+
+@app.after_request
+def guardar_perfil(respuesta):
+    nombre = terminar_perfil()
+    if nombre is not None:
+        respuesta.headers['X-Perfil'] = nombre
+    return respuesta
+
+@app.teardown_request
+def cerrar_perfil(error):
+    # Si la respuesta no llegó a after_request, el perfil no queda activo
+    terminar_perfil()
+
+@app.before_request
+def antes_de_leer():
+    # Lectura consistente: trae lo que otros workers escribieron desde el último sondeo
+    if MULTIPROCESO and request.method == "GET" and 'competencia' in g:
+        sincronizar(competencia())
+
+@ruta("/")
 def serve_index():
     return app.send_static_file('index.html')
 
-@app.route("/ranking/<cat_id>", methods=["GET"])
+@ruta("/ranking/<cat_id>", methods=["GET"])
 def get_ranking(cat_id):
-    lista = datos_globales.get(cat_id, [])
-    ranking = []
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify([])
     
-    for c in lista:
-        bw = convertir_a_float(c.get("BW"))
-        fuerza_relativa_total = calcular_fuerza_relativa_total(cat_id, c)
-        
-        comp = {
-            "Nombre": c.get("Nombre", ""),
-            "Carrera": c.get("Carrera", ""),
-            "BW": bw,
-            "Total_Fuerza_Relativa": fuerza_relativa_total
-        }
-        
-        ranking.append(comp)
+    try:
+        consulta = leer_consulta(ORDENES, "puntaje")
+    except ErrorOperacion as e:
+        return e.respuesta()
     
-    ranking.sort(key=lambda x: x.get("Total_Fuerza_Relativa", 0), reverse=True)
+    if consulta is not None:
+        # Lugar es siempre el del ranking completo, aunque la página venga filtrada u ordenada por otra clave
+        def generar_pagina():
+            total, participantes = cat.consultar(**consulta)
+            return json_bytes(pagina(consulta, total, [
+                cat.fila_ranking(cat.ranking.posicion(c.id), c, -cat.ranking.clave_de[c.id][0])
+                for c in participantes
+            ], cat.version))
+        
+        clave = ("ranking", cat_id) + tuple(consulta.values())
+        return responder_cacheado("ranking", cat_id, clave, cat.version, generar_pagina)
     
-    for i, comp in enumerate(ranking):
-        comp["Lugar"] = i + 1
+    def generar():
+        if ALMACEN == 'sqlite':
+            return json_bytes(competencia().diario.ranking(cat_id))
+        return json_bytes([
+            cat.fila_ranking(lugar, c, fuerza_relativa_total)
+            for lugar, c, fuerza_relativa_total in cat.ranking
+        ])
     
-    return jsonify(ranking)
+    return responder_cacheado("ranking", cat_id, ("ranking", cat_id), cat.version, generar)
+
+@ruta("/categorias", methods=["GET"])
+def get_categorias():
+    """Categorías de la competencia, en el orden de su configuración"""
+    return jsonify([
+        {"id": cat_id, "nombre": config.get("nombre") or cat_id.replace('_', ' ').title()}
+        for cat_id, config in competencia().config.items()
+    ])
 
-@app.route("/movimientos/<cat_id>", methods=["GET"])
+@ruta("/movimientos/<cat_id>", methods=["GET"])
 def get_movimientos(cat_id):
-    if cat_id not in FILES_CONFIG:
+    files_config = competencia().config
+    if cat_id not in files_config:
         return jsonify({"error": "Categoría no encontrada"}), 404
     
-    config = FILES_CONFIG[cat_id]
-    movimientos = []
-    
-    for mov_id, mov_info in config["movimientos"].items():
-        movimientos.append({
-            "id": mov_id,
-            "nombre": mov_info["nombre"],
-            "intentos": mov_info["intentos"]
-        })
+    def generar():
+        config = files_config[cat_id]
+        movimientos = []
+        
+        for mov_id, mov_info in config["movimientos"].items():
+            movimientos.append({
+                "id": mov_id,
+                "nombre": mov_info["nombre"],
+                "intentos": mov_info["intentos"]
+            })
+        
+        return json_bytes(movimientos)
     
-    return jsonify(movimientos)
+    # La configuración no cambia después del arranque
+    return responder_cacheado("movimientos", None, ("movimientos", cat_id), 0, generar)
 
-@app.route("/movimiento/<cat_id>/<mov_id>", methods=["GET"])
+@ruta("/movimiento/<cat_id>/<mov_id>", methods=["GET"])
 def get_movimiento(cat_id, mov_id):
-    if cat_id not in FILES_CONFIG:
+    files_config = competencia().config
+    if cat_id not in files_config:
         return jsonify({"error": "Categoría no encontrada"}), 404
     
-    if mov_id not in FILES_CONFIG[cat_id]["movimientos"]:
+    if mov_id not in files_config[cat_id]["movimientos"]:
         return jsonify({"error": "Movimiento no encontrado"}), 404
     
-    lista = datos_globales.get(cat_id, [])
-    mov_config = FILES_CONFIG[cat_id]["movimientos"][mov_id]
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify([])
     
-    resultado = []
+    mov = cat.movimientos[mov_id]
     
-    for i, c in enumerate(lista):
-        intento1 = convertir_a_float(c.get(f'col_{mov_config["intento1"]}'))
-        intento2 = convertir_a_float(c.get(f'col_{mov_config["intento2"]}')) if "intento2" in mov_config else 0
-        intento3 = convertir_a_float(c.get(f'col_{mov_config["intento3"]}')) if "intento3" in mov_config else 0
-        valido = convertir_a_float(c.get(f'col_{mov_config["valido"]}'))
-        bw = convertir_a_float(c.get("BW"))
-        
-        dato = {
-            "Lugar": i + 1,
-            "Nombre": c.get("Nombre", ""),
-            "Carrera": c.get("Carrera", ""),
-            "BW": bw,
-            "Intento1": intento1,
-            "Intento2": intento2,
-            "Mejor": valido,
-            "Res1": c.get(f'res_{mov_id}_1'),
-            "Res2": c.get(f'res_{mov_id}_2')
-        }
-        
-        if "intento3" in mov_config:
-            dato["Intento3"] = intento3
-            dato["Res3"] = c.get(f'res_{mov_id}_3')
+    try:
+        consulta = leer_consulta(ORDENES_MOVIMIENTO, "planilla")
+    except ErrorOperacion as e:
+        return e.respuesta()
+    
+    if consulta is not None:
+        # Lugar es la posición en el orden pedido, contando desde offset
+        def generar_pagina():
+            total, participantes = cat.consultar(mov_id=mov_id, **consulta)
+            return json_bytes(pagina(consulta, total, [
+                cat.fila_movimiento(mov, consulta["offset"] + i, c) for i, c in enumerate(participantes, start=1)
+            ], cat.version))
         
-        resultado.append(dato)
+        clave = ("movimiento", cat_id, mov_id) + tuple(consulta.values())
+        return responder_cacheado("movimiento", cat_id, clave, cat.version, generar_pagina)
     
-    return jsonify(resultado)
-
-@app.route("/registrar_intento", methods=["POST"])
-def registrar_intento():
-    data = request.json
-    cat_id = data.get("cat_id")
-    mov_id = data.get("mov_id")
-    nombre = data.get("nombre")
-    intento = data.get("intento")
-    resultado = data.get("resultado")
+    def generar():
+        if ALMACEN == 'sqlite':
+            return json_bytes(competencia().diario.tabla_movimiento(cat_id, mov_id))
+        return json_bytes([cat.fila_movimiento(mov, i + 1, c) for i, c in enumerate(cat)])
     
-    lista = datos_globales.get(cat_id)
-    if not lista:
-        return jsonify({"error": "Categoría inválida"}), 400
+    return responder_cacheado("movimiento", cat_id, ("movimiento", cat_id, mov_id), cat.version, generar)
+
+@ruta("/categoria/<cat_id>", methods=["GET"])
+def get_categoria(cat_id):
+    """Ranking, definición de movimientos y tablas de intentos en una sola respuesta"""
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     
-    if cat_id not in FILES_CONFIG or mov_id not in FILES_CONFIG[cat_id]["movimientos"]:
-        return jsonify({"error": "Movimiento inválido"}), 400
+    return responder_cacheado("categoria", cat_id, ("categoria", cat_id), cat.version,
+                              lambda: json_bytes(dict(cat.snapshot(), orden=proximos(cat))))
+
+@ruta("/cambios/<cat_id>", methods=["GET"])
+def get_cambios(cat_id):
+    """Deltas posteriores a ?desde=N; si el historial ya no los cubre, snapshot completo"""
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     
-    mov_config = FILES_CONFIG[cat_id]["movimientos"][mov_id]
+    desde = request.args.get("desde", type=int)
+    cambios = cat.cambios_desde(desde) if desde is not None else None
     
-    for c in lista:
-        if c["Nombre"] == nombre:
-            c[f'res_{mov_id}_{intento}'] = resultado
-            
-            if resultado == "exito":
-                col_intento = mov_config.get(f'intento{intento}')
-                peso_intento = convertir_a_float(c.get(f'col_{col_intento}'))
-                
-                col_valido = mov_config["valido"]
-                peso_valido_actual = convertir_a_float(c.get(f'col_{col_valido}'))
-                
-                if peso_intento > peso_valido_actual:
-                    c[f'col_{col_valido}'] = peso_intento
-            
-            guardar_backup()
-            notificar_cambios(cat_id)
-            return jsonify({"status": "exito"})
+    if cambios is None:
+        return jsonify({"version": cat.version, "snapshot": dict(cat.snapshot(), orden=proximos(cat))})
     
-    return jsonify({"error": "No encontrado"}), 404
+    return jsonify({"version": cat.version, "cambios": cambios, "orden": proximos(cat)})
 
-@app.route("/actualizar_peso", methods=["POST"])
-def actualizar_peso():
-    data = request.json
-    cat_id = data.get("cat_id")
-    mov_id = data.get("mov_id")
-    nombre = data.get("nombre")
-    intento = data.get("intento")
-    peso = convertir_a_float(data.get("peso"))
-    
-    lista = datos_globales.get(cat_id)
-    if not lista:
-        return jsonify({"error": "Categoría inválida"}), 400
+@ruta("/orden/<cat_id>/<mov_id>", methods=["GET"])
+def get_orden(cat_id, mov_id):
+    """Próximos ?k=10 levantamientos del movimiento: menor peso declarado primero, luego menor intento"""
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     
-    if cat_id not in FILES_CONFIG or mov_id not in FILES_CONFIG[cat_id]["movimientos"]:
-        return jsonify({"error": "Movimiento inválido"}), 400
+    if mov_id not in cat.movimientos:
+        return jsonify({"error": "Movimiento no encontrado"}), 404
     
-    mov_config = FILES_CONFIG[cat_id]["movimientos"][mov_id]
-    col_intento = mov_config.get(f'intento{intento}')
+    k = max(1, min(request.args.get("k", 10, type=int), len(cat) or 1))
     
-    for c in lista:
-        if c["Nombre"] == nombre:
-            c[f'col_{col_intento}'] = peso
-            guardar_backup()
-            notificar_cambios(cat_id)
-            return jsonify({"status": "exito"})
+    return responder_cacheado("orden", cat_id, ("orden", cat_id, mov_id, k), cat.version,
+                              lambda: json_bytes(cat.orden_levantamiento(mov_id, k)))
+
+# --- PANTALLAS DEL RECINTO ---
+
+@ruta("/pantalla")
+def serve_pantalla():
+    return app.send_static_file('pantalla.html')
+
+@ruta("/fragmento/ranking/<cat_id>", methods=["GET"])
+def get_fragmento_ranking(cat_id):
+    """Tabla HTML del ranking, generada una vez por versión de la categoría"""
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     
-    return jsonify({"error": "No encontrado"}), 404
+    return responder_cacheado("fragmento_ranking", cat_id, ("fragmento_ranking", cat_id), cat.version,
+                              lambda: fragmentos.ranking(cat).encode('utf-8'), mimetype='text/html')
 
-@app.route("/borrar_intento", methods=["POST"])
-def borrar_intento():
-    data = request.json
-    cat_id = data.get("cat_id")
-    mov_id = data.get("mov_id")
-    nombre = data.get("nombre")
-    intento = data.get("intento")
+@ruta("/fragmento/movimiento/<cat_id>/<mov_id>", methods=["GET"])
+def get_fragmento_movimiento(cat_id, mov_id):
+    """Tabla HTML de un movimiento con los próximos levantadores, generada una vez por versión de la categoría"""
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     
-    lista = datos_globales.get(cat_id)
-    if not lista:
-        return jsonify({"error": "Categoría inválida"}), 400
+    mov = cat.movimientos.get(mov_id)
+    if mov is None:
+        return jsonify({"error": "Movimiento no encontrado"}), 404
     
-    if cat_id not in FILES_CONFIG or mov_id not in FILES_CONFIG[cat_id]["movimientos"]:
-        return jsonify({"error": "Movimiento inválido"}), 400
+    def generar():
+        return fragmentos.movimiento(cat, mov, cat.orden_levantamiento(mov_id, EN_ESPERA)).encode('utf-8')
     
-    mov_config = FILES_CONFIG[cat_id]["movimientos"][mov_id]
+    return responder_cacheado("fragmento_movimiento", cat_id, ("fragmento_movimiento", cat_id, mov_id),
+                              cat.version, generar, mimetype='text/html')
+
+@ruta("/equipos", methods=["GET"])
+def get_equipos():
+    """Clasificación por equipos (carreras): puntos por lugar sumados en todas las categorías"""
+    tabla = tabla_equipos(competencia())
+    return responder_cacheado("equipos", None, ("equipos",), tabla.version,
+                              lambda: json_bytes(tabla.resumen()))
+
+@ruta("/registrar_intento", methods=["POST"])
+@escritura
+def registrar_intento():
+    try:
+        cat_id, registro = op_registrar_intento(competencia(), request.json)
+    except ErrorOperacion as e:
+        return e.respuesta()
     
-    for c in lista:
-        if c["Nombre"] == nombre:
-            c[f'res_{mov_id}_{intento}'] = None
-            
-            col_valido = mov_config["valido"]
-            mejor = 0.0
-            
-            for i in range(1, mov_config["intentos"] + 1):
-                if c.get(f'res_{mov_id}_{i}') == "exito":
-                    col_int = mov_config.get(f'intento{i}')
-                    peso = convertir_a_float(c.get(f'col_{col_int}'))
-                    if peso > mejor:
-                        mejor = peso
-            
-            c[f'col_{col_valido}'] = mejor
-            
-            guardar_backup()
-            notificar_cambios(cat_id)
-            return jsonify({"status": "exito"})
+    c = aplicar_cambio(competencia(), cat_id, registro)
+    return jsonify({"status": "exito", "version": c.version})
+
+@ruta("/actualizar_peso", methods=["POST"])
+@escritura
+def actualizar_peso():
+    try:
+        cat_id, registro = op_actualizar_peso(competencia(), request.json)
+    except ErrorOperacion as e:
+        return e.respuesta()
     
-    return jsonify({"error": "No encontrado"}), 404
+    c = aplicar_cambio(competencia(), cat_id, registro)
+    return jsonify({"status": "exito", "version": c.version})
 
-@app.route("/agregar_completo", methods=["POST"])
+@ruta("/borrar_intento", methods=["POST"])
+@escritura
+def borrar_intento():
+    try:
+        cat_id, registro = op_borrar_intento(competencia(), request.json)
+    except ErrorOperacion as e:
+        return e.respuesta()
+    
+    c = aplicar_cambio(competencia(), cat_id, registro)
+    return jsonify({"status": "exito", "version": c.version})
+
+@ruta("/agregar_completo", methods=["POST"])
+@escritura
 def agregar_completo():
     """Agregar participante con todos los intentos de todos los movimientos"""
     try:
         data = request.json
         cat_id = data.get("cat_id")
-        lista = datos_globales.get(cat_id)
+        cat = competencia().datos.get(cat_id)
         
-        if lista is None:
+        if cat is None:
             return jsonify({"error": "Categoría inválida"}), 400
         
-        config = FILES_CONFIG[cat_id]
-        
         nuevo = {
             "ID_Planilla": 999,
             "Nombre": data.get("nombre"),
@@ -466,175 +1151,334 @@ def agregar_completo():
         
         intentos = data.get("intentos", {})
         
-        for mov_id, mov_config in config["movimientos"].items():
+        for mov_id, mov in cat.movimientos.items():
             if mov_id in intentos:
                 intentos_mov = intentos[mov_id]
                 
-                col_int1 = mov_config["intento1"]
-                nuevo[f'col_{col_int1}'] = convertir_a_float(intentos_mov.get("intento1", 0))
-                
-                if "intento2" in mov_config and intentos_mov.get("intento2"):
-                    col_int2 = mov_config["intento2"]
-                    nuevo[f'col_{col_int2}'] = convertir_a_float(intentos_mov["intento2"])
-                
-                if "intento3" in mov_config and intentos_mov.get("intento3"):
-                    col_int3 = mov_config["intento3"]
-                    nuevo[f'col_{col_int3}'] = convertir_a_float(intentos_mov["intento3"])
+                for i, col in enumerate(mov.cols_intento, start=1):
+                    valor = intentos_mov.get(f"intento{i}")
+                    if i == 1 or valor:
+                        nuevo[f'col_{col}'] = convertir_a_float(valor or 0)
         
-        lista.append(nuevo)
-        guardar_backup()
-        notificar_cambios(cat_id)
+        c = aplicar_cambio(competencia(), cat_id, {"op": "add", "participante": nuevo})
         
-        print(f"✅ Participante agregado: {nuevo['Nombre']}")
-        return jsonify({"status": "exito"})
+        log.info(f"✅ Participante agregado: {c.nombre} (ID {c.id})")
+        return jsonify({"status": "exito", "id": c.id, "version": c.version})
         
+    except ErrorOperacion:
+        raise
     except Exception as e:
-        import traceback
-        print(f"❌ Error en agregar_completo:")
-        print(traceback.format_exc())
+        log.exception("❌ Error en agregar_completo")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/editar_bw", methods=["POST"])
+@ruta("/editar_bw", methods=["POST"])
+@escritura
 def editar_bw():
-    data = request.json
-    cat_id = data.get("cat_id")
-    nombre = data.get("nombre")
-    nuevo_bw = convertir_a_float(data.get("bw"))
-    
-    lista = datos_globales.get(cat_id)
-    if not lista:
-        return jsonify({"error": "Categoría inválida"}), 400
-    
-    for c in lista:
-        if c["Nombre"] == nombre:
-            c["BW"] = nuevo_bw
-            guardar_backup()
-            notificar_cambios(cat_id)
-            return jsonify({"status": "exito"})
+    try:
+        cat_id, registro = op_editar_bw(competencia(), request.json)
+    except ErrorOperacion as e:
+        return e.respuesta()
     
-    return jsonify({"error": "No encontrado"}), 404
+    c = aplicar_cambio(competencia(), cat_id, registro)
+    return jsonify({"status": "exito", "version": c.version})
 
-@app.route("/eliminar_participante", methods=["POST"])
+@ruta("/eliminar_participante", methods=["POST"])
+@escritura
 def eliminar_participante():
     data = request.json
     cat_id = data.get("cat_id")
-    nombre = data.get("nombre")
-    
-    if cat_id in datos_globales:
-        orig = len(datos_globales[cat_id])
-        datos_globales[cat_id] = [c for c in datos_globales[cat_id] if c["Nombre"] != nombre]
-        if len(datos_globales[cat_id]) < orig:
-            guardar_backup()
-            notificar_cambios(cat_id)
+    
+    cat = competencia().datos.get(cat_id)
+    if cat is not None:
+        c = buscar_participante(cat, data)
+        if c is not None:
+            comprobar_version(c, data)
+            aplicar_cambio(competencia(), cat_id, {"op": "del", "id": c.id})
             return jsonify({"status": "exito"})
     
     return jsonify({"error": "No encontrado"}), 404
 
-@app.route("/descargar/<cat_id>", methods=["GET"])
+@ruta("/descargar/<cat_id>", methods=["GET"])
 def descargar_categoria(cat_id):
     """Descarga el ranking de una categoría en formato CSV"""
-    lista = datos_globales.get(cat_id, [])
+    lista = competencia().datos.get(cat_id, [])
     
     if not lista:
         return jsonify({"error": "Sin datos"}), 404
     
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=['Lugar', 'Nombre', 'Carrera', 'BW', 'F.R._Total'])
-    writer.writeheader()
-    
-    ranking = []
-    for c in lista:
-        ranking.append({
-            'Nombre': c.get('Nombre', ''),
-            'Carrera': c.get('Carrera', ''),
-            'BW': convertir_a_float(c.get('BW')),
-            'F.R._Total': calcular_fuerza_relativa_total(cat_id, c)
-        })
+    def generar():
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=['Lugar', 'Nombre', 'Carrera', 'BW', 'F.R._Total'])
+        writer.writeheader()
+        
+        for lugar, c, fuerza_relativa_total in lista.ranking:
+            writer.writerow({
+                'Lugar': lugar,
+                'Nombre': c.nombre,
+                'Carrera': c.carrera,
+                'BW': round(c.bw, 1),
+                'F.R._Total': round(fuerza_relativa_total, 4)
+            })
+        
+        return output.getvalue().encode('utf-8')
     
-    ranking.sort(key=lambda x: x['F.R._Total'], reverse=True)
+    fecha = datetime.now().strftime("%Y%m%d")
     
-    for i, c in enumerate(ranking):
-        writer.writerow({
-            'Lugar': i+1,
-            'Nombre': c['Nombre'],
-            'Carrera': c['Carrera'],
-            'BW': round(c['BW'], 1),
-            'F.R._Total': round(c['F.R._Total'], 4)
-        })
+    return responder_cacheado(
+        "descargar", cat_id, ("descargar", cat_id), lista.version, generar,
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=ranking_{cat_id}_{fecha}.csv'}
+    )
+
+@ruta("/descargar/<cat_id>/intentos", methods=["GET"])
+def descargar_intentos(cat_id):
+    """CSV con todos los intentos, resultados y válidos de la categoría, generado por filas"""
+    cat = competencia().datos.get(cat_id)
+    if cat is None:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     
-    output.seek(0)
     fecha = datetime.now().strftime("%Y%m%d")
+    return Response(
+        exportacion.lineas_csv(cat), mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=intentos_{cat_id}_{fecha}.csv'}
+    )
+
+def exportar_zip(comp, seq, destino):
+    """Entrega el ZIP mientras lo escribe en un temporal; si al terminar los datos
+    siguen en la versión `seq`, el temporal queda como cache de esa versión"""
+    directorio = comp.ruta(EXPORTACIONES_DIR)
+    os.makedirs(directorio, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    completo = False
+    try:
+        with os.fdopen(fd, 'wb') as copia:
+            yield from exportacion.zip_categorias(comp.datos.values(), copia)
+        completo = True
+    finally:
+        if completo and comp.diario.seq == seq:
+            os.replace(tmp, destino)
+            for anterior in glob.glob(os.path.join(directorio, 'competencia_*.zip')):
+                if os.path.abspath(anterior) != destino:
+                    try:
+                        os.remove(anterior)
+                    except OSError:
+                        pass
+        else:
+            os.remove(tmp)
+
+@ruta("/descargar/competencia.zip", methods=["GET"])
+def descargar_zip():
+    """ZIP con el CSV completo de cada categoría; se genera una vez por versión de los datos"""
+    comp = competencia()
+    seq = comp.diario.seq
+    destino = os.path.abspath(comp.ruta(os.path.join(EXPORTACIONES_DIR, f'competencia_{seq}.zip')))
+    fecha = datetime.now().strftime("%Y%m%d")
+    nombre = f'competencia_{fecha}.zip'
     
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'ranking_{cat_id}_{fecha}.csv'
+    if os.path.exists(destino):
+        return send_file(destino, mimetype='application/zip', as_attachment=True, download_name=nombre)
+    
+    return Response(
+        exportar_zip(comp, seq, destino), mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={nombre}'}
     )
 
-@app.route('/editar_intento1', methods=['POST'])
+# --- HISTORIAL ---
+
+@app.route("/historial/competencias", methods=["GET"])
+def get_historial_competencias():
+    """Competencias archivadas, con la fecha y la cantidad de marcas de cada una"""
+    return jsonify(historial.competencias())
+
+@app.route("/historial/atleta", methods=["GET"])
+def get_historial_atleta():
+    """Mejores marcas y progresión de ?nombre= en las competencias archivadas (?movimiento= filtra)"""
+    nombre = request.args.get("nombre", "").strip()
+    if not nombre:
+        return jsonify({"error": "Falta el parámetro nombre"}), 400
+    
+    movimiento = request.args.get("movimiento")
+    mejores = historial.mejores(nombre)
+    if not mejores:
+        return jsonify({"error": "Atleta sin marcas en el historial"}), 404
+    if movimiento:
+        mejores = {mov: marca for mov, marca in mejores.items() if mov == movimiento}
+    
+    return jsonify({"nombre": nombre, "mejores": mejores, "progresion": historial.progresion(nombre, movimiento)})
+
+@app.route("/historial/carrera/<carrera>", methods=["GET"])
+def get_historial_carrera(carrera):
+    """Tendencia de una carrera por competencia: atletas, mejor marca y promedio de cada movimiento"""
+    return jsonify({"carrera": historial.equipo(carrera),
+                    "tendencia": historial.tendencia_carrera(carrera, request.args.get("movimiento"))})
+
+@app.route("/historial/records", methods=["GET"])
+def get_historial_records():
+    """Récord de cada movimiento y sexo (?movimiento=, ?sexo=), incluidos los batidos en vivo"""
+    return jsonify(historial.tabla_records(request.args.get("movimiento"), request.args.get("sexo")))
+
+@ruta("/historial/archivar", methods=["POST"])
+def archivar_competencia():
+    """Guarda en el historial las marcas actuales de la competencia (body opcional: fecha, nombre)"""
+    if not es_admin():
+        return jsonify({"error": "No autorizado"}), 403
+    
+    comp = competencia()
+    data = request.get_json(silent=True) or {}
+    fecha = data.get("fecha") or datetime.now().date().isoformat()
+    try:
+        datetime.strptime(fecha, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return jsonify({"error": "fecha debe ser AAAA-MM-DD"}), 400
+    
+    with comp.bloqueo:
+        marcas = list(marcas_de_categorias(comp.datos.values()))
+    n = historial.importar(comp.id, data.get("nombre") or comp.id, fecha, "en vivo", marcas)
+    log.info(f"🗄️ Competencia '{comp.id}' archivada en el historial ({n} marcas)")
+    return jsonify({"status": "exito", "competencia": comp.id, "fecha": fecha, "marcas": n})
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Métricas de este proceso en formato de texto de Prometheus"""
+    return Response(metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route("/perfiles", methods=["GET"])
+def get_perfiles():
+    """Perfiles guardados más recientes (?n=20)"""
+    if not es_admin():
+        return jsonify({"error": "No autorizado"}), 403
+    
+    return jsonify(perfilador.listar(request.args.get("n", 20, type=int)))
+
+@app.route("/perfiles/<nombre>", methods=["GET"])
+def get_perfil(nombre):
+    """Funciones principales de un perfil (?orden=cumulative&n=30); ?descargar=1 entrega el .prof"""
+    if not es_admin():
+        return jsonify({"error": "No autorizado"}), 403
+    
+    ruta = perfilador.ruta(nombre)
+    if ruta is None:
+        return jsonify({"error": "Perfil no encontrado"}), 404
+    
+    if request.args.get("descargar"):
+        return send_file(os.path.abspath(ruta), mimetype='application/octet-stream',
+                         as_attachment=True, download_name=nombre)
+    
+    orden = request.args.get("orden", "cumulative")
+    if orden not in ORDENES_PERFIL:
+        return jsonify({"error": f"Orden inválido; opciones: {', '.join(ORDENES_PERFIL)}"}), 400
+    
+    return jsonify(perfilador.funciones(nombre, orden, request.args.get("n", 30, type=int)))
+
+@ruta("/estadisticas/cache", methods=["GET"])
+def estadisticas_cache():
+    """Hits/misses del cache de respuestas, por ruta"""
+    return jsonify(competencia().cache.resumen())
+
+@ruta('/editar_intento1', methods=['POST'])
+@escritura
 def editar_intento1():
     """Editar el primer intento de un participante"""
     try:
         data = request.json
-        cat_id = data.get('cat_id')
         mov_id = data.get('mov_id')
         nombre = data.get('nombre')
-        nuevo_peso = float(data.get('nuevo_peso'))
-        
-        print(f"📝 Editando Intento 1: {nombre} en {mov_id} -> {nuevo_peso} kg")
-        
-        if cat_id not in datos_globales:
-            return jsonify({"error": "Categoría no válida"}), 400
-        
-        if cat_id not in FILES_CONFIG:
-            return jsonify({"error": "Configuración no encontrada"}), 400
-        
-        lista = datos_globales[cat_id]
-        config = FILES_CONFIG[cat_id]
-        
-        if mov_id not in config['movimientos']:
-            return jsonify({"error": f"Movimiento '{mov_id}' no válido"}), 400
-        
-        mov_config = config['movimientos'][mov_id]
-        col_intento1 = mov_config['intento1']
         
-        participante_encontrado = False
-        for participante in lista:
-            if participante.get('Nombre') == nombre:
-                participante[f'col_{col_intento1}'] = nuevo_peso
-                participante_encontrado = True
-                break
+        log.info(f"📝 Editando Intento 1: {nombre} en {mov_id} -> {data.get('nuevo_peso')} kg")
         
-        if not participante_encontrado:
-            return jsonify({"error": f"Participante '{nombre}' no encontrado"}), 404
+        try:
+            cat_id, registro = op_editar_intento1(competencia(), data)
+        except ErrorOperacion as e:
+            return e.respuesta()
         
-        guardar_backup()
-        notificar_cambios(cat_id)
+        nuevo_peso, = registro["campos"].values()
+        c = aplicar_cambio(competencia(), cat_id, registro)
         
-        print(f"✅ Intento 1 actualizado exitosamente")
+        log.info("✅ Intento 1 actualizado exitosamente")
         
         return jsonify({
             "success": True,
-            "mensaje": f"Intento 1 actualizado a {nuevo_peso} kg"
+            "mensaje": f"Intento 1 actualizado a {nuevo_peso} kg",
+            "version": c.version
         })
     
+    except ErrorOperacion:
+        raise
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"❌ Error en editar_intento1:")
-        print(error_detail)
+        log.exception("❌ Error en editar_intento1")
         return jsonify({"error": f"Error interno: {str(e)}"}), 500
 
+@ruta("/lote", methods=["POST"])
+@escritura
+def lote():
+    """Aplica varias operaciones de jueces de forma atómica.
+
+    Body: {"operaciones": [{"tipo": "registrar_intento", "cat_id": ..., ...}, ...]}
+    con los mismos campos que las rutas individuales. Cada expected_version se
+    compara con el estado que dejaron las operaciones anteriores del lote.
+    """
+    operaciones = (request.json or {}).get("operaciones")
+    if not isinstance(operaciones, list):
+        return jsonify({"error": "Se esperaba una lista 'operaciones'"}), 400
+    
+    try:
+        aplicados = aplicar_lote(competencia(), operaciones)
+    except ErrorOperacion as e:
+        if e.indice is None:
+            return e.respuesta()
+        resultados = [{"status": "no_aplicado"} for _ in operaciones]
+        resultados[e.indice] = {"status": "error", "error": e.mensaje}
+        return jsonify(dict(e.datos, error=e.mensaje, indice=e.indice, resultados=resultados)), e.status
+    
+    return jsonify({
+        "status": "exito",
+        "resultados": [{"status": "exito", "cat_id": r["cat"], "id": r["id"], "version": r["campos"]["Version"]}
+                       for r in aplicados]
+    })
+
 # --- EVENTOS WEBSOCKET ---
 
 @socketio.on('connect')
 def handle_connect():
-    print('🔌 Cliente conectado')
+    suscripciones.conectar(request.sid)
+    log.debug(f'🔌 Cliente conectado | {suscripciones.resumen()}')
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print('🔌 Cliente desconectado')
+    suscripciones.desconectar(request.sid)
+    log.debug(f'🔌 Cliente desconectado | {suscripciones.resumen()}')
+
+@socketio.on('suscribir')
+def handle_suscribir(data):
+    """El cliente indica la competencia y las categorías que muestra (y con
+    equipos=true, la clasificación por equipos); reemplaza sus suscripciones previas"""
+    data = data or {}
+    comp = competencias.obtener(data.get('competencia') or COMPETENCIA_PRINCIPAL)
+    if comp is None:
+        return {"error": "Competencia no encontrada"}
+    salas = [sala_categoria(comp.id, c) for c in data.get('categorias', []) if c in comp.datos]
+    if data.get('equipos'):
+        salas.append(sala_equipos(comp.id))
+    entrar, salir = suscripciones.reemplazar(request.sid, salas)
+    for sala in entrar:
+        join_room(sala)
+    for sala in salir:
+        leave_room(sala)
+    # Con varios workers, el pid dice a cuál quedó conectado el cliente
+    return dict(suscripciones.resumen(), worker=os.getpid())
+
+@app.route("/salas", methods=["GET"])
+def get_salas():
+    """Clientes conectados y suscriptores por sala"""
+    resumen = suscripciones.resumen()
+    resumen["emitidos"] = coalescedor.emitidos
+    resumen["fusionados"] = coalescedor.fusionados
+    return jsonify(resumen)
+
+@app.route("/competencias", methods=["GET"])
+def get_competencias():
+    """Competencias disponibles y cargadas, con la memoria aproximada de cada una"""
+    return jsonify(competencias.resumen())
 
 # --- EJECUTAR SERVIDOR ---
 
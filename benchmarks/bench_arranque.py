@@ -0,0 +1,114 @@
+"""Mide el tiempo hasta la primera respuesta del proceso web y del lanzador.
+
+Para cada escenario se arranca el proceso en una copia temporal del proyecto
+y se cronometra hasta que GET /ranking/<categoría> responde:
+
+  csv        sin backup ni cache de planillas (lee los CSV)
+  cache      sin backup, con el cache de planillas de la corrida anterior
+  backup     con competencia_backup.json
+
+Procesos: `import app` (solo importar), gunicorn con un worker eventlet
+(como el Procfile) e iniciar_app.py (el lanzador del ejecutable, puerto 5000).
+
+Uso: python benchmarks/bench_arranque.py [repeticiones]
+"""
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA = "/ranking/varones_overall"
+PUERTO_GUNICORN = 5300
+PUERTO_LANZADOR = 5000
+
+
+def preparar(directorio, escenario):
+    for patron in ("competencia_backup.*", "competencia_planillas.cache"):
+        for archivo in glob.glob(os.path.join(directorio, patron)):
+            if escenario == "backup" and "backup" in archivo:
+                continue
+            if escenario == "cache" and archivo.endswith(".cache"):
+                continue
+            os.remove(archivo)
+
+
+def esperar_respuesta(puerto, proceso, limite=60):
+    fin = time.perf_counter() + limite
+    while time.perf_counter() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError("El proceso terminó antes de responder")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}{RUTA}", timeout=1) as respuesta:
+                respuesta.read()
+                return
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError("Sin respuesta")
+
+
+def medir_servidor(directorio, comando, puerto):
+    entorno = dict(os.environ, BROWSER="true")
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(comando, cwd=directorio, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        esperar_respuesta(puerto, proceso)
+        return time.perf_counter() - inicio
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def medir_import(directorio):
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app"], cwd=directorio, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - inicio
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    directorio = tempfile.mkdtemp(prefix="competencia_")
+    for patron in ("*.py", "*.csv", "index.html"):
+        for archivo in glob.glob(os.path.join(RAIZ, patron)):
+            shutil.copy(archivo, directorio)
+
+    procesos = {
+        "import app": lambda: medir_import(directorio),
+        "gunicorn": lambda: medir_servidor(
+            directorio,
+            [sys.executable, "-m", "gunicorn", "--worker-class", "eventlet", "-w", "1",
+             "-b", f"127.0.0.1:{PUERTO_GUNICORN}", "app:app"],
+            PUERTO_GUNICORN),
+        "iniciar_app.py": lambda: medir_servidor(directorio, [sys.executable, "iniciar_app.py"], PUERTO_LANZADOR),
+    }
+
+    try:
+        print(f"Segundos hasta la primera respuesta (mejor de {repeticiones})")
+        print(f"  {'':<16}{'csv':>10}{'cache':>10}{'backup':>10}")
+        for nombre, medir in procesos.items():
+            tiempos = []
+            for escenario in ("csv", "cache", "backup"):
+                mejor = None
+                for _ in range(repeticiones):
+                    if escenario != "csv":
+                        # Deja el backup y el cache que genera un arranque desde cero
+                        preparar(directorio, "csv")
+                        medir_import(directorio)
+                    preparar(directorio, escenario)
+                    t = medir()
+                    mejor = t if mejor is None else min(mejor, t)
+                tiempos.append(mejor)
+            print(f"  {nombre:<16}" + "".join(f"{t:10.3f}" for t in tiempos))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Carga de un día de competencia contra app.py, con el test client de Flask y el de Socket.IO.
+
+Arma en una carpeta temporal una competencia sintética (categorías y
+participantes por categoría según los parámetros, con los movimientos de
+varones_overall), importa app.py ahí y simula:
+
+  jueces        cada uno en su categoría: POST /actualizar_peso y luego
+                POST /registrar_intento, con una pausa opcional entre operaciones
+  espectadores  conectados por Socket.IO y suscritos a una categoría; cargan
+                /movimientos y /categoria al entrar y, como cargarTodo() del
+                panel, piden /cambios?desde=<versión> con cada datos_actualizados
+
+Informa peticiones por segundo, p50/p95/p99 de cada ruta y la latencia de
+difusión: desde que el juez envía el cambio hasta que cada espectador recibe el
+datos_actualizados con esa versión (los espectadores revisan su cola cada
+--sondeo-ms, que es la resolución de la medida). El resultado se guarda en JSON;
+con --comparar se muestran las diferencias contra una corrida anterior.
+
+Uso: python benchmarks/bench_carga.py [--categorias 6] [--participantes 40]
+     [--jueces 6] [--espectadores 60] [--operaciones 100] [--coalescer-ms 100]
+     [--salida resultados.json] [--comparar anterior.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS_DIR = os.path.join(RAIZ, "benchmarks", "resultados")
+
+MOVIMIENTOS = {
+    "sentadilla": {"intento1": 4, "intento2": 5, "intento3": 6, "valido": 7, "nombre": "Sentadilla", "intentos": 3},
+    "press_banca": {"intento1": 8, "intento2": 9, "intento3": 10, "valido": 11, "nombre": "Press Banca", "intentos": 3},
+    "peso_muerto": {"intento1": 12, "intento2": 13, "intento3": 14, "valido": 15, "nombre": "Peso Muerto", "intentos": 3},
+}
+COLUMNAS = 19
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description="Carga de un día de competencia contra app.py")
+    parser.add_argument("--categorias", type=int, default=6)
+    parser.add_argument("--participantes", type=int, default=40, help="por categoría")
+    parser.add_argument("--jueces", type=int, default=6)
+    parser.add_argument("--espectadores", type=int, default=60)
+    parser.add_argument("--operaciones", type=int, default=100, help="cambios de peso + resultado por juez")
+    parser.add_argument("--pausa-ms", type=float, default=0, help="pausa de cada juez entre operaciones")
+    parser.add_argument("--coalescer-ms", type=int, default=100, help="COALESCER_MS del servidor")
+    parser.add_argument("--compactar-cada", type=int, default=500, help="COMPACTAR_CADA del servidor")
+    parser.add_argument("--sondeo-ms", type=float, default=1, help="cada cuánto revisa su cola un espectador")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="archivo JSON (por defecto benchmarks/resultados/carga_<fecha>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    return parser.parse_args()
+
+
+# ========== COMPETENCIA SINTÉTICA ==========
+
+def preparar_competencia(directorio, categorias, participantes, azar):
+    """Copia el código a `directorio` y escribe los CSV y la configuración sintéticos"""
+    for archivo in os.listdir(RAIZ):
+        if archivo.endswith(".py") or archivo == "index.html":
+            shutil.copy(os.path.join(RAIZ, archivo), directorio)
+
+    config = {}
+    for n in range(categorias):
+        cat_id = f"categoria_{n + 1}"
+        archivo = f"{cat_id}.csv"
+        config[cat_id] = {
+            "file": archivo, "sexo": "M" if n % 2 else "F", "formula": "fuerza_relativa",
+            "skiprows": 3, "col_nombre": 1, "movimientos": MOVIMIENTOS
+        }
+        with open(os.path.join(directorio, archivo), "w", encoding="windows-1252") as f:
+            f.write(";CATEGORIA SINTETICA" + ";" * (COLUMNAS - 2) + "\n")
+            f.write(";NOMBRE / APELLIDOS;CARRERA;BW" + ";" * (COLUMNAS - 4) + "\n")
+            f.write(";" * (COLUMNAS - 1) + "\n")
+            for i in range(1, participantes + 1):
+                fila = [""] * COLUMNAS
+                fila[0] = str(i)
+                fila[1] = f"Atleta {n + 1}-{i}"
+                fila[2] = "Kinesiologia"
+                fila[3] = f"{azar.uniform(50, 120):.1f}"
+                for mov in MOVIMIENTOS.values():
+                    fila[mov["intento1"]] = str(azar.randrange(40, 200, 5))
+                    fila[mov["valido"]] = "0"
+                f.write(";".join(fila) + "\n")
+
+    with open(os.path.join(directorio, "configuracion.py"), "w", encoding="utf-8") as f:
+        f.write(f"FILES_CONFIG = {config!r}\n")
+        f.write("PUNTOS_EQUIPOS = [12, 9, 8, 7, 6, 5, 4, 3, 2, 1]\nALIAS_CARRERAS = {}\n")
+    return list(config)
+
+
+# ========== MEDICIONES ==========
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumen(muestras_ms, segundos=None):
+    datos = {
+        "n": len(muestras_ms),
+        "p50_ms": percentil(muestras_ms, 50),
+        "p95_ms": percentil(muestras_ms, 95),
+        "p99_ms": percentil(muestras_ms, 99),
+        "max_ms": max(muestras_ms) if muestras_ms else None,
+        "media_ms": sum(muestras_ms) / len(muestras_ms) if muestras_ms else None,
+    }
+    if segundos:
+        datos["por_segundo"] = len(muestras_ms) / segundos
+    return datos
+
+
+class Medidor:
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.tiempos = {}
+        self.errores = {}
+
+    def pedir(self, metodo, ruta, nombre, **kwargs):
+        inicio = time.perf_counter()
+        respuesta = self.cliente.open(ruta, method=metodo, **kwargs)
+        respuesta.get_data()
+        self.tiempos.setdefault(nombre, []).append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code >= 400:
+            self.errores[nombre] = self.errores.get(nombre, 0) + 1
+        return respuesta
+
+
+# ========== CLIENTES SIMULADOS ==========
+
+def juez(app_modulo, medidor, cat_id, operaciones, pausa, enviados, azar, terminados):
+    try:
+        operar(app_modulo, medidor, cat_id, operaciones, pausa, enviados, azar)
+    finally:
+        terminados.append(cat_id)
+
+
+def operar(app_modulo, medidor, cat_id, operaciones, pausa, enviados, azar):
+    cat = app_modulo.principal.datos[cat_id]
+    ids = [c.id for c in cat]
+    movimientos = list(MOVIMIENTOS)
+    for _ in range(operaciones):
+        base = {
+            "cat_id": cat_id,
+            "mov_id": azar.choice(movimientos),
+            "intento": azar.randint(1, 3),
+            "id": azar.choice(ids),
+        }
+        for ruta, extra in (("/actualizar_peso", {"peso": azar.randrange(40, 250, 5)}),
+                            ("/registrar_intento", {"resultado": azar.choice(["exito", "fallo"])})):
+            inicio = time.perf_counter()
+            medidor.pedir("POST", ruta, ruta, json=dict(base, **extra))
+            # La versión de la categoría es el seq del diario después de la escritura
+            enviados.setdefault((cat_id, cat.version), inicio)
+            app_modulo.socketio.sleep(pausa)
+
+
+class Espectador:
+    def __init__(self, app_modulo, medidor, cat_id):
+        self.app = app_modulo
+        self.medidor = medidor
+        self.cat_id = cat_id
+        self.cliente = app_modulo.socketio.test_client(app_modulo.app, flask_test_client=medidor.cliente)
+        self.version = None
+        self.recibidos = 0
+
+    def entrar(self):
+        self.cliente.emit("suscribir", {"categorias": [self.cat_id]}, callback=True)
+        self.medidor.pedir("GET", f"/movimientos/{self.cat_id}", "/movimientos/<cat>")
+        respuesta = self.medidor.pedir("GET", f"/categoria/{self.cat_id}", "/categoria/<cat>")
+        self.version = respuesta.get_json()["version"]
+
+    def atender(self, enviados, latencias):
+        """Procesa los mensajes en cola; devuelve la última versión conocida"""
+        for paquete in self.cliente.get_received():
+            if paquete["name"] != "datos_actualizados":
+                continue
+            mensaje = paquete["args"][0]
+            ahora = time.perf_counter()
+            self.recibidos += 1
+            enviado = enviados.get((self.cat_id, mensaje["version"]))
+            if enviado is not None:
+                latencias.append((ahora - enviado) * 1000)
+            if mensaje["version"] <= self.version:
+                continue
+            # Como cargarTodo(): pide lo que cambió desde la versión que tiene
+            respuesta = self.medidor.pedir("GET", f"/cambios/{self.cat_id}?desde={self.version}", "/cambios/<cat>")
+            self.version = respuesta.get_json()["version"]
+        return self.version
+
+
+def correr(app_modulo, parametros, categorias):
+    azar = random.Random(parametros.semilla)
+    medidor = Medidor(app_modulo.app.test_client())
+    socketio = app_modulo.socketio
+
+    espectadores = [Espectador(app_modulo, medidor, categorias[i % len(categorias)])
+                    for i in range(parametros.espectadores)]
+    for espectador in espectadores:
+        espectador.entrar()
+
+    enviados = {}
+    latencias = []
+    pausa = parametros.pausa_ms / 1000
+    sondeo = parametros.sondeo_ms / 1000
+
+    terminados = []
+    inicio = fin_escrituras = time.perf_counter()
+    for j in range(parametros.jueces):
+        socketio.start_background_task(
+            juez, app_modulo, medidor, categorias[j % len(categorias)],
+            parametros.operaciones, pausa, enviados, random.Random(azar.random()), terminados)
+
+    # Los espectadores siguen atendiendo hasta quedar al día con la última versión
+    while True:
+        for espectador in espectadores:
+            espectador.atender(enviados, latencias)
+        if len(terminados) == parametros.jueces:
+            al_dia = all(e.version >= app_modulo.principal.datos[e.cat_id].version for e in espectadores)
+            if al_dia or time.perf_counter() - fin_escrituras > 10:
+                break
+        else:
+            fin_escrituras = time.perf_counter()
+        socketio.sleep(sondeo)
+    duracion = fin_escrituras - inicio
+
+    for espectador in espectadores:
+        espectador.cliente.disconnect()
+
+    escrituras = sum(len(medidor.tiempos.get(r, [])) for r in ("/actualizar_peso", "/registrar_intento"))
+    return {
+        "duracion_s": duracion,
+        "escrituras_por_segundo": escrituras / duracion,
+        "peticiones_por_segundo": sum(len(t) for t in medidor.tiempos.values()) / duracion,
+        "rutas": {ruta: resumen(tiempos, duracion) for ruta, tiempos in sorted(medidor.tiempos.items())},
+        "errores": medidor.errores,
+        "difusion": dict(resumen(latencias),
+                         mensajes_recibidos=sum(e.recibidos for e in espectadores),
+                         emitidos=app_modulo.coalescedor.emitidos,
+                         fusionados=app_modulo.coalescedor.fusionados),
+        "cache": app_modulo.principal.cache.resumen(),
+    }
+
+
+# ========== REPORTE ==========
+
+def commit_actual():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, check=True)
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def formato(valor):
+    return "-" if valor is None else f"{valor:.2f}"
+
+
+def imprimir(resultado, anterior=None):
+    r = resultado["resultados"]
+    print(f"\n{r['duracion_s']:.2f} s | {r['escrituras_por_segundo']:.1f} escrituras/s | "
+          f"{r['peticiones_por_segundo']:.1f} peticiones/s")
+    print(f"\n  {'ruta':<22}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}   (ms)")
+    filas = list(r["rutas"].items()) + [("difusión", r["difusion"])]
+    for ruta, datos in filas:
+        linea = f"  {ruta:<22}{datos['n']:>7}" + "".join(
+            f"{formato(datos[k]):>9}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        if anterior is not None:
+            previo = anterior["rutas"].get(ruta) if ruta != "difusión" else anterior.get("difusion")
+            if previo and previo.get("p95_ms") and datos["p95_ms"] is not None:
+                linea += f"   p95 {100 * (datos['p95_ms'] / previo['p95_ms'] - 1):+.1f}%"
+        print(linea)
+    d = r["difusion"]
+    print(f"\n  emitidos {d['emitidos']} | fusionados {d['fusionados']} | recibidos {d['mensajes_recibidos']}")
+    if r["errores"]:
+        print(f"  ⚠️ errores: {r['errores']}")
+
+
+def main():
+    parametros = argumentos()
+    directorio = tempfile.mkdtemp(prefix="competencia_carga_")
+    os.environ["COALESCER_MS"] = str(parametros.coalescer_ms)
+    os.environ["COMPACTAR_CADA"] = str(parametros.compactar_cada)
+
+    try:
+        categorias = preparar_competencia(directorio, parametros.categorias, parametros.participantes,
+                                          random.Random(parametros.semilla))
+        os.chdir(directorio)
+        sys.path.insert(0, directorio)
+        # Los prints del servidor (conexiones, cargas) no son parte del reporte
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            import app as app_modulo
+            carga_s = time.perf_counter() - inicio
+            resultados = correr(app_modulo, parametros, categorias)
+        resultados["carga_inicial_s"] = carga_s
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": sys.version.split()[0],
+        "parametros": {k: v for k, v in vars(parametros).items() if k not in ("salida", "comparar")},
+        "resultados": resultados,
+    }
+
+    anterior = None
+    if parametros.comparar:
+        with open(parametros.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)["resultados"]
+    imprimir(resultado, anterior)
+
+    salida = parametros.salida
+    if salida is None:
+        os.makedirs(RESULTADOS_DIR, exist_ok=True)
+        salida = os.path.join(RESULTADOS_DIR, f"carga_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Levanta varios workers sobre el mismo diario y mide la propagación de cambios.
+
+Cada worker es un proceso `app.py` en su propio puerto (como los workers de
+gunicorn, pero sin compartir el socket de escucha) dentro de una copia
+temporal del proyecto. Se escribe por un worker y se mide cuánto tarda el
+cambio en llegar por Socket.IO a los clientes de todos los workers; al final
+se comprueba que todos sirven exactamente el mismo estado.
+
+Uso: python benchmarks/bench_multiproceso.py [workers] [escrituras]
+"""
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import simple_websocket
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUERTO_BASE = 5200
+CATEGORIA = "varones_overall"
+
+
+def pedir(puerto, ruta, datos=None):
+    cuerpo = json.dumps(datos).encode() if datos is not None else None
+    peticion = urllib.request.Request(
+        f"http://127.0.0.1:{puerto}{ruta}", data=cuerpo,
+        headers={"Content-Type": "application/json"} if cuerpo else {}
+    )
+    with urllib.request.urlopen(peticion, timeout=10) as respuesta:
+        return json.loads(respuesta.read())
+
+
+class ClienteSocket:
+    """Cliente Socket.IO mínimo (Engine.IO v4 sobre websocket) que anota las versiones recibidas"""
+
+    def __init__(self, puerto):
+        self.ws = simple_websocket.Client(f"ws://127.0.0.1:{puerto}/socket.io/?EIO=4&transport=websocket")
+        self.ws.receive()  # paquete "open" de Engine.IO
+        self.ws.send("40")
+        self.versiones = {}
+        self.condicion = threading.Condition()
+        threading.Thread(target=self._escuchar, daemon=True).start()
+        self.ws.send('42' + json.dumps(["suscribir", {"categorias": [CATEGORIA]}]))
+
+    def _escuchar(self):
+        while True:
+            try:
+                paquete = self.ws.receive()
+            except simple_websocket.ConnectionClosed:
+                return
+            if paquete == "2":
+                self.ws.send("3")
+            elif paquete.startswith('42'):
+                evento, mensaje = json.loads(paquete[2:])[:2]
+                if evento == "datos_actualizados":
+                    with self.condicion:
+                        self.versiones[mensaje["version"]] = time.perf_counter()
+                        self.condicion.notify_all()
+
+    def esperar(self, version, limite=5.0):
+        with self.condicion:
+            self.condicion.wait_for(lambda: max(self.versiones, default=0) >= version, limite)
+            return min((t for v, t in self.versiones.items() if v >= version), default=None)
+
+
+def iniciar_workers(directorio, n):
+    procesos = []
+    for i in range(n):
+        entorno = dict(os.environ, WORKERS=str(n), PORT=str(PUERTO_BASE + i), PYTHONUNBUFFERED="1")
+        procesos.append(subprocess.Popen(
+            [sys.executable, "app.py"], cwd=directorio, env=entorno,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+    for i in range(n):
+        for _ in range(200):
+            try:
+                pedir(PUERTO_BASE + i, "/salas")
+                break
+            except OSError:
+                time.sleep(0.05)
+        else:
+            raise RuntimeError(f"El worker {i} no respondió")
+    return procesos
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    escrituras = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    puertos = [PUERTO_BASE + i for i in range(n)]
+
+    directorio = tempfile.mkdtemp(prefix="competencia_")
+    for patron in ("*.py", "*.csv", "index.html"):
+        for archivo in glob.glob(os.path.join(RAIZ, patron)):
+            shutil.copy(archivo, directorio)
+
+    procesos = iniciar_workers(directorio, n)
+    try:
+        clientes = [ClienteSocket(p) for p in puertos]
+        time.sleep(0.2)
+
+        participante = pedir(puertos[0], f"/categoria/{CATEGORIA}")["ranking"][0]
+        latencias = []
+        for k in range(escrituras):
+            inicio = time.perf_counter()
+            pedir(puertos[k % n], "/editar_bw", {"cat_id": CATEGORIA, "id": participante["ID"], "bw": 60 + k % 40})
+            version = pedir(puertos[k % n], f"/categoria/{CATEGORIA}")["version"]
+            llegadas = [c.esperar(version) for c in clientes]
+            if None in llegadas:
+                raise RuntimeError(f"La versión {version} no llegó a todos los workers")
+            latencias.append((max(llegadas) - inicio) * 1000)
+
+        # Escrituras concurrentes repartidas entre todos los workers
+        with ThreadPoolExecutor(max_workers=4 * n) as ejecutor:
+            list(ejecutor.map(
+                lambda k: pedir(puertos[k % n], "/editar_bw", {"cat_id": CATEGORIA, "id": participante["ID"], "bw": 50 + k}),
+                range(escrituras)
+            ))
+
+        estados = [pedir(p, f"/categoria/{CATEGORIA}") for p in puertos]
+        consistente = all(e == estados[0] for e in estados)
+
+        print(f"{n} workers, {escrituras} escrituras secuenciales + {escrituras} concurrentes")
+        print(f"  escritura -> emit en todos los workers (ms): "
+              f"mediana {statistics.median(latencias):.1f}, máx {max(latencias):.1f}")
+        print(f"  versión final {estados[0]['version']}, estado idéntico en todos: {consistente}")
+        if not consistente:
+            sys.exit(1)
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+        for proceso in procesos:
+            proceso.wait()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
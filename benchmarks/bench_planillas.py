@@ -0,0 +1,44 @@
+"""Mide el lector de planillas con csv contra el lector anterior con pandas.
+
+Para cada CSV de FILES_CONFIG mide el tiempo de lectura con cada lector y el
+de importar cada uno en un proceso nuevo. Que ambos entreguen los mismos
+registros lo comprueba tests/test_planillas.py. Requiere pandas instalado.
+
+Uso: python benchmarks/bench_planillas.py [repeticiones]
+"""
+import os
+import subprocess
+import sys
+import timeit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from configuracion import FILES_CONFIG
+from planillas import cargar_csv_pandas, leer_planilla
+
+
+def tiempo_import(modulo):
+    codigo = f"import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(salida.stdout) * 1000
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    os.chdir(RAIZ)
+
+    print(f"{'categoría':<20}{'registros':>10}{'csv (ms)':>12}{'pandas (ms)':>14}")
+    for cat_id, config in FILES_CONFIG.items():
+        argumentos = (config["file"], config["skiprows"], config["col_nombre"])
+        nuevos = list(leer_planilla(*argumentos))
+
+        ms_csv = min(timeit.repeat(lambda: list(leer_planilla(*argumentos)), number=1, repeat=repeticiones)) * 1000
+        ms_pandas = min(timeit.repeat(lambda: cargar_csv_pandas(*argumentos), number=1, repeat=repeticiones)) * 1000
+        print(f"{cat_id:<20}{len(nuevos):>10}{ms_csv:>12.3f}{ms_pandas:>14.3f}")
+
+    print(f"\nimportar planillas: {tiempo_import('planillas'):.1f} ms | importar pandas: {tiempo_import('pandas'):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
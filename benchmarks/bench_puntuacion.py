@@ -0,0 +1,94 @@
+"""Compara la puntuación vectorizada con el cálculo participante por participante.
+
+Uso: python benchmarks/bench_puntuacion.py [participantes] [repeticiones]
+"""
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from participantes import Categoria
+from puntuacion import FORMULAS
+
+CONFIG = {
+    "sexo": "M",
+    "formula": "fuerza_relativa",
+    "movimientos": {
+        "sentadilla": {"intento1": 4, "intento2": 5, "intento3": 6, "valido": 7, "nombre": "Sentadilla", "intentos": 3},
+        "press_banca": {"intento1": 8, "intento2": 9, "intento3": 10, "valido": 11, "nombre": "Press Banca", "intentos": 3},
+        "peso_muerto": {"intento1": 12, "intento2": 13, "intento3": 14, "valido": 15, "nombre": "Peso Muerto", "intentos": 3},
+    }
+}
+
+
+def convertir_a_float(valor):
+    if valor is None or valor == '':
+        return 0.0
+    try:
+        resultado = float(str(valor).strip() or 0)
+        if math.isnan(resultado):
+            return 0.0
+        return resultado
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def fuerza_relativa_por_participante(participante):
+    """Cálculo anterior: un participante a la vez sobre el dict del backup"""
+    bw = convertir_a_float(participante.get("BW"))
+    if bw <= 0:
+        return 0.0
+    suma_pesos = 0.0
+    for mov_config in CONFIG["movimientos"].values():
+        suma_pesos += convertir_a_float(participante.get(f'col_{mov_config["valido"]}'))
+    return round(suma_pesos / bw, 4)
+
+
+def registros_sinteticos(n):
+    random.seed(0)
+    return [
+        {
+            "Nombre": f"Atleta {i}",
+            "Carrera": "Kinesiologia",
+            "BW": round(random.uniform(50, 120), 1),
+            "col_7": random.choice([0, 100, 120, 140, 160]),
+            "col_11": random.choice([0, 60, 80, 100]),
+            "col_15": random.choice([0, 140, 180, 220]),
+        }
+        for i in range(n)
+    ]
+
+
+def medir(funcion, repeticiones):
+    return min(timeit.repeat(funcion, number=1, repeat=repeticiones)) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    registros = registros_sinteticos(n)
+    print(f"{n} participantes, mejor de {repeticiones} repeticiones (ms)")
+
+    ms = medir(lambda: [fuerza_relativa_por_participante(d) for d in registros], repeticiones)
+    print(f"  por participante (dict + convertir_a_float): {ms:8.3f}")
+
+    for formula in FORMULAS:
+        cat = Categoria.desde_registros("bench", dict(CONFIG, formula=formula), registros)
+        ms = medir(cat.motor.puntuar_todos, repeticiones)
+        print(f"  vectorizado {formula:<16}                 {ms:8.3f}")
+
+    cat = Categoria.desde_registros("bench", CONFIG, registros)
+    ms = medir(cat.reindexar, repeticiones)
+    print(f"  vectorizado + reordenar ranking              {ms:8.3f}")
+
+    p = cat.participantes[n // 2]
+    ms = medir(lambda: cat.aplicar({"op": "set", "id": p.id, "campos": {"col_7": random.choice([100, 200])}}), repeticiones)
+    print(f"  cambio de un participante (incremental)      {ms:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import sys
+
+try:
+    from eventlet import patcher
+except ImportError:
+    patcher = None
+
+# ========== BITÁCORA ==========
+#
+# Logging con niveles para el servidor. Los mensajes se dejan en una cola y
+# un hilo del sistema los formatea y escribe en stdout, así una petición no
+# espera a que la consola o el recolector de logs lean. Con eventlet (el
+# worker de gunicorn parchea threading y queue) se usan el hilo y la cola
+# originales para que la escritura no ocupe el hub.
+
+FORMATO_TEXTO = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por mensaje"""
+
+    def format(self, record):
+        linea = {
+            "ts": self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        if record.exc_info:
+            linea["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+def _originales():
+    if patcher is None:
+        import queue
+        import threading
+        return queue, threading
+    return patcher.original('queue'), patcher.original('threading')
+
+
+def _escribir(cola, handler):
+    while True:
+        record = cola.get()
+        if record is None:
+            return
+        handler.handle(record)
+
+
+def configurar(nivel='INFO', formato='texto'):
+    """Envía los logs de la aplicación a stdout a través de una cola"""
+    queue, threading = _originales()
+
+    salida = logging.StreamHandler(sys.stdout)
+    salida.setFormatter(FormatoJSON() if formato == 'json' else logging.Formatter(FORMATO_TEXTO))
+
+    cola = queue.SimpleQueue()
+    hilo = threading.Thread(target=_escribir, args=(cola, salida), name='bitacora', daemon=True)
+    hilo.start()
+
+    def terminar():
+        # Escribe lo que quede en la cola antes de salir
+        cola.put(None)
+        hilo.join(timeout=2)
+
+    atexit.register(terminar)
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            raiz.removeHandler(handler)
+    raiz.addHandler(logging.handlers.QueueHandler(cola))
+    raiz.setLevel(nivel.upper())
@@ -0,0 +1,81 @@
+import unicodedata
+from bisect import bisect_left, insort
+
+# ========== BÚSQUEDA POR NOMBRE Y CARRERA ==========
+#
+# Índice de las palabras de cada nombre (lista ordenada de (palabra, id))
+# para buscar por prefijo con bisect, y conjuntos de IDs por carrera. Los
+# textos se comparan sin mayúsculas, tildes ni espacios sobrantes, así
+# "kinesiología " y "Kinesiologia" son la misma carrera.
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.casefold().split())
+
+
+class IndiceBusqueda:
+
+    def __init__(self):
+        self.palabras = []
+        self.palabras_de = {}
+        self.por_carrera = {}
+        self.carrera_de = {}
+
+    def actualizar(self, p):
+        """Reindexa el nombre y la carrera de un participante"""
+        palabras = tuple(sorted(set(normalizar(p.nombre).split())))
+        anteriores = self.palabras_de.get(p.id)
+        if anteriores != palabras:
+            for palabra in anteriores or ():
+                del self.palabras[bisect_left(self.palabras, (palabra, p.id))]
+            for palabra in palabras:
+                insort(self.palabras, (palabra, p.id))
+            self.palabras_de[p.id] = palabras
+
+        carrera = normalizar(p.carrera)
+        anterior = self.carrera_de.get(p.id)
+        if anterior != carrera:
+            if anterior is not None:
+                self._quitar_carrera(p.id, anterior)
+            self.por_carrera.setdefault(carrera, set()).add(p.id)
+            self.carrera_de[p.id] = carrera
+
+    def quitar(self, p):
+        for palabra in self.palabras_de.pop(p.id, ()):
+            del self.palabras[bisect_left(self.palabras, (palabra, p.id))]
+        carrera = self.carrera_de.pop(p.id, None)
+        if carrera is not None:
+            self._quitar_carrera(p.id, carrera)
+
+    def _quitar_carrera(self, id, carrera):
+        ids = self.por_carrera[carrera]
+        ids.discard(id)
+        if not ids:
+            del self.por_carrera[carrera]
+
+    def reconstruir(self, participantes):
+        self.palabras_de = {p.id: tuple(sorted(set(normalizar(p.nombre).split()))) for p in participantes}
+        self.palabras = sorted((palabra, id) for id, palabras in self.palabras_de.items() for palabra in palabras)
+        self.carrera_de = {p.id: normalizar(p.carrera) for p in participantes}
+        self.por_carrera = {}
+        for id, carrera in self.carrera_de.items():
+            self.por_carrera.setdefault(carrera, set()).add(id)
+
+    def buscar(self, texto):
+        """IDs cuyo nombre tiene, para cada palabra de `texto`, una palabra que empieza con ella"""
+        resultado = None
+        for prefijo in normalizar(texto).split():
+            ids = set()
+            i = bisect_left(self.palabras, (prefijo,))
+            while i < len(self.palabras) and self.palabras[i][0].startswith(prefijo):
+                ids.add(self.palabras[i][1])
+                i += 1
+            resultado = ids if resultado is None else resultado & ids
+        return resultado if resultado is not None else set(self.palabras_de)
+
+    def de_carrera(self, carrera):
+        return self.por_carrera.get(normalizar(carrera), set())
@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+import pickle
+
+log = logging.getLogger(__name__)
+
+# ========== CACHE DE PLANILLAS ==========
+#
+# Guarda en un archivo binario (pickle) los registros ya leídos y
+# normalizados de cada CSV. La clave de cada planilla es su ruta, tamaño,
+# mtime, un hash del contenido y los parámetros de lectura; si coincide,
+# un reinicio no vuelve a parsear el CSV.
+
+# Cambiar si cambia el formato de los registros que produce cargar_csv
+VERSION_FORMATO = 2
+
+
+class CachePlanillas:
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.entradas = None
+        self.modificado = False
+
+    def _cargar(self):
+        self.entradas = {}
+        try:
+            with open(self.archivo, 'rb') as f:
+                contenido = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return
+        if contenido.get("version") == VERSION_FORMATO:
+            self.entradas = contenido["entradas"]
+
+    @staticmethod
+    def clave(ruta, parametros):
+        estado = os.stat(ruta)
+        with open(ruta, 'rb') as f:
+            resumen = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        return (estado.st_size, estado.st_mtime_ns, resumen, tuple(parametros))
+
+    def obtener(self, ruta, parametros, leer):
+        """Registros de la planilla: del cache si la clave coincide, si no `leer()`"""
+        if self.entradas is None:
+            self._cargar()
+
+        ruta_abs = os.path.abspath(ruta)
+        try:
+            clave = self.clave(ruta_abs, parametros)
+        except OSError:
+            return leer()
+
+        entrada = self.entradas.get(ruta_abs)
+        if entrada is not None and entrada[0] == clave:
+            return entrada[1]
+
+        registros = leer()
+        self.registrar(ruta_abs, clave, registros)
+        return registros
+
+    def registrar(self, ruta, clave, registros):
+        """Guarda una lectura con la clave que tenía el archivo antes de leerlo"""
+        if self.entradas is None:
+            self._cargar()
+        self.entradas[os.path.abspath(ruta)] = (clave, registros)
+        self.modificado = True
+
+    def anteriores(self, ruta):
+        """Registros de la última lectura guardada de la planilla, aunque el archivo haya cambiado"""
+        if self.entradas is None:
+            self._cargar()
+        entrada = self.entradas.get(os.path.abspath(ruta))
+        return entrada[1] if entrada is not None else None
+
+    def firma(self, ruta):
+        """(tamaño, mtime) del archivo en la última lectura guardada, o None"""
+        if self.entradas is None:
+            self._cargar()
+        entrada = self.entradas.get(os.path.abspath(ruta))
+        return entrada[0][:2] if entrada is not None else None
+
+    def guardar(self):
+        """Escribe el cache si cambió (tmp + rename, para no dejarlo a medias)"""
+        if not self.modificado:
+            return
+        tmp = self.archivo + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump({"version": VERSION_FORMATO, "entradas": self.entradas}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.archivo)
+            self.modificado = False
+        except OSError as e:
+            log.warning(f"⚠️ No se pudo guardar el cache de planillas: {e}")
@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+
+# ========== CACHE DE RESPUESTAS ==========
+#
+# Guarda los bytes ya serializados (y comprimidos con gzip) de las rutas de
+# lectura, asociados a la versión de la categoría. Mientras la versión no
+# cambie, un GET cuesta una búsqueda en el diccionario; las rutas de
+# escritura invalidan solo las entradas de la categoría modificada.
+
+# Por debajo de este tamaño no vale la pena comprimir
+MIN_GZIP = 1024
+
+
+class EntradaCache:
+    __slots__ = ('version', 'etag', 'cuerpo', 'cuerpo_gzip', 'mimetype')
+
+    def __init__(self, version, cuerpo, mimetype):
+        self.version = version
+        self.cuerpo = cuerpo
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(cuerpo, digest_size=8).hexdigest()
+        self.cuerpo_gzip = gzip.compress(cuerpo, compresslevel=6) if len(cuerpo) >= MIN_GZIP else None
+
+
+def _tamano(entrada):
+    return len(entrada.cuerpo) + len(entrada.cuerpo_gzip or b'')
+
+
+class CacheRespuestas:
+
+    def __init__(self):
+        self.entradas = {}
+        self.por_categoria = {}
+        self.estadisticas = {}
+        # Bytes de todas las entradas (cuerpo y gzip), para la cuenta de memoria
+        self.bytes = 0
+
+    def _contar(self, ruta, campo):
+        stats = self.estadisticas.get(ruta)
+        if stats is None:
+            stats = self.estadisticas[ruta] = {"hits": 0, "misses": 0, "no_modificado": 0}
+        stats[campo] += 1
+
+    def obtener(self, ruta, cat_id, clave, version, generar, mimetype):
+        """Devuelve la entrada vigente para (ruta, clave), generándola si hace falta"""
+        entrada = self.entradas.get(clave)
+        if entrada is not None and entrada.version == version:
+            self._contar(ruta, "hits")
+            return entrada
+
+        self._contar(ruta, "misses")
+        self._quitar(clave)
+        entrada = EntradaCache(version, generar(), mimetype)
+        self.entradas[clave] = entrada
+        self.bytes += _tamano(entrada)
+        self.por_categoria.setdefault(cat_id, set()).add(clave)
+        return entrada
+
+    def contar_no_modificado(self, ruta):
+        self._contar(ruta, "no_modificado")
+
+    def invalidar(self, cat_id):
+        """Descarta todas las respuestas guardadas de una categoría"""
+        for clave in self.por_categoria.pop(cat_id, ()):
+            self._quitar(clave)
+
+    def _quitar(self, clave):
+        entrada = self.entradas.pop(clave, None)
+        if entrada is not None:
+            self.bytes -= _tamano(entrada)
+
+    def resumen(self):
+        total_hits = sum(s["hits"] for s in self.estadisticas.values())
+        total_misses = sum(s["misses"] for s in self.estadisticas.values())
+        total = total_hits + total_misses
+        return {
+            "entradas": len(self.entradas),
+            "bytes": self.bytes,
+            "hits": total_hits,
+            "misses": total_misses,
+            "tasa_hits": round(total_hits / total, 4) if total else 0.0,
+            "rutas": self.estadisticas
+        }
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from cache_respuestas import CacheRespuestas
+from equipos import TablaEquipos
+from participantes import Categorias
+
+log = logging.getLogger(__name__)
+
+# ========== COMPETENCIAS ==========
+#
+# Un mismo servidor atiende varias competencias, cada una con su
+# configuración de categorías, sus planillas, su persistencia y sus caches,
+# y se direcciona con /c/<competencia>/... La principal es la del
+# directorio del proyecto (configuracion.py) y queda siempre cargada. Las
+# demás viven en COMPETENCIAS_DIR/<id>/ junto a un configuracion.json, se
+# cargan la primera vez que alguien las pide y, cuando se pasa el
+# presupuesto de memoria o de cantidad, se descargan las que llevan más
+# tiempo sin usarse. Sus datos quedan en disco y se vuelven a leer si alguien
+# las pide de nuevo.
+
+ARCHIVO_CONFIG = 'configuracion.json'
+ID_VALIDO = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Memoria aproximada (medida con tracemalloc): un participante ya construido
+# con sus índices, y un registro del backup de una categoría sin construir
+BYTES_PARTICIPANTE = 4096
+BYTES_REGISTRO = 1024
+
+
+class Competencia:
+    """Configuración, categorías, persistencia y caches de una competencia"""
+
+    def __init__(self, id, directorio, config, diario, puntos_equipos, alias_carreras):
+        self.id = id
+        self.directorio = directorio
+        # cat_id -> configuración de la categoría (el FILES_CONFIG de la competencia)
+        self.config = config
+        self.diario = diario
+        self.datos = Categorias()
+        self.cache = CacheRespuestas()
+        self.equipos = TablaEquipos(puntos_equipos, alias_carreras)
+        # Últimos próximos levantadores avisados por (cat_id, mov_id)
+        self.ultimo_orden = {}
+        # cat_id -> (tamaño, mtime) de su planilla la última vez que se revisó
+        self.planillas = {}
+        # Ordena, dentro del proceso, las escrituras y la aplicación de cambios de otros workers
+        self.bloqueo = threading.RLock()
+        # Peticiones y tareas usándola ahora; mientras sea > 0 no se descarga
+        self.en_uso = 0
+        self.ultimo_uso = time.monotonic()
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def memoria(self):
+        """Bytes aproximados que ocupa: participantes, registros sin construir y cache de respuestas"""
+        participantes = sum(len(cat) for cat in self.datos.cargadas.values())
+        registros = sum(len(pendiente[1]) for pendiente in self.datos.pendientes.values())
+        return participantes * BYTES_PARTICIPANTE + registros * BYTES_REGISTRO + self.cache.bytes
+
+    def cerrar(self):
+        self.diario.cerrar()
+
+
+class Competencias:
+    """Competencias disponibles; mantiene en memoria las usadas más recientemente"""
+
+    def __init__(self, directorio, abrir, memoria_max, maximo):
+        self.directorio = directorio
+        # abrir(id, directorio, config) -> Competencia con sus datos ya cargados
+        self.abrir = abrir
+        self.memoria_max = memoria_max
+        self.maximo = maximo
+        # De la menos a la más recientemente usada
+        self.cargadas = OrderedDict()
+        self.fijas = set()
+        self.cargas = 0
+        self.descargas = 0
+        self._bloqueo_carga = threading.RLock()
+
+    def fijar(self, comp):
+        """Agrega una competencia que nunca se descarga (la principal)"""
+        self.cargadas[comp.id] = comp
+        self.fijas.add(comp.id)
+
+    def leer_config(self, id):
+        """Contenido de COMPETENCIAS_DIR/<id>/configuracion.json, o None si no existe"""
+        if not ID_VALIDO.match(id):
+            return None
+        try:
+            with open(os.path.join(self.directorio, id, ARCHIVO_CONFIG), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def disponibles(self):
+        ids = set(self.cargadas)
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            nombres = []
+        for nombre in nombres:
+            if ID_VALIDO.match(nombre) and os.path.isfile(os.path.join(self.directorio, nombre, ARCHIVO_CONFIG)):
+                ids.add(nombre)
+        return sorted(ids)
+
+    def obtener(self, id):
+        """La competencia `id`, cargándola si hace falta; None si no existe"""
+        comp = self.cargadas.get(id)
+        if comp is None:
+            with self._bloqueo_carga:
+                # Otra petición pudo cargarla mientras esperábamos
+                comp = self.cargadas.get(id)
+                if comp is None:
+                    config = self.leer_config(id)
+                    if config is None:
+                        return None
+                    inicio = time.perf_counter()
+                    comp = self.abrir(id, os.path.join(self.directorio, id), config)
+                    self.cargadas[id] = comp
+                    self.cargas += 1
+                    log.info(f"📂 Competencia '{id}' cargada en {time.perf_counter() - inicio:.3f} s")
+                    self.descargar(excepto=id)
+        self.cargadas.move_to_end(id)
+        comp.ultimo_uso = time.monotonic()
+        return comp
+
+    def memoria(self):
+        return sum(comp.memoria() for comp in self.cargadas.values())
+
+    def _excedido(self):
+        return len(self.cargadas) > self.maximo or self.memoria() > self.memoria_max
+
+    def descargar(self, excepto=None):
+        """Saca de memoria las menos usadas mientras se pase del presupuesto"""
+        for id, comp in list(self.cargadas.items()):
+            if not self._excedido():
+                return
+            if id in self.fijas or id == excepto or comp.en_uso:
+                continue
+            del self.cargadas[id]
+            comp.cerrar()
+            self.descargas += 1
+            log.info(f"📤 Competencia '{id}' descargada de memoria "
+                     f"(sin uso hace {time.monotonic() - comp.ultimo_uso:.0f} s)")
+
+    def resumen(self):
+        return {
+            "disponibles": self.disponibles(),
+            "cargadas": [
+                {"id": comp.id, "memoria_bytes": comp.memoria(), "en_uso": comp.en_uso,
+                 "categorias_construidas": len(comp.datos.cargadas),
+                 "sin_uso_segundos": round(time.monotonic() - comp.ultimo_uso, 1),
+                 "fija": comp.id in self.fijas}
+                for comp in reversed(self.cargadas.values())
+            ],
+            "memoria_bytes": self.memoria(),
+            "memoria_max_bytes": self.memoria_max,
+            "maximo": self.maximo,
+            "cargas": self.cargas,
+            "descargas": self.descargas,
+        }
@@ -0,0 +1,122 @@
+# --- CONFIGURACIÓN CON MOVIMIENTOS ---
+# "formula": fuerza_relativa (total / BW), wilks, dots o ipf_gl (ver puntuacion.py).
+# "sexo" ("F"/"M") elige los coeficientes de las fórmulas que lo usan.
+FILES_CONFIG = {
+    "damas_iniciantes": {
+        "file": "damas_iniciantes.csv",
+        "sexo": "F",
+        "formula": "fuerza_relativa",
+        "skiprows": 3,
+        "col_nombre": 1,
+        "movimientos": {
+            "peso_muerto": {
+                "intento1": 4, "intento2": 5, "valido": 6,
+                "nombre": "Peso Muerto", "intentos": 2
+            }
+        }
+    },
+    "damas_avanzadas": {
+        "file": "damas_avanzadas.csv",
+        "sexo": "F",
+        "formula": "fuerza_relativa",
+        "skiprows": 4,
+        "col_nombre": 1,
+        "movimientos": {
+            "sentadilla": {
+                "intento1": 4, "intento2": 5, "valido": 6,
+                "nombre": "Sentadilla", "intentos": 2
+            },
+            "peso_muerto": {
+                "intento1": 7, "intento2": 8, "valido": 9,
+                "nombre": "Peso Muerto", "intentos": 2
+            }
+        }
+    },
+    "damas_overall": {
+        "file": "damas_overall.csv",
+        "sexo": "F",
+        "formula": "fuerza_relativa",
+        "skiprows": 3,
+        "col_nombre": 1,
+        "movimientos": {
+            "sentadilla": {
+                "intento1": 4, "intento2": 5, "intento3": 6, "valido": 7,
+                "nombre": "Sentadilla", "intentos": 3
+            },
+            "press_banca": {
+                "intento1": 8, "intento2": 9, "intento3": 10, "valido": 11,
+                "nombre": "Press Banca", "intentos": 3
+            },
+            "peso_muerto": {
+                "intento1": 12, "intento2": 13, "intento3": 14, "valido": 15,
+                "nombre": "Peso Muerto", "intentos": 3
+            }
+        }
+    },
+    "varones_iniciantes": {
+        "file": "varones_iniciantes.csv",
+        "sexo": "M",
+        "formula": "fuerza_relativa",
+        "skiprows": 3,
+        "col_nombre": 1,
+        "movimientos": {
+            "peso_muerto": {
+                "intento1": 4, "intento2": 5, "valido": 6,
+                "nombre": "Peso Muerto", "intentos": 2
+            }
+        }
+    },
+    "varones_avanzados": {
+        "file": "varones_avanzados.csv",
+        "sexo": "M",
+        "formula": "fuerza_relativa",
+        "skiprows": 3,
+        "col_nombre": 1,
+        "movimientos": {
+            "press_banca": {
+                "intento1": 4, "intento2": 5, "valido": 6,
+                "nombre": "Press Banca", "intentos": 2
+            },
+            "peso_muerto": {
+                "intento1": 7, "intento2": 8, "valido": 9,
+                "nombre": "Peso Muerto", "intentos": 2
+            }
+        }
+    },
+    "varones_overall": {
+        "file": "varones_overall.csv",
+        "sexo": "M",
+        "formula": "fuerza_relativa",
+        "skiprows": 3,
+        "col_nombre": 1,
+        "movimientos": {
+            "sentadilla": {
+                "intento1": 4, "intento2": 5, "intento3": 6, "valido": 7,
+                "nombre": "Sentadilla", "intentos": 3
+            },
+            "press_banca": {
+                "intento1": 8, "intento2": 9, "intento3": 10, "valido": 11,
+                "nombre": "Press Banca", "intentos": 3
+            },
+            "peso_muerto": {
+                "intento1": 12, "intento2": 13, "intento3": 14, "valido": 15,
+                "nombre": "Peso Muerto", "intentos": 3
+            }
+        }
+    }
+}
+
+# --- CLASIFICACIÓN POR EQUIPOS (ver equipos.py) ---
+# Puntos por lugar en el ranking de cada categoría: 1er lugar, 2do lugar, ...
+PUNTOS_EQUIPOS = [12, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+# Nombre de cada equipo y las variantes con que aparece en la columna Carrera.
+# Mayúsculas, tildes y espacios ya se ignoran; aquí van las faltas de ortografía.
+ALIAS_CARRERAS = {
+    "Kinesiología": ["kinesilogia", "kinesilologia"],
+    "Física": ["fisica", "lic. fisica"],
+    "Pedagogía en Educación Física": ["ped. fisica", "ped fisica"],
+    "Bioquímica": ["bioquimica"],
+    "Pedagogía en Biología": ["pd biologia", "ped. biologia"],
+    "Tecnología Médica": ["tec. medica", "tec medica"],
+}
@@ -0,0 +1,118 @@
+from itertools import islice
+
+from busqueda import normalizar
+
+# ========== CLASIFICACIÓN POR EQUIPOS ==========
+#
+# Cada carrera es un equipo y suma los puntos de los lugares que sus
+# participantes ocupan en el ranking de cada categoría (tabla PUNTOS_EQUIPOS
+# de configuracion.py). Se guarda el aporte de cada categoría, {equipo:
+# lugares}, y los totales por equipo: un cambio en una categoría vuelve a
+# leer solo los primeros lugares de su ranking y resta el aporte anterior y
+# suma el nuevo, sin recorrer las demás categorías.
+#
+# Un participante sin carrera o sin puntaje ocupa igual su lugar, pero no
+# suma puntos para nadie.
+
+
+class TablaEquipos:
+
+    def __init__(self, puntos, alias=None):
+        # Puntos del 1er, 2do, ... lugar; desde ahí en adelante no se suma
+        self.puntos = tuple(puntos)
+        # Variante normalizada -> nombre del equipo
+        self.alias = {}
+        for nombre, variantes in (alias or {}).items():
+            for variante in (nombre, *variantes):
+                self.alias[normalizar(variante)] = nombre
+        self.aportes = {}
+        self.totales = {}
+        self.iniciada = False
+        self.version = 0
+        self._tabla = None
+
+    def equipo(self, carrera):
+        """Nombre del equipo de una carrera, o None si viene vacía"""
+        clave = normalizar(carrera)
+        if not clave:
+            return None
+        return self.alias.get(clave) or clave.title()
+
+    def aporte(self, cat):
+        """Lugares que puntúan en la categoría, agrupados por equipo"""
+        lugares = {}
+        for lugar, p, puntaje in islice(cat.ranking, len(self.puntos)):
+            if puntaje <= 0:
+                break
+            equipo = self.equipo(p.carrera)
+            if equipo is not None:
+                lugares.setdefault(equipo, []).append(lugar)
+        return {equipo: tuple(l) for equipo, l in lugares.items()}
+
+    def iniciar(self, categorias):
+        """Suma todas las categorías; después solo se actualizan las que cambian"""
+        self.aportes = {}
+        self.totales = {}
+        for cat in categorias:
+            self.actualizar(cat)
+        self.iniciada = True
+        self.version += 1
+        self._tabla = None
+
+    def actualizar(self, cat):
+        """Reemplaza el aporte de la categoría; devuelve True si la clasificación cambió"""
+        nuevo = self.aporte(cat)
+        anterior = self.aportes.get(cat.id, {})
+        if nuevo == anterior:
+            return False
+        for equipo, lugares in anterior.items():
+            self._sumar(equipo, lugares, -1)
+        for equipo, lugares in nuevo.items():
+            self._sumar(equipo, lugares, 1)
+        if nuevo:
+            self.aportes[cat.id] = nuevo
+        else:
+            self.aportes.pop(cat.id, None)
+        self.version += 1
+        self._tabla = None
+        return True
+
+    def quitar(self, cat_id):
+        for equipo, lugares in self.aportes.pop(cat_id, {}).items():
+            self._sumar(equipo, lugares, -1)
+        self.version += 1
+        self._tabla = None
+
+    def _sumar(self, equipo, lugares, signo):
+        total = self.totales.get(equipo)
+        if total is None:
+            # [puntos, veces 1ro, veces 2do, ...]
+            total = self.totales[equipo] = [0] * (len(self.puntos) + 1)
+        for lugar in lugares:
+            total[0] += signo * self.puntos[lugar - 1]
+            total[lugar] += signo
+        if not any(total[1:]):
+            del self.totales[equipo]
+
+    def tabla(self):
+        """Clasificación de mayor a menor puntaje; empatan los que tienen más primeros lugares, luego segundos..."""
+        if self._tabla is None:
+            por_categoria = {}
+            for cat_id, aporte in self.aportes.items():
+                for equipo, lugares in aporte.items():
+                    por_categoria.setdefault(equipo, {})[cat_id] = sum(self.puntos[l - 1] for l in lugares)
+            orden = sorted(self.totales.items(), key=lambda e: ([-n for n in e[1]], e[0]))
+            self._tabla = [
+                {
+                    "Lugar": lugar,
+                    "Carrera": equipo,
+                    "Puntos": total[0],
+                    "Lugares": total[1:],
+                    "Categorias": por_categoria[equipo]
+                }
+                for lugar, (equipo, total) in enumerate(orden, start=1)
+            ]
+        return self._tabla
+
+    def resumen(self):
+        return {"version": self.version, "puntos": list(self.puntos), "equipos": self.tabla()}
@@ -0,0 +1,89 @@
+import csv
+import io
+import zipfile
+
+# ========== EXPORTACIÓN COMPLETA ==========
+#
+# Todos los intentos, resultados de jueces y pesos válidos de cada
+# participante, en orden de ranking. Las filas se generan de a una y se
+# entregan a la respuesta a medida que se escriben, tanto en un CSV por
+# categoría como en un ZIP con todas las categorías.
+
+
+def columnas(cat):
+    encabezado = ['Lugar', 'ID', 'ID_Planilla', 'Nombre', 'Carrera', 'BW']
+    for mov in cat.movimientos.values():
+        for i in range(1, mov.intentos + 1):
+            encabezado += [f'{mov.nombre} {i}', f'{mov.nombre} {i} Resultado']
+        encabezado.append(f'{mov.nombre} Válido')
+    encabezado += ['Total', 'Puntaje']
+    return encabezado
+
+
+def filas(cat):
+    """Una fila por participante, de mayor a menor puntaje"""
+    movimientos = list(cat.movimientos.values())
+    # Se fija el orden antes de empezar: un cambio durante la descarga no
+    # debe saltarse ni repetir participantes
+    for lugar, p, puntaje in list(cat.ranking):
+        fila = [lugar, p.id, p.id_planilla, p.nombre, p.carrera, p.bw]
+        total = 0.0
+        for mov in movimientos:
+            for i in range(1, mov.intentos + 1):
+                fila += [mov.peso(p, i), mov.resultado(p, i)]
+            valido = mov.valido(p)
+            fila.append(valido)
+            total += valido
+        fila += [total, puntaje]
+        yield fila
+
+
+def lineas_csv(cat):
+    """Líneas del CSV de la categoría ya codificadas, una por fila"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columnas(cat))
+    yield buffer.getvalue().encode('utf-8')
+
+    for fila in filas(cat):
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(fila)
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _Tuberia:
+    """Destino sin seek para ZipFile: junta lo escrito para entregarlo por partes
+    y, si hay `copia`, lo escribe también ahí"""
+
+    def __init__(self, copia=None):
+        self.partes = []
+        self.copia = copia
+
+    def write(self, datos):
+        if datos:
+            self.partes.append(bytes(datos))
+            if self.copia is not None:
+                self.copia.write(datos)
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def zip_categorias(categorias, copia=None):
+    """Genera un ZIP con un CSV por categoría, por partes; `copia` recibe los mismos bytes"""
+    tuberia = _Tuberia(copia)
+    with zipfile.ZipFile(tuberia, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for cat in categorias:
+            with zf.open(f'{cat.id}.csv', 'w') as destino:
+                for linea in lineas_csv(cat):
+                    destino.write(linea)
+                    if tuberia.partes:
+                        yield tuberia.vaciar()
+    yield tuberia.vaciar()
@@ -0,0 +1,81 @@
+from html import escape
+
+# ========== FRAGMENTOS HTML PARA PANTALLAS ==========
+#
+# Tablas ya armadas para las pantallas del recinto (pantalla.html): el
+# ranking y la tabla de cada movimiento de una categoría, sin botones ni
+# campos de edición. Se generan en el servidor una vez por versión de la
+# categoría y se sirven desde el cache de respuestas, así todas las
+# pantallas reciben los mismos bytes y solo tienen que reemplazar el
+# contenido de un elemento.
+
+ETIQUETAS_ORDEN = ('🏋️ En plataforma', '⏭️ En espera', '🔜 Preparándose')
+
+
+def _texto(valor, vacio='-'):
+    return escape(str(valor)) if valor else vacio
+
+
+def _peso(valor, vacio='-'):
+    # 100.0 -> "100", 102.5 -> "102.5"
+    return f'{valor:g}' if valor and valor > 0 else vacio
+
+
+def ranking(cat):
+    filas = []
+    for lugar, p, puntaje in cat.ranking:
+        filas.append(
+            f'<tr><td class="lugar">{lugar}</td><td>{_texto(p.nombre)}</td><td>{_texto(p.carrera)}</td>'
+            f'<td>{p.bw:.1f}</td><td class="puntaje">{puntaje:.4f}</td></tr>'
+        )
+    if not filas:
+        filas.append('<tr><td colspan="5" class="vacio">Sin datos</td></tr>')
+    return (
+        f'<table class="ranking" data-categoria="{escape(cat.id)}" data-version="{cat.version}">'
+        '<thead><tr><th>Lugar</th><th>Nombre</th><th>Carrera</th><th>BW</th><th>Puntaje</th></tr></thead>'
+        f'<tbody>{"".join(filas)}</tbody></table>'
+    )
+
+
+def _orden(orden):
+    if not orden["siguientes"]:
+        if orden["sin_declarar"] > 0:
+            return f'⏳ {orden["sin_declarar"]} sin peso declarado'
+        return '✅ Sin intentos pendientes'
+    return ' | '.join(
+        f'{ETIQUETAS_ORDEN[i] if i < len(ETIQUETAS_ORDEN) else f"{i + 1}."}: '
+        f'<b>{_texto(s["Nombre"])}</b> {_peso(s["Peso"])} kg (intento {s["Intento"]})'
+        for i, s in enumerate(orden["siguientes"])
+    )
+
+
+def _resultado(resultado):
+    if resultado == "exito":
+        return '<td class="exito">✔</td>'
+    if resultado == "fallo":
+        return '<td class="fallo">✘</td>'
+    return '<td></td>'
+
+
+def movimiento(cat, mov, orden):
+    """Tabla del movimiento en orden de levantamiento, con los próximos levantadores arriba"""
+    _, participantes = cat.consultar("turno", mov_id=mov.id)
+    filas = []
+    for lugar, p in enumerate(participantes, start=1):
+        celdas = [f'<td class="lugar">{lugar}</td><td>{_texto(p.nombre)}</td><td>{p.bw:.1f}</td>']
+        for i in range(1, mov.intentos + 1):
+            celdas.append(f'<td>{_peso(mov.peso(p, i), "")}</td>{_resultado(mov.resultado(p, i))}')
+        celdas.append(f'<td class="mejor">{_peso(mov.valido(p))}</td>')
+        filas.append(f'<tr>{"".join(celdas)}</tr>')
+    if not filas:
+        filas.append(f'<tr><td colspan="{4 + 2 * mov.intentos}" class="vacio">Sin datos</td></tr>')
+
+    encabezado = ''.join(f'<th>Int {i}</th><th>Res {i}</th>' for i in range(1, mov.intentos + 1))
+    return (
+        f'<div class="movimiento" data-categoria="{escape(cat.id)}" data-movimiento="{escape(mov.id)}" '
+        f'data-version="{cat.version}">'
+        f'<div class="titulo">{escape(mov.nombre)}</div>'
+        f'<div class="orden">{_orden(orden)}</div>'
+        f'<table><thead><tr><th>Orden</th><th>Nombre</th><th>BW</th>{encabezado}<th>Mejor</th></tr></thead>'
+        f'<tbody>{"".join(filas)}</tbody></table></div>'
+    )
@@ -0,0 +1,373 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from busqueda import normalizar
+
+# ========== HISTORIAL DE COMPETENCIAS ==========
+#
+# Base SQLite con el mejor peso válido de cada atleta en cada movimiento de
+# cada competencia archivada. Se llena importando backups
+# (competencia_backup.json con su diario) o exportaciones (los CSV de
+# /descargar/<cat_id>/intentos o el ZIP de /descargar/competencia.zip), o
+# archivando una competencia cargada. Las consultas de mejores marcas,
+# progresión, tendencia por carrera y récords van por índices sobre el
+# nombre normalizado del atleta, la carrera normalizada, el movimiento y la
+# fecha.
+#
+# Los récords (mejor marca por movimiento y sexo) se leen una vez y quedan
+# en memoria; cada cambio de un peso válido en una competencia en curso se
+# compara solo con el récord de su movimiento. Un récord batido en vivo se
+# guarda aparte (tabla records_en_vivo, así sobrevive a un reinicio) hasta
+# que esa competencia se archive.
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS competencias (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    origen TEXT,
+    importada TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS marcas (
+    competencia TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    atleta TEXT NOT NULL,
+    atleta_norm TEXT NOT NULL,
+    carrera TEXT,
+    carrera_norm TEXT NOT NULL DEFAULT '',
+    sexo TEXT NOT NULL DEFAULT '',
+    bw REAL NOT NULL DEFAULT 0,
+    movimiento TEXT NOT NULL,
+    peso REAL NOT NULL,
+    fecha TEXT NOT NULL,
+    PRIMARY KEY (competencia, categoria, atleta_norm, movimiento)
+);
+CREATE INDEX IF NOT EXISTS marcas_atleta ON marcas (atleta_norm, movimiento, fecha);
+CREATE INDEX IF NOT EXISTS marcas_carrera ON marcas (carrera_norm, movimiento, fecha);
+CREATE INDEX IF NOT EXISTS marcas_record ON marcas (movimiento, sexo, peso DESC, fecha);
+CREATE INDEX IF NOT EXISTS marcas_fecha ON marcas (fecha);
+CREATE TABLE IF NOT EXISTS records_en_vivo (
+    movimiento TEXT NOT NULL,
+    sexo TEXT NOT NULL,
+    competencia TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    atleta TEXT NOT NULL,
+    carrera TEXT,
+    bw REAL NOT NULL DEFAULT 0,
+    peso REAL NOT NULL,
+    fecha TEXT NOT NULL,
+    anterior TEXT NOT NULL,
+    PRIMARY KEY (movimiento, sexo)
+);
+"""
+
+COLUMNAS_MARCA = ("competencia", "categoria", "atleta", "atleta_norm", "carrera", "carrera_norm",
+                  "sexo", "bw", "movimiento", "peso", "fecha")
+COLUMNAS_EN_VIVO = ("movimiento", "sexo", "competencia", "categoria", "id", "atleta", "carrera",
+                    "bw", "peso", "fecha", "anterior")
+
+
+def _sin_equipo(carrera):
+    return carrera or None
+
+
+class Historial:
+
+    def __init__(self, archivo, equipo=None):
+        self.archivo = archivo
+        # Nombre canónico de una carrera (TablaEquipos.equipo), para que las variantes coincidan
+        self.equipo = equipo or _sin_equipo
+        self.conexion = sqlite3.connect(archivo, isolation_level=None, check_same_thread=False)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.executescript(ESQUEMA)
+        self._bloqueo = threading.Lock()
+        # (movimiento, sexo) -> récord archivado; se lee en el primer uso
+        self._records = None
+        # (movimiento, sexo) -> récord batido en una competencia en curso
+        self.en_vivo = {
+            (fila["movimiento"], fila["sexo"]): dict(fila, en_vivo=True, anterior=json.loads(fila["anterior"]))
+            for fila in self.conexion.execute(f"SELECT {', '.join(COLUMNAS_EN_VIVO)} FROM records_en_vivo")
+        }
+
+    @contextmanager
+    def _transaccion(self):
+        with self._bloqueo:
+            cur = self.conexion.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+
+    def cerrar(self):
+        self.conexion.close()
+
+    # --- Importación ---
+
+    def importar(self, id, nombre, fecha, origen, marcas):
+        """Reemplaza las marcas de la competencia `id`; devuelve cuántas quedaron.
+
+        `marcas` son tuplas (categoria, atleta, carrera, sexo, bw, movimiento, peso).
+        """
+        filas = []
+        for categoria, atleta, carrera, sexo, bw, movimiento, peso in marcas:
+            if not atleta or not peso or peso <= 0:
+                continue
+            carrera = self.equipo(carrera)
+            filas.append((id, categoria, atleta, normalizar(atleta), carrera, normalizar(carrera),
+                          sexo or '', bw or 0.0, movimiento, peso, fecha))
+
+        with self._transaccion() as cur:
+            cur.execute("DELETE FROM marcas WHERE competencia = ?", (id,))
+            cur.execute("DELETE FROM records_en_vivo WHERE competencia = ?", (id,))
+            cur.execute("INSERT INTO competencias (id, nombre, fecha, origen, importada) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET nombre = excluded.nombre, fecha = excluded.fecha, "
+                        "origen = excluded.origen, importada = excluded.importada",
+                        (id, nombre, fecha, origen, datetime.now().isoformat(timespec='seconds')))
+            # Un mismo atleta repetido en la planilla deja su mejor marca
+            cur.executemany(f"INSERT INTO marcas ({', '.join(COLUMNAS_MARCA)}) VALUES ({', '.join('?' * 11)}) "
+                            "ON CONFLICT (competencia, categoria, atleta_norm, movimiento) DO UPDATE SET "
+                            "peso = excluded.peso, bw = excluded.bw "
+                            "WHERE excluded.peso > marcas.peso", filas)
+        self._records = None
+        # Los récords en vivo de la competencia pasan a ser marcas archivadas
+        self.en_vivo = {clave: r for clave, r in self.en_vivo.items() if r["competencia"] != id}
+        return self.conexion.execute("SELECT COUNT(*) FROM marcas WHERE competencia = ?", (id,)).fetchone()[0]
+
+    def competencias(self):
+        return [dict(fila) for fila in self.conexion.execute(
+            "SELECT c.id, c.nombre, c.fecha, c.origen, c.importada, COUNT(m.peso) AS marcas "
+            "FROM competencias c LEFT JOIN marcas m ON m.competencia = c.id "
+            "GROUP BY c.id ORDER BY c.fecha, c.id")]
+
+    # --- Consultas ---
+
+    def mejores(self, atleta):
+        """Mejor marca del atleta en cada movimiento, con la competencia donde la hizo"""
+        filas = self.conexion.execute(
+            "SELECT movimiento, peso, bw, competencia, categoria, fecha, atleta, carrera FROM marcas "
+            "WHERE atleta_norm = ? ORDER BY movimiento, peso DESC, fecha", (normalizar(atleta),))
+        mejores = {}
+        for fila in filas:
+            if fila["movimiento"] not in mejores:
+                mejores[fila["movimiento"]] = dict(fila)
+        return mejores
+
+    def progresion(self, atleta, movimiento=None):
+        """Marcas del atleta por fecha, agrupadas por movimiento"""
+        consulta = ("SELECT movimiento, fecha, competencia, categoria, peso, bw FROM marcas "
+                    "WHERE atleta_norm = ?")
+        parametros = [normalizar(atleta)]
+        if movimiento:
+            consulta += " AND movimiento = ?"
+            parametros.append(movimiento)
+        progresion = {}
+        for fila in self.conexion.execute(consulta + " ORDER BY movimiento, fecha", parametros):
+            progresion.setdefault(fila["movimiento"], []).append(
+                {clave: fila[clave] for clave in ("fecha", "competencia", "categoria", "peso", "bw")})
+        return progresion
+
+    def tendencia_carrera(self, carrera, movimiento=None):
+        """Por movimiento y competencia: atletas de la carrera, mejor marca y promedio"""
+        consulta = ("SELECT movimiento, fecha, competencia, COUNT(*) AS atletas, MAX(peso) AS mejor, "
+                    "ROUND(AVG(peso), 2) AS promedio FROM marcas WHERE carrera_norm = ?")
+        parametros = [normalizar(self.equipo(carrera))]
+        if movimiento:
+            consulta += " AND movimiento = ?"
+            parametros.append(movimiento)
+        tendencia = {}
+        for fila in self.conexion.execute(
+                consulta + " GROUP BY movimiento, fecha, competencia ORDER BY movimiento, fecha", parametros):
+            tendencia.setdefault(fila["movimiento"], []).append(
+                {clave: fila[clave] for clave in ("fecha", "competencia", "atletas", "mejor", "promedio")})
+        return tendencia
+
+    def records(self):
+        """Récords archivados por (movimiento, sexo); el primero en lograr el peso lo conserva"""
+        if self._records is None:
+            records = {}
+            for fila in self.conexion.execute(
+                    "SELECT movimiento, sexo, peso, atleta, carrera, bw, competencia, categoria, fecha "
+                    "FROM marcas ORDER BY movimiento, sexo, peso DESC, fecha"):
+                clave = (fila["movimiento"], fila["sexo"])
+                if clave not in records:
+                    records[clave] = dict(fila, en_vivo=False)
+            self._records = records
+        return self._records
+
+    def tabla_records(self, movimiento=None, sexo=None):
+        """Récord vigente de cada movimiento y sexo, contando los batidos en vivo"""
+        vigentes = dict(self.records())
+        vigentes.update(self.en_vivo)
+        return [
+            r for (mov, sx), r in sorted(vigentes.items())
+            if (movimiento is None or mov == movimiento) and (sexo is None or sx == sexo)
+        ]
+
+    # --- Competencia en curso ---
+
+    def comprobar(self, comp_id, cat, p, fecha=None):
+        """Compara los pesos válidos del participante con los récords; devuelve los récords batidos.
+
+        Si el participante tenía un récord en vivo y su peso bajó (se borró un
+        intento), vuelve a regir el récord archivado.
+        """
+        sexo = cat.config.get("sexo") or ''
+        records = self.records()
+        batidos = []
+        for mov_id, mov in cat.movimientos.items():
+            clave = (mov_id, sexo)
+            peso = mov.valido(p)
+            vivo = self.en_vivo.get(clave)
+            if vivo is not None and (vivo["competencia"], vivo["categoria"], vivo["id"]) == (comp_id, cat.id, p.id):
+                if peso < vivo["peso"]:
+                    del self.en_vivo[clave]
+                    self._borrar_en_vivo(clave)
+                    vivo = None
+                elif peso == vivo["peso"]:
+                    continue
+            vigente = vivo or records.get(clave)
+            # Sin marcas archivadas del movimiento no hay récord que batir
+            if vigente is None or peso <= vigente["peso"]:
+                continue
+            record = {
+                "movimiento": mov_id, "sexo": sexo, "peso": peso, "atleta": p.nombre,
+                "carrera": self.equipo(p.carrera), "bw": p.bw, "competencia": comp_id, "categoria": cat.id,
+                "fecha": fecha or date.today().isoformat(), "en_vivo": True, "id": p.id,
+                "anterior": {k: vigente[k] for k in ("peso", "atleta", "competencia", "fecha")},
+            }
+            self.en_vivo[clave] = record
+            self._guardar_en_vivo(record)
+            batidos.append(record)
+        return batidos
+
+    def _guardar_en_vivo(self, record):
+        fila = [record[k] for k in COLUMNAS_EN_VIVO[:-1]] + [json.dumps(record["anterior"])]
+        # Otro worker que reaplica el mismo cambio del diario escribe la misma fila
+        with self._transaccion() as cur:
+            cur.execute(f"INSERT OR REPLACE INTO records_en_vivo ({', '.join(COLUMNAS_EN_VIVO)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNAS_EN_VIVO))})", fila)
+
+    def _borrar_en_vivo(self, clave):
+        with self._transaccion() as cur:
+            cur.execute("DELETE FROM records_en_vivo WHERE movimiento = ? AND sexo = ?", clave)
+
+
+# ========== LECTURA DE BACKUPS Y EXPORTACIONES ==========
+
+def marcas_de_categorias(categorias):
+    """Mejor peso válido de cada participante en cada movimiento de las categorías"""
+    for cat in categorias:
+        sexo = cat.config.get("sexo")
+        for p in cat:
+            for mov_id, mov in cat.movimientos.items():
+                yield cat.id, p.nombre, p.carrera, sexo, p.bw, mov_id, mov.valido(p)
+
+
+def leer_backup(archivo, files_config):
+    """Categorías de un competencia_backup.json, con su diario reaplicado"""
+    from participantes import Categoria
+    from persistencia import Diario
+
+    snapshot, registros = Diario(archivo).cargar()
+    datos = {
+        cat_id: Categoria.desde_registros(cat_id, files_config[cat_id], lista)
+        for cat_id, lista in snapshot.items() if cat_id in files_config
+    }
+    for registro in registros:
+        for cambio in registro["cambios"] if registro["op"] == "lote" else [registro]:
+            if cambio.get("cat") in datos:
+                datos[cambio["cat"]].aplicar(cambio)
+    return list(datos.values())
+
+
+def marcas_de_csv(cat_id, texto, files_config):
+    """Marcas del CSV de intentos de una categoría (exportacion.lineas_csv).
+
+    La columna '<Movimiento> Válido' se asocia al movimiento por su nombre en
+    FILES_CONFIG; si la categoría no está configurada, el id del movimiento
+    se arma a partir del nombre.
+    """
+    config = files_config.get(cat_id, {})
+    por_nombre = {normalizar(mov["nombre"]): mov_id for mov_id, mov in config.get("movimientos", {}).items()}
+    sufijo = ' Válido'
+    for fila in csv.DictReader(io.StringIO(texto)):
+        for columna, valor in fila.items():
+            if not columna or not columna.endswith(sufijo):
+                continue
+            nombre_mov = normalizar(columna[:-len(sufijo)])
+            mov_id = por_nombre.get(nombre_mov, nombre_mov.replace(' ', '_'))
+            try:
+                peso = float(valor or 0)
+                bw = float(fila.get("BW") or 0)
+            except ValueError:
+                continue
+            yield cat_id, fila.get("Nombre"), fila.get("Carrera") or None, config.get("sexo"), bw, mov_id, peso
+
+
+def leer_exportacion(archivo, files_config):
+    """Marcas de un CSV de intentos (<cat_id>.csv o intentos_<cat_id>_<fecha>.csv) o del ZIP de la competencia"""
+    if zipfile.is_zipfile(archivo):
+        with zipfile.ZipFile(archivo) as zf:
+            for nombre in zf.namelist():
+                if nombre.endswith('.csv'):
+                    texto = zf.read(nombre).decode('utf-8-sig')
+                    yield from marcas_de_csv(os.path.splitext(os.path.basename(nombre))[0], texto, files_config)
+        return
+    cat_id = os.path.splitext(os.path.basename(archivo))[0]
+    if cat_id.startswith('intentos_'):
+        cat_id = cat_id[len('intentos_'):].rsplit('_', 1)[0]
+    with open(archivo, 'r', encoding='utf-8-sig') as f:
+        yield from marcas_de_csv(cat_id, f.read(), files_config)
+
+
+if __name__ == "__main__":
+    # Uso: python historial.py <backup.json | export.zip | intentos.csv>... --id ID [--fecha AAAA-MM-DD]
+    from configuracion import ALIAS_CARRERAS, FILES_CONFIG, PUNTOS_EQUIPOS
+    from equipos import TablaEquipos
+
+    parser = argparse.ArgumentParser(description="Importa competencias pasadas al historial")
+    parser.add_argument("archivos", nargs="+")
+    parser.add_argument("--id", required=True, help="identificador de la competencia archivada")
+    parser.add_argument("--nombre", help="nombre para mostrar (por defecto el id)")
+    parser.add_argument("--fecha", help="AAAA-MM-DD (por defecto la fecha del primer archivo)")
+    parser.add_argument("--config", help="configuracion.json de la competencia (por defecto configuracion.py)")
+    parser.add_argument("--destino", default=os.environ.get('HISTORIAL_FILE', 'historial.db'))
+    args = parser.parse_args()
+
+    files_config = FILES_CONFIG
+    puntos, alias = PUNTOS_EQUIPOS, ALIAS_CARRERAS
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        files_config = config["FILES_CONFIG"]
+        alias = config.get("ALIAS_CARRERAS", alias)
+
+    for archivo in args.archivos:
+        if not os.path.exists(archivo):
+            sys.exit(f"❌ No existe {archivo}")
+    fecha = args.fecha or date.fromtimestamp(os.path.getmtime(args.archivos[0])).isoformat()
+
+    def marcas():
+        for archivo in args.archivos:
+            if archivo.endswith('.json'):
+                yield from marcas_de_categorias(leer_backup(archivo, files_config))
+            else:
+                yield from leer_exportacion(archivo, files_config)
+
+    historial = Historial(args.destino, TablaEquipos(puntos, alias).equipo)
+    n = historial.importar(args.id, args.nombre or args.id, fecha, ', '.join(args.archivos), marcas())
+    print(f"💾 {args.id} ({fecha}): {n} marcas en {args.destino}")
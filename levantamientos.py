@@ -0,0 +1,98 @@
+from bisect import bisect_left, insort
+
+# ========== ORDEN DE LEVANTAMIENTOS ==========
+#
+# Cola de cada movimiento de una categoría: lista ordenada de claves
+# (peso, intento, orden, id) con el próximo intento sin juzgar de cada
+# participante. Primero el peso declarado más bajo y, a igual peso, el
+# intento de número menor; el orden de planilla desempata. Un cambio mueve
+# solo la clave del participante afectado y los próximos k se leen del
+# principio de la lista.
+
+
+class ColaLevantamientos:
+
+    def __init__(self, mov):
+        self.mov = mov
+        self.claves = []
+        self.clave_de = {}
+        self.participante_de = {}
+        # Participantes cuyo próximo intento todavía no tiene peso declarado
+        self.sin_declarar = set()
+
+    def __len__(self):
+        return len(self.claves)
+
+    def proximo_intento(self, p):
+        """Número del primer intento sin resultado, o None si ya hizo todos"""
+        for i in range(1, self.mov.intentos + 1):
+            if self.mov.resultado(p, i) is None:
+                return i
+        return None
+
+    def _clave(self, p):
+        intento = self.proximo_intento(p)
+        if intento is None:
+            return None, False
+        peso = self.mov.peso(p, intento)
+        if peso <= 0:
+            return None, True
+        return (peso, intento, p.orden, p.id), False
+
+    def turno(self, p):
+        """Clave del participante en la tabla completa del movimiento.
+
+        Primero los que están en la cola, en su orden; después los que no
+        declararon el peso del próximo intento y al final los que ya hicieron
+        todos, cada grupo por orden de planilla.
+        """
+        clave, falta_peso = self._clave(p)
+        if clave is not None:
+            return (0,) + clave
+        if falta_peso:
+            return (1, 0.0, self.proximo_intento(p), p.orden, p.id)
+        return (2, 0.0, 0, p.orden, p.id)
+
+    def actualizar(self, p):
+        """Reubica al participante según su próximo intento"""
+        clave, falta_peso = self._clave(p)
+        anterior = self.clave_de.get(p.id)
+        if falta_peso:
+            self.sin_declarar.add(p.id)
+        else:
+            self.sin_declarar.discard(p.id)
+        if anterior == clave:
+            return
+        if anterior is not None:
+            del self.claves[bisect_left(self.claves, anterior)]
+            del self.clave_de[p.id]
+            del self.participante_de[p.id]
+        if clave is not None:
+            insort(self.claves, clave)
+            self.clave_de[p.id] = clave
+            self.participante_de[p.id] = p
+
+    def quitar(self, p):
+        self.sin_declarar.discard(p.id)
+        anterior = self.clave_de.pop(p.id, None)
+        if anterior is not None:
+            del self.claves[bisect_left(self.claves, anterior)]
+            del self.participante_de[p.id]
+
+    def reconstruir(self, participantes):
+        self.clave_de = {}
+        self.participante_de = {}
+        self.sin_declarar = set()
+        for p in participantes:
+            clave, falta_peso = self._clave(p)
+            if falta_peso:
+                self.sin_declarar.add(p.id)
+            elif clave is not None:
+                self.clave_de[p.id] = clave
+                self.participante_de[p.id] = p
+        self.claves = sorted(self.clave_de.values())
+
+    def proximos(self, k):
+        """Los próximos `k` levantamientos como (participante, intento, peso)"""
+        participante_de = self.participante_de
+        return [(participante_de[id], intento, peso) for peso, intento, _, id in self.claves[:k]]
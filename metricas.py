@@ -0,0 +1,145 @@
+import bisect
+import time
+
+# ========== MÉTRICAS ==========
+#
+# Contadores, histogramas y valores instantáneos en memoria, expuestos en el
+# formato de texto de Prometheus. Registrar una observación es una búsqueda
+# binaria y un par de sumas; el texto se arma solo cuando alguien pide
+# /metrics. Con varios workers cada proceso lleva y expone sus propias métricas.
+
+# Límites (segundos) de los histogramas de latencia
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ''
+    pares = ','.join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores))
+    return '{' + pares + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores = {}
+
+    def incrementar(self, *etiquetas, cantidad=1):
+        self.valores[etiquetas] = self.valores.get(etiquetas, 0) + cantidad
+
+    def lineas(self):
+        for etiquetas, valor in sorted(self.valores.items()):
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}'
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        # Por combinación de etiquetas: [conteo por tramo..., suma]
+        self.series = {}
+
+    def observar(self, valor, *etiquetas):
+        serie = self.series.get(etiquetas)
+        if serie is None:
+            serie = self.series[etiquetas] = [0] * (len(self.limites) + 1) + [0.0]
+        serie[bisect.bisect_left(self.limites, valor)] += 1
+        serie[-1] += valor
+
+    def cronometrar(self, *etiquetas):
+        return _Cronometro(self, etiquetas)
+
+    def lineas(self):
+        nombres = self.etiquetas + ('le',)
+        for etiquetas, serie in sorted(self.series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (float('inf'),), serie):
+                acumulado += conteo
+                yield f'{self.nombre}_bucket{_etiquetas(nombres, etiquetas + (_numero(limite),))} {acumulado}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, etiquetas)} {_numero(serie[-1])}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, etiquetas)} {acumulado}'
+
+
+class _Cronometro:
+    __slots__ = ('histograma', 'etiquetas', 'inicio')
+
+    def __init__(self, histograma, etiquetas):
+        self.histograma = histograma
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observar(time.perf_counter() - self.inicio, *self.etiquetas)
+
+
+class Valor:
+    """Valor instantáneo (gauge); `leer` se llama al exponer y devuelve
+    {tupla de etiquetas: valor}. Sin `leer`, se fija con `fijar`. Con
+    tipo='counter' expone un contador que ya lleva otro objeto."""
+
+    def __init__(self, nombre, ayuda, etiquetas=(), leer=None, tipo='gauge'):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.leer = leer
+        self.tipo = tipo
+        self.valores = {}
+
+    def fijar(self, valor, *etiquetas):
+        self.valores[etiquetas] = valor
+
+    def lineas(self):
+        valores = self.leer() if self.leer is not None else self.valores
+        for etiquetas, valor in sorted(valores.items()):
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}'
+
+
+class Metricas:
+    """Conjunto de métricas de la aplicación, en el orden en que se crearon"""
+
+    def __init__(self, prefijo):
+        self.prefijo = prefijo
+        self.metricas = []
+
+    def _agregar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._agregar(Contador(f'{self.prefijo}_{nombre}', ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_LATENCIA):
+        return self._agregar(Histograma(f'{self.prefijo}_{nombre}', ayuda, etiquetas, limites))
+
+    def valor(self, nombre, ayuda, etiquetas=(), leer=None, tipo='gauge'):
+        return self._agregar(Valor(f'{self.prefijo}_{nombre}', ayuda, etiquetas, leer, tipo))
+
+    def exponer(self):
+        """Texto en formato de exposición de Prometheus (version 0.0.4)"""
+        lineas = []
+        for metrica in self.metricas:
+            lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+            lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+            lineas.extend(metrica.lineas())
+        return '\n'.join(lineas) + '\n'
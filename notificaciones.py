@@ -0,0 +1,106 @@
+import time
+
+# ========== NOTIFICACIONES POR SALA ==========
+#
+# Cada categoría tiene su sala de Socket.IO ("cat:<competencia>/<cat_id>");
+# los clientes se suscriben solo a las categorías que muestran. Las ráfagas
+# de cambios a una misma sala dentro de la ventana se fusionan en un solo
+# emit. La clasificación por equipos de cada competencia tiene su propia sala.
+
+
+def sala_categoria(comp_id, cat_id):
+    return f'cat:{comp_id}/{cat_id}'
+
+
+def sala_equipos(comp_id):
+    return f'equipos:{comp_id}'
+
+
+def fusionar(primero, siguiente):
+    """Une dos mensajes versionados consecutivos de la misma categoría"""
+    if siguiente["anterior"] is None:
+        # Recarga completa: los deltas anteriores ya no sirven
+        return siguiente
+    return {
+        "categoria": primero["categoria"],
+        "version": siguiente["version"],
+        "anterior": primero["anterior"],
+        "cambios": primero["cambios"] + siguiente["cambios"]
+    }
+
+
+class Coalescedor:
+    """Agrupa los mensajes de cada sala durante `ventana` segundos"""
+
+    def __init__(self, socketio, ventana=0.1, evento='datos_actualizados', al_emitir=None):
+        self.socketio = socketio
+        self.ventana = ventana
+        self.evento = evento
+        # al_emitir(sala, segundos): se llama después de cada emit, para medirlo
+        self.al_emitir = al_emitir
+        self.pendientes = {}
+        self.emitidos = 0
+        self.fusionados = 0
+
+    def notificar(self, sala, mensaje):
+        if self.ventana <= 0:
+            self._emitir(sala, mensaje)
+            return
+
+        pendiente = self.pendientes.get(sala)
+        if pendiente is not None:
+            self.pendientes[sala] = fusionar(pendiente, mensaje)
+            self.fusionados += 1
+            return
+
+        self.pendientes[sala] = mensaje
+        self.socketio.start_background_task(self._vaciar, sala)
+
+    def _vaciar(self, sala):
+        self.socketio.sleep(self.ventana)
+        mensaje = self.pendientes.pop(sala, None)
+        if mensaje is not None:
+            self._emitir(sala, mensaje)
+
+    def _emitir(self, sala, mensaje):
+        inicio = time.perf_counter()
+        self.socketio.emit(self.evento, mensaje, to=sala)
+        self.emitidos += 1
+        if self.al_emitir is not None:
+            self.al_emitir(sala, time.perf_counter() - inicio)
+
+
+class Suscripciones:
+    """Qué salas tiene cada cliente conectado, para contar suscriptores"""
+
+    def __init__(self):
+        self.salas_de = {}
+        self.conteo = {}
+
+    def conectar(self, sid):
+        self.salas_de[sid] = set()
+
+    def desconectar(self, sid):
+        for sala in self.salas_de.pop(sid, set()):
+            self._restar(sala)
+
+    def reemplazar(self, sid, salas):
+        """Deja al cliente suscrito exactamente a `salas`; devuelve (entrar, salir)"""
+        actuales = self.salas_de.setdefault(sid, set())
+        nuevas = set(salas)
+        entrar = nuevas - actuales
+        salir = actuales - nuevas
+        for sala in entrar:
+            self.conteo[sala] = self.conteo.get(sala, 0) + 1
+        for sala in salir:
+            self._restar(sala)
+        self.salas_de[sid] = nuevas
+        return entrar, salir
+
+    def _restar(self, sala):
+        self.conteo[sala] -= 1
+        if self.conteo[sala] <= 0:
+            del self.conteo[sala]
+
+    def resumen(self):
+        return {"clientes": len(self.salas_de), "salas": dict(self.conteo)}
@@ -0,0 +1,614 @@
+import math
+from collections import deque
+from collections.abc import MutableMapping
+
+from busqueda import IndiceBusqueda, normalizar
+from levantamientos import ColaLevantamientos
+from puntuacion import MotorPuntuacion
+from ranking import IndiceOrden, IndiceRanking
+
+# ========== ALMACÉN DE PARTICIPANTES ==========
+#
+# Cada categoría guarda sus participantes como registros compactos con los
+# pesos ya convertidos a float. Las búsquedas van por un índice hash de ID
+# estable (el nombre queda como alias) y las columnas de cada movimiento se
+# resuelven una sola vez a partir de FILES_CONFIG.
+
+# Cambios recientes que cada categoría guarda para ponerse al día sin snapshot
+HISTORIAL_CAMBIOS = 500
+
+# Órdenes de Categoria.consultar (los de movimiento solo en /movimiento)
+ORDENES = ("puntaje", "planilla", "nombre")
+ORDENES_MOVIMIENTO = ORDENES + ("intento1", "mejor", "turno")
+
+
+def convertir_a_float(valor):
+    if valor is None or valor == '':
+        return 0.0
+    try:
+        resultado = float(str(valor).strip() or 0)
+        if math.isnan(resultado):
+            return 0.0
+        return resultado
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _texto(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    return valor
+
+
+class Movimiento:
+    """Columnas de un movimiento precalculadas desde FILES_CONFIG"""
+
+    __slots__ = ('id', 'nombre', 'intentos', 'cols_intento', 'claves_intento', 'col_valido', 'claves_res', 'clave_valido')
+
+    def __init__(self, mov_id, config):
+        self.id = mov_id
+        self.nombre = config["nombre"]
+        self.intentos = config["intentos"]
+        self.cols_intento = tuple(config[f'intento{i}'] for i in range(1, self.intentos + 1))
+        self.claves_intento = tuple(f'col_{col}' for col in self.cols_intento)
+        self.col_valido = config["valido"]
+        self.claves_res = tuple(f'res_{mov_id}_{i}' for i in range(1, self.intentos + 1))
+        self.clave_valido = f'col_{self.col_valido}'
+
+    def peso(self, participante, intento):
+        return participante.cols.get(self.cols_intento[intento - 1], 0.0)
+
+    def valido(self, participante):
+        return participante.cols.get(self.col_valido, 0.0)
+
+    def resultado(self, participante, intento):
+        return participante.res.get(self.claves_res[intento - 1])
+
+    def vista(self, participante):
+        """Intentos, resultados y mejor peso con los nombres de /movimiento"""
+        cols = participante.cols
+        res = participante.res
+        d = {}
+        for i, (col, clave) in enumerate(zip(self.cols_intento, self.claves_res), start=1):
+            d[f"Intento{i}"] = cols.get(col, 0.0)
+            d[f"Res{i}"] = res.get(clave)
+        d["Mejor"] = cols.get(self.col_valido, 0.0)
+        return d
+
+    def mejor_exitoso(self, participante, sin_intento=None):
+        """Mayor peso entre los intentos marcados como éxito (opcionalmente ignorando uno)"""
+        mejor = 0.0
+        for i, (col, clave) in enumerate(zip(self.cols_intento, self.claves_res), start=1):
+            if i != sin_intento and participante.res.get(clave) == "exito":
+                peso = participante.cols.get(col, 0.0)
+                if peso > mejor:
+                    mejor = peso
+        return mejor
+
+
+class Participante:
+    __slots__ = ('id', 'orden', 'version', 'id_planilla', 'nombre', 'carrera', 'bw', 'cols', 'res')
+
+    def __init__(self, id, nombre, carrera=None, bw=0.0, id_planilla=None):
+        self.id = id
+        self.orden = 0
+        # Sube con cada cambio; las rutas de escritura la comparan con expected_version
+        self.version = 1
+        self.id_planilla = id_planilla
+        self.nombre = nombre
+        self.carrera = carrera
+        self.bw = bw
+        self.cols = {}
+        self.res = {}
+
+    @classmethod
+    def desde_dict(cls, d, id):
+        """Construye un participante desde un registro del CSV o del backup"""
+        p = cls(id, str(d.get("Nombre")), _texto(d.get("Carrera")),
+                convertir_a_float(d.get("BW")), _texto(d.get("ID_Planilla")))
+        p.actualizar(d)
+        return p
+
+    def actualizar(self, campos):
+        """Aplica campos con las claves del formato de backup (BW, col_N, res_*)"""
+        for clave, valor in campos.items():
+            if clave.startswith('col_'):
+                self.cols[int(clave[4:])] = convertir_a_float(valor)
+            elif clave.startswith('res_'):
+                self.res[clave] = valor
+            elif clave == "BW":
+                self.bw = convertir_a_float(valor)
+            elif clave == "Nombre":
+                self.nombre = str(valor)
+            elif clave == "Carrera":
+                self.carrera = _texto(valor)
+            elif clave == "Version":
+                self.version = int(valor)
+
+    def valores(self, claves):
+        """Valores actuales de los campos indicados, con las claves del backup"""
+        d = {}
+        for clave in claves:
+            if clave.startswith('col_'):
+                d[clave] = self.cols.get(int(clave[4:]), 0.0)
+            elif clave.startswith('res_'):
+                d[clave] = self.res.get(clave)
+            elif clave == "BW":
+                d[clave] = self.bw
+            elif clave == "Nombre":
+                d[clave] = self.nombre
+            elif clave == "Carrera":
+                d[clave] = self.carrera
+            elif clave == "Version":
+                d[clave] = self.version
+        return d
+
+    def a_dict(self):
+        d = {
+            "ID": self.id,
+            "ID_Planilla": self.id_planilla,
+            "Nombre": self.nombre,
+            "Carrera": self.carrera,
+            "BW": self.bw,
+            "Version": self.version
+        }
+        for col, valor in self.cols.items():
+            d[f'col_{col}'] = valor
+        d.update(self.res)
+        return d
+
+
+class Categoria:
+    """Participantes de una categoría en orden de planilla, indexados por ID y nombre"""
+
+    def __init__(self, cat_id, config):
+        self.id = cat_id
+        self.config = config
+        self.movimientos = {
+            mov_id: Movimiento(mov_id, mov_config)
+            for mov_id, mov_config in config["movimientos"].items()
+        }
+        self.participantes = []
+        self.por_id = {}
+        self.por_nombre = {}
+        self.siguiente_id = 1
+        self.siguiente_orden = 0
+        self.motor = MotorPuntuacion(config, self.movimientos.values())
+        self.ranking = IndiceRanking(self.motor.puntaje)
+        self.colas = {mov_id: ColaLevantamientos(mov) for mov_id, mov in self.movimientos.items()}
+        # Órdenes para paginar /ranking y /movimiento sin ordenar en cada petición
+        self.ordenes = {
+            "planilla": IndiceOrden(lambda p: (p.orden, p.id)),
+            "nombre": IndiceOrden(lambda p: (normalizar(p.nombre), p.orden, p.id)),
+        }
+        self.ordenes_movimiento = {
+            mov_id: {
+                "intento1": IndiceOrden(lambda p, mov=mov: (mov.peso(p, 1), p.orden, p.id)),
+                "mejor": IndiceOrden(lambda p, mov=mov: (-mov.valido(p), p.orden, p.id)),
+                # Orden de levantamiento: la cola del movimiento y después el resto
+                "turno": IndiceOrden(self.colas[mov_id].turno),
+            }
+            for mov_id, mov in self.movimientos.items()
+        }
+        self.busqueda = IndiceBusqueda()
+        self.version = 0
+        self.historial = deque(maxlen=HISTORIAL_CAMBIOS)
+
+    def __len__(self):
+        return len(self.participantes)
+
+    def __iter__(self):
+        return iter(self.participantes)
+
+    def __getitem__(self, i):
+        return self.participantes[i]
+
+    @classmethod
+    def desde_registros(cls, cat_id, config, registros):
+        cat = cls(cat_id, config)
+        for d in registros:
+            cat.agregar(d, indexar=False)
+        cat.reindexar()
+        return cat
+
+    def reindexar(self):
+        """Puntúa toda la categoría en una llamada vectorizada y reordena el ranking"""
+        ids, puntajes = self.motor.puntuar_todos()
+        self.ranking.reconstruir(self.participantes, dict(zip(ids, puntajes.tolist())))
+        for indice in self._indices():
+            indice.reconstruir(self.participantes)
+        self.ordenes["nombre"].reconstruir(self.participantes)
+        self.busqueda.reconstruir(self.participantes)
+
+    def _indices(self):
+        """Índices que dependen de los pesos y resultados (además del ranking)"""
+        yield from self.colas.values()
+        yield self.ordenes["planilla"]
+        for ordenes in self.ordenes_movimiento.values():
+            yield from ordenes.values()
+
+    def _indexar(self, p, texto=True):
+        self.ranking.actualizar(p)
+        for indice in self._indices():
+            indice.actualizar(p)
+        if texto:
+            self.ordenes["nombre"].actualizar(p)
+            self.busqueda.actualizar(p)
+
+    def puntaje(self, p):
+        """Puntaje con la fórmula de la categoría (FILES_CONFIG["formula"])"""
+        return self.motor.puntaje(p)
+
+    def fuerza_relativa(self, p):
+        """Suma de los pesos válidos dividida por el peso corporal (cálculo individual)"""
+        if p.bw <= 0:
+            return 0.0
+        suma_pesos = 0.0
+        for mov in self.movimientos.values():
+            suma_pesos += mov.valido(p)
+        return round(suma_pesos / p.bw, 4)
+
+    def agregar(self, d, indexar=True):
+        """Agrega un participante desde un dict; asigna ID si el registro no trae uno"""
+        id = d.get("ID")
+        if id is None or id in self.por_id:
+            id = self.siguiente_id
+        p = Participante.desde_dict(d, id)
+        p.orden = self.siguiente_orden
+        self.siguiente_orden += 1
+        self.siguiente_id = max(self.siguiente_id, id + 1)
+
+        self.participantes.append(p)
+        self.por_id[id] = p
+        self.por_nombre.setdefault(p.nombre, []).append(p)
+        self.motor.actualizar(p)
+        if indexar:
+            self._indexar(p)
+        return p
+
+    def buscar(self, id=None, nombre=None):
+        """Busca por ID estable; si no se indica, usa el nombre como alias"""
+        if id is not None:
+            try:
+                return self.por_id.get(int(id))
+            except (ValueError, TypeError):
+                return None
+        homonimos = self.por_nombre.get(nombre)
+        return homonimos[0] if homonimos else None
+
+    def renombrar(self, p, nombre):
+        homonimos = self.por_nombre.get(p.nombre, [])
+        if p in homonimos:
+            homonimos.remove(p)
+            if not homonimos:
+                del self.por_nombre[p.nombre]
+        p.nombre = nombre
+        self.por_nombre.setdefault(nombre, []).append(p)
+
+    def eliminar(self, p):
+        self.participantes.remove(p)
+        self.ranking.quitar(p)
+        self.motor.quitar(p)
+        for indice in self._indices():
+            indice.quitar(p)
+        self.ordenes["nombre"].quitar(p)
+        self.busqueda.quitar(p)
+        del self.por_id[p.id]
+        homonimos = self.por_nombre[p.nombre]
+        homonimos.remove(p)
+        if not homonimos:
+            del self.por_nombre[p.nombre]
+
+    def preparar(self, registros):
+        """Completa registros en vivo con lo que `aplicar` decidiría al aplicarlos en orden.
+
+        Cada alta recibe su ID y cada "set" la Version que deja al
+        participante, así el diario guarda lo mismo que después se aplica en
+        memoria. Los "set" y "del" son de participantes que ya están (si no,
+        KeyError), no de altas del mismo grupo.
+        """
+        siguiente_id = self.siguiente_id
+        asignados = set()
+        versiones = {}
+        for registro in registros:
+            op = registro["op"]
+            if op == "add":
+                d = registro["participante"]
+                id = d.get("ID")
+                if id is None or id in self.por_id or id in asignados:
+                    id = d["ID"] = siguiente_id
+                asignados.add(id)
+                siguiente_id = max(siguiente_id, id + 1)
+                continue
+            p = self.por_id[registro["id"]]
+            if op == "set":
+                anterior = versiones.get(p.id, p.version)
+                versiones[p.id] = registro["campos"].setdefault("Version", anterior + 1)
+        return registros
+
+    def aplicar(self, registro):
+        """Aplica un registro de cambio (en vivo o desde el diario).
+
+        Devuelve el participante afectado, o None si no existe.
+        """
+        op = registro["op"]
+
+        if op == "add":
+            p = self.agregar(registro["participante"])
+            registro["participante"]["ID"] = p.id
+            return p
+
+        if "id" in registro:
+            p = self.por_id.get(registro["id"])
+        elif op == "del":
+            # Registros anteriores a los IDs estables: borrado por nombre
+            for p in list(self.por_nombre.get(registro["nombre"], [])):
+                self.eliminar(p)
+            return None
+        else:
+            idx = registro["idx"]
+            p = self.participantes[idx] if 0 <= idx < len(self.participantes) else None
+        if p is None:
+            return None
+
+        if op == "set":
+            campos = registro["campos"]
+            # Un cambio en vivo queda con su versión en el diario; al releerlo
+            # (o en otro worker) se aplica la misma
+            campos.setdefault("Version", p.version + 1)
+            if "Nombre" in campos:
+                self.renombrar(p, str(campos["Nombre"]))
+            p.actualizar(campos)
+            self.motor.actualizar(p)
+            self._indexar(p, texto="Nombre" in campos or "Carrera" in campos)
+        elif op == "del":
+            self.eliminar(p)
+        return p
+
+    def vista(self, p):
+        """Estado público de un participante, tal como lo ve el panel"""
+        return {
+            "ID": p.id,
+            "Orden": p.orden,
+            "Nombre": p.nombre,
+            "Carrera": p.carrera,
+            "BW": p.bw,
+            "Version": p.version,
+            "Total_Fuerza_Relativa": self.puntaje(p),
+            "movimientos": {mov_id: mov.vista(p) for mov_id, mov in self.movimientos.items()}
+        }
+
+    def aplicar_con_delta(self, registro):
+        """Como `aplicar`, pero devuelve también el delta público del cambio"""
+        if registro["op"] == "set" and "id" in registro:
+            anterior = self.por_id.get(registro["id"])
+            antes = self.vista(anterior) if anterior is not None else None
+        else:
+            antes = None
+
+        p = self.aplicar(registro)
+        if p is None:
+            return None, None
+
+        op = registro["op"]
+        if op == "add":
+            return p, {"op": "add", "id": p.id, "participante": self.vista(p)}
+        if op == "del":
+            return p, {"op": "del", "id": p.id}
+
+        despues = self.vista(p)
+        campos = {k: v for k, v in despues.items() if k != "movimientos" and antes.get(k) != v}
+        movimientos = {}
+        for mov_id, valores in despues["movimientos"].items():
+            previos = antes["movimientos"][mov_id]
+            cambiados = {k: v for k, v in valores.items() if previos.get(k) != v}
+            if cambiados:
+                movimientos[mov_id] = cambiados
+        if movimientos:
+            campos["movimientos"] = movimientos
+        return p, {"op": "set", "id": p.id, "campos": campos}
+
+    def versionar(self, cambios, version):
+        """Registra los deltas de una versión y devuelve el mensaje a difundir"""
+        mensaje = {
+            "categoria": self.id,
+            "version": version,
+            "anterior": self.version,
+            "cambios": cambios
+        }
+        self.version = version
+        self.historial.append(mensaje)
+        return mensaje
+
+    def cambios_desde(self, desde):
+        """Deltas posteriores a `desde`, o None si el historial ya no los cubre"""
+        if desde == self.version:
+            return []
+        if desde > self.version or not self.historial or self.historial[0]["anterior"] > desde:
+            return None
+        return [m for m in self.historial if m["version"] > desde]
+
+    def definiciones_movimientos(self):
+        return [
+            {"id": mov.id, "nombre": mov.nombre, "intentos": mov.intentos}
+            for mov in self.movimientos.values()
+        ]
+
+    def fila_ranking(self, lugar, p, puntaje):
+        return {
+            "Lugar": lugar,
+            "ID": p.id,
+            "Orden": p.orden,
+            "Nombre": p.nombre,
+            "Carrera": p.carrera,
+            "BW": p.bw,
+            "Version": p.version,
+            "Total_Fuerza_Relativa": puntaje
+        }
+
+    def fila_movimiento(self, mov, lugar, p):
+        fila = {
+            "Lugar": lugar,
+            "ID": p.id,
+            "Nombre": p.nombre,
+            "Carrera": p.carrera,
+            "BW": p.bw,
+            "Version": p.version
+        }
+        fila.update(mov.vista(p))
+        return fila
+
+    def consultar(self, orden, mov_id=None, carrera=None, q=None, offset=0, limit=None):
+        """Página de participantes filtrados por carrera y prefijos del nombre.
+
+        `orden` es "puntaje", "planilla" o "nombre" (con mov_id también
+        "intento1", "mejor" y "turno"), con "-" adelante para invertirlo. Devuelve
+        (total, participantes de la página).
+        """
+        descendente = orden.startswith('-')
+        nombre = orden.lstrip('-')
+        if nombre == "puntaje":
+            indice = self.ranking
+        elif mov_id is not None and nombre in self.ordenes_movimiento[mov_id]:
+            indice = self.ordenes_movimiento[mov_id][nombre]
+        else:
+            indice = self.ordenes[nombre]
+
+        ids = None
+        if carrera:
+            ids = self.busqueda.de_carrera(carrera)
+        if q:
+            coincidencias = self.busqueda.buscar(q)
+            ids = coincidencias if ids is None else ids & coincidencias
+
+        total, claves = indice.pagina(ids, offset, limit, descendente)
+        return total, [indice.participante_de[clave[-1]] for clave in claves]
+
+    def orden_levantamiento(self, mov_id, k):
+        """Próximos `k` levantamientos del movimiento, en el orden de la cola"""
+        cola = self.colas[mov_id]
+        return {
+            "categoria": self.id,
+            "movimiento": mov_id,
+            "version": self.version,
+            "siguientes": [
+                {"ID": p.id, "Nombre": p.nombre, "Carrera": p.carrera, "BW": p.bw, "Intento": intento, "Peso": peso}
+                for p, intento, peso in cola.proximos(k)
+            ],
+            "pendientes": len(cola),
+            "sin_declarar": len(cola.sin_declarar)
+        }
+
+    def snapshot(self):
+        """Ranking, movimientos y todas las tablas de intentos en un solo paquete.
+
+        Las tablas se llenan en una sola pasada sobre los participantes.
+        """
+        movimientos = list(self.movimientos.values())
+        tablas = {mov.id: [] for mov in movimientos}
+
+        for lugar, p in enumerate(self.participantes, start=1):
+            for mov in movimientos:
+                tablas[mov.id].append(self.fila_movimiento(mov, lugar, p))
+
+        return {
+            "categoria": self.id,
+            "version": self.version,
+            "formula": self.config.get("formula", "fuerza_relativa"),
+            "movimientos": self.definiciones_movimientos(),
+            "ranking": [self.fila_ranking(lugar, p, puntaje) for lugar, p, puntaje in self.ranking],
+            "tablas": tablas
+        }
+
+    def a_registros(self):
+        return [p.a_dict() for p in self.participantes]
+
+
+def registros_de_planilla(registros):
+    """Registros leídos de una planilla en formato de backup, con IDs desde 1, sin construir la categoría"""
+    return [Participante.desde_dict(d, id).a_dict() for id, d in enumerate(registros, start=1)]
+
+
+class Categorias(MutableMapping):
+    """cat_id -> Categoria. Cada una se construye al primer acceso, desde su planilla o su backup.
+
+    Se recorren en el orden en que se registraron (el de FILES_CONFIG),
+    estén construidas o no.
+    """
+
+    def __init__(self):
+        self.orden = {}
+        self.cargadas = {}
+        # cat_id -> (config, registros, versión, cambios del diario por reaplicar)
+        self.pendientes = {}
+
+    def pendiente(self, cat_id, config, registros, version=0):
+        """Deja la categoría lista para construirse cuando se use, con esa versión"""
+        self.cargadas.pop(cat_id, None)
+        self.orden.setdefault(cat_id)
+        self.pendientes[cat_id] = (config, registros, version, [])
+
+    def aplicar(self, cat_id, cambio):
+        """Aplica un cambio del diario; si la categoría no está construida, lo guarda para entonces"""
+        if cat_id in self.pendientes:
+            self.pendientes[cat_id][3].append(cambio)
+        else:
+            self.cargadas[cat_id].aplicar(cambio)
+
+    def fijar_version(self, version):
+        """Versión de todas las categorías, construidas o no (al terminar de cargar)"""
+        for cat in self.cargadas.values():
+            cat.version = version
+        for cat_id, (config, registros, _, cambios) in self.pendientes.items():
+            self.pendientes[cat_id] = (config, registros, version, cambios)
+
+    def cargada(self, cat_id):
+        return cat_id in self.cargadas
+
+    def cuantos(self, cat_id):
+        """Participantes de la categoría, sin construirla (contando altas y bajas por reaplicar)"""
+        if cat_id in self.pendientes:
+            _, registros, _, cambios = self.pendientes[cat_id]
+            return len(registros) + sum((c["op"] == "add") - (c["op"] == "del") for c in cambios)
+        return len(self.cargadas[cat_id])
+
+    def a_registros(self):
+        """Datos de todas las categorías en formato de backup; las pendientes sin cambios van tal cual"""
+        datos = {}
+        for cat_id in self:
+            pendiente = self.pendientes.get(cat_id)
+            if pendiente is not None and not pendiente[3]:
+                datos[cat_id] = pendiente[1]
+            else:
+                datos[cat_id] = self[cat_id].a_registros()
+        return datos
+
+    def __getitem__(self, cat_id):
+        cat = self.cargadas.get(cat_id)
+        if cat is None:
+            config, registros, version, cambios = self.pendientes.pop(cat_id)
+            cat = Categoria.desde_registros(cat_id, config, registros)
+            for cambio in cambios:
+                cat.aplicar(cambio)
+            cat.version = version
+            self.cargadas[cat_id] = cat
+        return cat
+
+    def __setitem__(self, cat_id, cat):
+        self.pendientes.pop(cat_id, None)
+        self.orden.setdefault(cat_id)
+        self.cargadas[cat_id] = cat
+
+    def __delitem__(self, cat_id):
+        if self.pendientes.pop(cat_id, None) is None:
+            del self.cargadas[cat_id]
+        del self.orden[cat_id]
+
+    def __contains__(self, cat_id):
+        return cat_id in self.orden
+
+    def __iter__(self):
+        return iter(list(self.orden))
+
+    def __len__(self):
+        return len(self.orden)
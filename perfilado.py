@@ -0,0 +1,147 @@
+import cProfile
+import os
+import pstats
+from datetime import datetime
+
+import greenlet
+
+# ========== PERFILADO DE PETICIONES ==========
+#
+# Perfila peticiones sueltas con cProfile y guarda cada perfil como archivo
+# pstats en `directorio`, con la fecha, el método, la ruta y la categoría en
+# el nombre. Con el worker eventlet todas las peticiones comparten el hilo:
+# el perfil de una petición se pausa cada vez que su greenlet cede el control
+# y se reanuda al volver, para no contar el tiempo de las demás. Mientras no
+# hay ninguna petición perfilándose no queda ningún gancho instalado.
+
+SEPARADOR = '__'
+EXTENSION = '.prof'
+ORDENES_PERFIL = ('cumulative', 'tottime', 'ncalls', 'pcalls')
+
+
+class Perfilador:
+
+    def __init__(self, directorio, cada=0, maximo=200):
+        self.directorio = directorio
+        # Perfilar 1 de cada `cada` peticiones (0: solo a pedido)
+        self.cada = cada
+        # Perfiles que se conservan; los más antiguos se borran
+        self.maximo = maximo
+        self.contador = 0
+        self.activos = {}
+        self._traza_anterior = None
+
+    def muestrear(self):
+        if self.cada <= 0:
+            return False
+        self.contador += 1
+        return self.contador % self.cada == 0
+
+    # --- Perfil de la petición en curso ---
+
+    def iniciar(self):
+        perfil = cProfile.Profile()
+        if not self.activos:
+            self._traza_anterior = greenlet.settrace(self._cambio)
+        self.activos[greenlet.getcurrent()] = perfil
+        perfil.enable()
+        return perfil
+
+    def terminar(self, perfil, metodo, ruta, categoria=None):
+        """Detiene el perfil y lo guarda; devuelve el nombre del archivo"""
+        perfil.disable()
+        self.activos.pop(greenlet.getcurrent(), None)
+        if not self.activos:
+            greenlet.settrace(self._traza_anterior)
+            self._traza_anterior = None
+
+        fecha = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        partes = [fecha, metodo, _limpiar(ruta), _limpiar(categoria or '-')]
+        nombre = SEPARADOR.join(partes) + EXTENSION
+
+        os.makedirs(self.directorio, exist_ok=True)
+        destino = os.path.join(self.directorio, nombre)
+        perfil.dump_stats(destino + '.tmp')
+        os.replace(destino + '.tmp', destino)
+        self._podar()
+        return nombre
+
+    def _cambio(self, evento, argumentos):
+        if evento in ('switch', 'throw'):
+            origen, destino = argumentos
+            perfil = self.activos.get(origen)
+            if perfil is not None:
+                perfil.disable()
+            perfil = self.activos.get(destino)
+            if perfil is not None:
+                perfil.enable()
+        if self._traza_anterior is not None:
+            self._traza_anterior(evento, argumentos)
+
+    # --- Perfiles guardados ---
+
+    def _archivos(self):
+        try:
+            nombres = [n for n in os.listdir(self.directorio) if n.endswith(EXTENSION)]
+        except FileNotFoundError:
+            return []
+        # La fecha va al principio del nombre: el orden alfabético es el cronológico
+        return sorted(nombres, reverse=True)
+
+    def _podar(self):
+        for nombre in self._archivos()[self.maximo:]:
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError:
+                pass
+
+    def listar(self, n=20):
+        """Los `n` perfiles más recientes con sus etiquetas"""
+        perfiles = []
+        for nombre in self._archivos()[:n]:
+            partes = nombre[:-len(EXTENSION)].split(SEPARADOR)
+            if len(partes) != 4:
+                continue
+            fecha, metodo, ruta, categoria = partes
+            perfiles.append({
+                "nombre": nombre,
+                "fecha": datetime.strptime(fecha, '%Y%m%d-%H%M%S-%f').isoformat(timespec='milliseconds'),
+                "metodo": metodo,
+                "ruta": ruta,
+                "categoria": None if categoria == '-' else categoria,
+                "bytes": os.path.getsize(os.path.join(self.directorio, nombre)),
+            })
+        return perfiles
+
+    def ruta(self, nombre):
+        """Ruta del perfil `nombre`, o None si no es un perfil de este directorio"""
+        if os.path.basename(nombre) != nombre or not nombre.endswith(EXTENSION):
+            return None
+        ruta = os.path.join(self.directorio, nombre)
+        return ruta if os.path.isfile(ruta) else None
+
+    def funciones(self, nombre, orden='cumulative', n=30):
+        """Las `n` funciones principales del perfil según `orden`"""
+        ruta = self.ruta(nombre)
+        if ruta is None:
+            return None
+        stats = pstats.Stats(ruta)
+        stats.sort_stats(orden)
+        funciones = []
+        for funcion in stats.fcn_list[:n]:
+            primitivas, llamadas, propio, acumulado, _ = stats.stats[funcion]
+            funciones.append({
+                "funcion": pstats.func_std_string(funcion),
+                "llamadas": llamadas,
+                "llamadas_primitivas": primitivas,
+                "tiempo_propio": round(propio, 6),
+                "tiempo_acumulado": round(acumulado, 6),
+            })
+        return {"nombre": nombre, "orden": orden, "tiempo_total": round(stats.total_tt, 6),
+                "llamadas": stats.total_calls, "funciones": funciones}
+
+
+def _limpiar(texto):
+    """Etiqueta apta para el nombre del archivo: '/ranking/<cat_id>' -> 'ranking.cat_id'"""
+    limpio = ''.join(c if c.isalnum() or c in '-_' else '.' for c in str(texto))
+    return '.'.join(p for p in limpio.split('.') if p).replace(SEPARADOR, '_') or '-'
@@ -0,0 +1,345 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# ========== DIARIO DE CAMBIOS + SNAPSHOT ==========
+#
+# El estado completo se guarda en un snapshot (BACKUP_FILE) y cada cambio
+# posterior se agrega como una línea JSON compacta al diario. Cada registro
+# lleva un número de secuencia; el snapshot guarda el último número que ya
+# incluye, así que al cargar solo se reaplican los registros posteriores.
+#
+# El snapshot tiene una línea de encabezado ({"seq", "formato": 2,
+# "categorias": {cat_id: participantes}}) y después una línea JSON por
+# categoría, en el mismo orden. Al cargar solo se separan las líneas: cada
+# categoría se decodifica cuando se construye, y las que nadie usó se vuelven
+# a escribir tal cual en la próxima compactación.
+
+FORMATO_SNAPSHOT = 2
+
+
+class RegistrosSnapshot:
+    """Registros de una categoría tal como están en el snapshot, sin decodificar.
+
+    `len` sale del encabezado; recorrerlo decodifica la línea cada vez (se
+    recorre una sola vez, al construir la categoría).
+    """
+
+    __slots__ = ("texto", "n")
+
+    def __init__(self, texto, n):
+        self.texto = texto
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(json.loads(self.texto))
+
+
+def _texto_registros(registros):
+    if isinstance(registros, RegistrosSnapshot):
+        return registros.texto
+    return json.dumps(registros, ensure_ascii=False, separators=(',', ':'))
+
+
+def _fsync_directorio(ruta):
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    try:
+        fd = os.open(directorio, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Diario:
+    """Persistencia con costo constante por escritura.
+
+    `registrar` agrega una línea al diario; cuando `debe_compactar` el dueño
+    de los datos llama a `compactar`, que reescribe el snapshot con un rename
+    atómico y vacía el diario.
+    """
+
+    def __init__(self, archivo_snapshot, archivo_diario=None, compactar_cada=500):
+        self.archivo_snapshot = archivo_snapshot
+        self.archivo_diario = archivo_diario or os.path.splitext(archivo_snapshot)[0] + '.journal'
+        self.compactar_cada = compactar_cada
+        self.seq = 0
+        self.pendientes = 0
+        self._f = None
+
+    def existe(self):
+        return os.path.exists(self.archivo_snapshot) or os.path.exists(self.archivo_diario)
+
+    def _leer_snapshot(self):
+        """Devuelve (datos, seq) del snapshot; sin archivo devuelve ({}, 0).
+
+        En el formato por líneas los valores de `datos` son RegistrosSnapshot.
+        """
+        if not os.path.exists(self.archivo_snapshot):
+            return {}, 0
+        with open(self.archivo_snapshot, 'r', encoding='utf-8') as f:
+            contenido = json.loads(f.readline())
+            if contenido.get("formato") == FORMATO_SNAPSHOT:
+                datos = {}
+                for cat_id, n in contenido["categorias"].items():
+                    datos[cat_id] = RegistrosSnapshot(f.readline().rstrip('\n'), n)
+                return datos, contenido["seq"]
+        if "datos" in contenido and "seq" in contenido:
+            # Un solo JSON con el seq (antes de separar las categorías por línea)
+            return contenido["datos"], contenido["seq"]
+        # Formato antiguo: el archivo es directamente el diccionario de categorías
+        return contenido, 0
+
+    def cargar(self):
+        """Lee el snapshot y la cola del diario.
+
+        Devuelve (datos_snapshot, registros) donde `registros` son los cambios
+        posteriores al snapshot, en orden. Sin archivos devuelve ({}, []).
+        """
+        datos, snapshot_seq = self._leer_snapshot()
+        self.seq = snapshot_seq
+        registros = []
+
+        if os.path.exists(self.archivo_diario):
+            with open(self.archivo_diario, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        # Escritura interrumpida: solo puede ser la última línea
+                        self.pendientes = self.compactar_cada
+                        break
+                    if registro["seq"] <= snapshot_seq:
+                        continue
+                    registros.append(registro)
+                    self.seq = registro["seq"]
+
+        # Los registros leídos cuentan para la próxima compactación; si quedó
+        # una línea a medias se compacta enseguida, antes de escribir detrás
+        self.pendientes = max(self.pendientes, len(registros))
+
+        return datos, registros
+
+    def bloqueo(self):
+        """Sección de escritura exclusiva; con un solo proceso no hace falta"""
+        return nullcontext()
+
+    def leer_nuevos(self):
+        """Registros escritos por otros procesos desde la última lectura"""
+        return []
+
+    @property
+    def debe_compactar(self):
+        return self.pendientes >= self.compactar_cada
+
+    def registrar(self, registro):
+        """Agrega un registro al diario y lo fuerza a disco"""
+        self.seq += 1
+        registro["seq"] = self.seq
+
+        if self._f is None:
+            self._f = open(self.archivo_diario, 'a', encoding='utf-8')
+
+        self._f.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+        self.pendientes += 1
+
+    def compactar(self, datos):
+        """Escribe un snapshot completo de forma atómica y vacía el diario"""
+        tmp = self.archivo_snapshot + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            encabezado = {"seq": self.seq, "formato": FORMATO_SNAPSHOT,
+                          "categorias": {cat_id: len(registros) for cat_id, registros in datos.items()}}
+            f.write(json.dumps(encabezado, ensure_ascii=False, separators=(',', ':')) + '\n')
+            for registros in datos.values():
+                f.write(_texto_registros(registros) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.archivo_snapshot)
+        _fsync_directorio(self.archivo_snapshot)
+
+        # Si caemos aquí antes de reemplazar el diario, sus registros ya están
+        # cubiertos por el seq del snapshot y se ignoran al cargar. El diario
+        # nuevo es otro archivo (no se trunca), así otros procesos que aún
+        # leen el anterior no pierden sus últimas líneas; su primera línea
+        # indica a qué snapshot sigue.
+        tmp = self.archivo_diario + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"seq": self.seq, "op": "compactado"}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.archivo_diario)
+        _fsync_directorio(self.archivo_diario)
+
+        if self._f is not None:
+            self._f.close()
+        self._f = open(self.archivo_diario, 'a', encoding='utf-8')
+        self.pendientes = 0
+
+    def cerrar(self):
+        """Cierra los archivos abiertos; se vuelven a abrir si se sigue usando"""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+# Espera entre intentos de tomar el lock de archivo de otro worker (segundos)
+ESPERA_FLOCK_MIN = 0.001
+ESPERA_FLOCK_MAX = 0.02
+
+
+class DiarioCompartido(Diario):
+    """Diario compartido por varios procesos (workers) en la misma máquina.
+
+    El mismo archivo de diario hace de bus de mensajes: las escrituras se
+    serializan con un flock sobre `<diario>.lock`, y cada proceso sigue el
+    diario con `leer_nuevos` para aplicar los cambios que escribieron los
+    demás. Quien escribe debe, dentro de `bloqueo()`, leer primero lo nuevo
+    y validar contra ese estado antes de llamar a `registrar`.
+    """
+
+    def __init__(self, archivo_snapshot, archivo_diario=None, compactar_cada=500):
+        super().__init__(archivo_snapshot, archivo_diario, compactar_cada)
+        self.archivo_bloqueo = self.archivo_diario + '.lock'
+        self._bloqueo_local = threading.RLock()
+        self._fd_bloqueo = None
+        self._profundidad = 0
+        self._lector = None
+        self._resto = b''
+
+    @contextmanager
+    def bloqueo(self):
+        # El RLock ordena a los hilos/greenlets del proceso; el flock, a los procesos
+        with self._bloqueo_local:
+            if self._profundidad == 0:
+                if self._fd_bloqueo is None:
+                    self._fd_bloqueo = os.open(self.archivo_bloqueo, os.O_RDWR | os.O_CREAT, 0o644)
+                self._tomar_flock()
+            self._profundidad += 1
+            try:
+                yield
+            finally:
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    fcntl.flock(self._fd_bloqueo, fcntl.LOCK_UN)
+
+    def _tomar_flock(self):
+        """flock exclusivo sin bloquear el proceso mientras otro worker escribe o compacta.
+
+        Se intenta sin esperar y, si está tomado, se duerme un poco antes de
+        reintentar; con el worker eventlet time.sleep está parcheado y cede el
+        hub, así las demás peticiones y los emits de este worker siguen.
+        """
+        espera = ESPERA_FLOCK_MIN
+        while True:
+            try:
+                fcntl.flock(self._fd_bloqueo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                time.sleep(espera)
+                espera = min(espera * 2, ESPERA_FLOCK_MAX)
+
+    def _abrir_lector(self):
+        if self._lector is not None:
+            self._lector.close()
+        open(self.archivo_diario, 'ab').close()
+        self._lector = open(self.archivo_diario, 'rb')
+        self._resto = b''
+        # Las escrituras siguientes van al mismo archivo que se está leyendo
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _cambio_archivo(self):
+        """True si otro proceso compactó y el diario ya es otro archivo"""
+        try:
+            return os.stat(self.archivo_diario).st_ino != os.fstat(self._lector.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _releer(self):
+        """Snapshot y diario desde cero, sin compactaciones a medio camino"""
+        with self.bloqueo():
+            datos, snapshot_seq = self._leer_snapshot()
+            self.seq = snapshot_seq
+            self._abrir_lector()
+            registros = self.leer_nuevos()
+        return datos, snapshot_seq, registros
+
+    def cargar(self):
+        datos, _, registros = self._releer()
+        self.pendientes = len(registros)
+        return datos, registros
+
+    def leer_nuevos(self):
+        """Registros nuevos de otros procesos, en orden.
+
+        Si otros procesos compactaron más de una vez desde la última lectura,
+        hay registros que solo quedaron en el snapshot: entonces el primer
+        elemento es {"op": "snapshot", "seq", "datos"} con el estado completo,
+        seguido de los registros posteriores.
+        """
+        registros = []
+        with self._bloqueo_local:
+            if self._lector is None:
+                self._abrir_lector()
+            while True:
+                # Se mira el archivo antes de leer: si ya cambió, el anterior
+                # no recibe más escrituras y lo leído abajo está completo.
+                cambio = self._cambio_archivo()
+                lineas = (self._resto + self._lector.read()).split(b'\n')
+                self._resto = lineas.pop()
+                for linea in lineas:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        # Línea de una escritura interrumpida en otro proceso
+                        continue
+                    if registro["seq"] <= self.seq:
+                        continue
+                    if registro["op"] == "compactado":
+                        # El snapshot ya incluye cambios que este proceso nunca leyó
+                        datos, snapshot_seq, posteriores = self._releer()
+                        return [{"op": "snapshot", "seq": snapshot_seq, "datos": datos}] + posteriores
+                    registros.append(registro)
+                    self.seq = registro["seq"]
+                if not cambio:
+                    break
+                self._abrir_lector()
+        self.pendientes += len(registros)
+        return registros
+
+    def registrar(self, registro):
+        if self._resto:
+            # Cierra la línea que dejó a medias un proceso que murió escribiendo
+            self._resto = b''
+            if self._f is None:
+                self._f = open(self.archivo_diario, 'a', encoding='utf-8')
+            self._f.write('\n')
+        super().registrar(registro)
+
+    def compactar(self, datos):
+        super().compactar(datos)
+        self._abrir_lector()
+
+    def cerrar(self):
+        super().cerrar()
+        if self._lector is not None:
+            self._lector.close()
+            self._lector = None
+            self._resto = b''
+        if self._fd_bloqueo is not None and self._profundidad == 0:
+            os.close(self._fd_bloqueo)
+            self._fd_bloqueo = None
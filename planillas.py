@@ -0,0 +1,111 @@
+import csv
+
+# ========== LECTURA DE PLANILLAS ==========
+#
+# Las planillas son CSV separados por ';' en windows-1252: unas filas de
+# título (skiprows), y después una fila por participante con el N° de
+# planilla en la columna 0, el nombre en col_nombre, seguido de carrera y BW,
+# y desde ahí las columnas de intentos y pesos válidos. Se leen con el módulo
+# csv, fila por fila, sin pandas.
+
+# Textos que pandas.read_csv lee como vacíos; se respetan para que una
+# planilla produzca los mismos registros que antes
+VALORES_NULOS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+ENCABEZADO_NOMBRE = 'NOMBRE / APELLIDOS'
+
+
+def _texto(valor):
+    return None if valor in VALORES_NULOS else valor
+
+
+def _numero(valor):
+    """int o float si el texto es numérico; si no, el texto tal cual (o None si es vacío)"""
+    if valor in VALORES_NULOS:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        pass
+    try:
+        return float(valor)
+    except ValueError:
+        return valor
+
+
+def leer_planilla(archivo, skiprows, col_nombre):
+    """Genera los registros de una planilla, uno por participante.
+
+    Cada registro trae ID_Planilla, Nombre, Carrera, BW y col_N para cada
+    columna desde col_nombre + 3; las celdas vacías quedan en None. Se
+    omiten las filas sin nombre y la fila de encabezado 'NOMBRE / APELLIDOS'.
+    """
+    with open(archivo, 'r', encoding='windows-1252', newline='') as f:
+        for _ in range(skiprows):
+            if not f.readline():
+                return
+
+        columnas = None
+        for fila in csv.reader(f, delimiter=';'):
+            if not fila:
+                continue
+            if columnas is None:
+                # Como pandas: la primera fila define cuántas columnas tiene la planilla
+                columnas = len(fila)
+                if col_nombre >= columnas:
+                    return
+            elif len(fila) > columnas:
+                raise ValueError(f"Se esperaban {columnas} columnas y la fila tiene {len(fila)}")
+
+            fila += [''] * (columnas - len(fila))
+
+            nombre = _texto(fila[col_nombre])
+            if nombre is None or nombre.strip() in ('', 'nan') or nombre.upper() == ENCABEZADO_NOMBRE:
+                continue
+
+            registro = {
+                'ID_Planilla': _numero(fila[0]),
+                'Nombre': nombre,
+                'Carrera': _texto(fila[col_nombre + 1]) if col_nombre + 1 < columnas else None,
+                'BW': _numero(fila[col_nombre + 2]) if col_nombre + 2 < columnas else None
+            }
+            for col in range(col_nombre + 3, columnas):
+                registro[f'col_{col}'] = _numero(fila[col])
+
+            yield registro
+
+
+def cargar_csv_pandas(archivo, skiprows, col_nombre):
+    """Lector anterior con pandas (opcional); se conserva para comparar resultados"""
+    import pandas as pd
+
+    df = pd.read_csv(
+        archivo, skiprows=skiprows, header=None,
+        delimiter=';', encoding='windows-1252'
+    )
+
+    if col_nombre >= len(df.columns):
+        return []
+
+    df_limpio = pd.DataFrame({
+        'ID_Planilla': df.iloc[:, 0],
+        'Nombre': df.iloc[:, col_nombre],
+        'Carrera': df.iloc[:, col_nombre+1] if col_nombre+1 < len(df.columns) else None,
+        'BW': df.iloc[:, col_nombre+2] if col_nombre+2 < len(df.columns) else None
+    })
+
+    for col in range(len(df.columns)):
+        if col >= col_nombre + 3:
+            df_limpio[f'col_{col}'] = df.iloc[:, col]
+
+    df_limpio = df_limpio.dropna(subset=['Nombre'])
+    df_limpio['Nombre'] = df_limpio['Nombre'].astype(str)
+    df_limpio = df_limpio[df_limpio['Nombre'].str.strip() != '']
+    df_limpio = df_limpio[df_limpio['Nombre'].str.strip() != 'nan']
+    df_limpio = df_limpio[df_limpio['Nombre'].str.upper() != 'NOMBRE / APELLIDOS']
+    df_limpio = df_limpio.where(pd.notnull(df_limpio), None)
+
+    return df_limpio.to_dict('records')
@@ -0,0 +1,141 @@
+import numpy as np
+
+# ========== MOTOR DE PUNTUACIÓN ==========
+#
+# Cada categoría guarda el BW y los pesos válidos de sus participantes en
+# arreglos NumPy, de modo que puntuar la categoría completa es una sola
+# operación vectorizada. La fórmula se elige por categoría en FILES_CONFIG
+# ("formula"); por defecto es la fuerza relativa (total / BW).
+
+DECIMALES = 4
+
+# Coeficientes Wilks (1995): a..f, y rango de BW válido
+WILKS = {
+    "M": ((-216.0475144, 16.2606339, -0.002388645, -0.00113732, 7.01863e-06, -1.291e-08), (40.0, 201.9)),
+    "F": ((594.31747775582, -27.23842536447, 0.82112226871, -0.00930733913, 4.731582e-05, -9.054e-08), (26.51, 154.53)),
+}
+
+# Coeficientes DOTS: a..e, y rango de BW válido
+DOTS = {
+    "M": ((-307.75076, 24.0900756, -0.1918759221, 0.0007391293, -0.000001093), (40.0, 210.0)),
+    "F": ((-57.96288, 13.6175032, -0.1126655495, 0.0005158568, -0.0000010706), (40.0, 150.0)),
+}
+
+# Coeficientes IPF GL (2020): A, B, C por modalidad
+IPF_GL = {
+    ("classic", "powerlifting", "M"): (1199.72839, 1025.18162, 0.00921),
+    ("classic", "powerlifting", "F"): (610.32796, 1045.59282, 0.03048),
+    ("classic", "banca", "M"): (320.98041, 281.40258, 0.01008),
+    ("classic", "banca", "F"): (142.40398, 442.52671, 0.04724),
+    ("equipado", "powerlifting", "M"): (1236.25115, 1449.21864, 0.01644),
+    ("equipado", "powerlifting", "F"): (758.63878, 949.31382, 0.02435),
+    ("equipado", "banca", "M"): (381.22073, 733.79378, 0.02398),
+    ("equipado", "banca", "F"): (221.82209, 357.00377, 0.02937),
+}
+
+
+def _polinomio(coeficientes, x):
+    resultado = np.zeros_like(x)
+    for c in reversed(coeficientes):
+        resultado = resultado * x + c
+    return resultado
+
+
+def fuerza_relativa(totales, bw, config):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(bw > 0, totales / bw, 0.0)
+
+
+def wilks(totales, bw, config):
+    coeficientes, (minimo, maximo) = WILKS[config.get("sexo", "M")]
+    x = np.clip(bw, minimo, maximo)
+    return np.where(bw > 0, totales * 500.0 / _polinomio(coeficientes, x), 0.0)
+
+
+def dots(totales, bw, config):
+    coeficientes, (minimo, maximo) = DOTS[config.get("sexo", "M")]
+    x = np.clip(bw, minimo, maximo)
+    return np.where(bw > 0, totales * 500.0 / _polinomio(coeficientes, x), 0.0)
+
+
+def ipf_gl(totales, bw, config):
+    # Las categorías que solo tienen press de banca usan los coeficientes de banca;
+    # el resto (incluidas las de uno o dos movimientos) los de powerlifting.
+    evento = "banca" if list(config["movimientos"]) == ["press_banca"] else "powerlifting"
+    a, b, c = IPF_GL[(config.get("equipo", "classic"), evento, config.get("sexo", "M"))]
+    with np.errstate(over='ignore', invalid='ignore'):
+        puntos = totales * 100.0 / (a - b * np.exp(-c * bw))
+    return np.where(bw >= 35, puntos, 0.0)
+
+
+FORMULAS = {
+    "fuerza_relativa": fuerza_relativa,
+    "wilks": wilks,
+    "dots": dots,
+    "ipf_gl": ipf_gl,
+}
+
+
+class MotorPuntuacion:
+    """Columnas BW y válidos de una categoría como arreglos, fila por participante"""
+
+    def __init__(self, config, movimientos, capacidad=64):
+        self.config = config
+        self.formula = FORMULAS[config.get("formula", "fuerza_relativa")]
+        self.cols_valido = [mov.col_valido for mov in movimientos]
+        self.bw = np.zeros(capacidad)
+        self.validos = np.zeros((capacidad, len(self.cols_valido)))
+        self.ids = []
+        self.fila = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _crecer(self):
+        capacidad = max(2 * len(self.bw), 1)
+        bw = np.zeros(capacidad)
+        bw[:len(self.ids)] = self.bw[:len(self.ids)]
+        validos = np.zeros((capacidad, self.validos.shape[1]))
+        validos[:len(self.ids)] = self.validos[:len(self.ids)]
+        self.bw, self.validos = bw, validos
+
+    def actualizar(self, p):
+        """Copia BW y pesos válidos del participante a su fila"""
+        fila = self.fila.get(p.id)
+        if fila is None:
+            if len(self.ids) == len(self.bw):
+                self._crecer()
+            fila = len(self.ids)
+            self.fila[p.id] = fila
+            self.ids.append(p.id)
+        self.bw[fila] = p.bw
+        cols = p.cols
+        self.validos[fila] = [cols.get(col, 0.0) for col in self.cols_valido]
+
+    def quitar(self, p):
+        """Elimina la fila del participante moviendo la última a su lugar"""
+        fila = self.fila.pop(p.id, None)
+        if fila is None:
+            return
+        ultima = len(self.ids) - 1
+        if fila != ultima:
+            id_ultimo = self.ids[ultima]
+            self.bw[fila] = self.bw[ultima]
+            self.validos[fila] = self.validos[ultima]
+            self.ids[fila] = id_ultimo
+            self.fila[id_ultimo] = fila
+        self.ids.pop()
+
+    def puntuar_todos(self):
+        """Puntajes de toda la categoría en una llamada; devuelve (ids, puntajes)"""
+        n = len(self.ids)
+        totales = self.validos[:n].sum(axis=1)
+        puntajes = np.round(self.formula(totales, self.bw[:n], self.config), DECIMALES)
+        return self.ids, puntajes
+
+    def puntaje(self, p):
+        fila = self.fila.get(p.id)
+        if fila is None:
+            return 0.0
+        totales = self.validos[fila:fila + 1].sum(axis=1)
+        return float(np.round(self.formula(totales, self.bw[fila:fila + 1], self.config), DECIMALES)[0])
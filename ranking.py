@@ -0,0 +1,91 @@
+from bisect import bisect_left, insort
+
+# ========== ÍNDICE DE RANKING ==========
+#
+# Lista ordenada de claves (-puntaje, orden, id). El orden de planilla
+# desempata igual que el sort estable original, así que el resultado es el
+# mismo que recalcular y ordenar toda la categoría. Cada cambio mueve solo
+# la clave del participante afectado.
+#
+# IndiceOrden es la misma estructura con cualquier clave que termine en el
+# id; la usan los órdenes por planilla, nombre y pesos de /ranking y
+# /movimiento.
+
+
+class IndiceOrden:
+
+    def __init__(self, clave):
+        self.clave = clave
+        self.claves = []
+        self.clave_de = {}
+        self.participante_de = {}
+
+    def __len__(self):
+        return len(self.claves)
+
+    def actualizar(self, p):
+        """Recalcula la clave de un participante y lo reubica"""
+        clave = self.clave(p)
+        anterior = self.clave_de.get(p.id)
+        if anterior == clave:
+            return
+        if anterior is not None:
+            del self.claves[bisect_left(self.claves, anterior)]
+        insort(self.claves, clave)
+        self.clave_de[p.id] = clave
+        self.participante_de[p.id] = p
+
+    def quitar(self, p):
+        anterior = self.clave_de.pop(p.id, None)
+        if anterior is not None:
+            del self.claves[bisect_left(self.claves, anterior)]
+            del self.participante_de[p.id]
+
+    def reconstruir(self, participantes):
+        self.clave_de = {p.id: self.clave(p) for p in participantes}
+        self.participante_de = {p.id: p for p in participantes}
+        self.claves = sorted(self.clave_de.values())
+
+    def posicion(self, id):
+        """Lugar (desde 1) del participante en este orden"""
+        return bisect_left(self.claves, self.clave_de[id]) + 1
+
+    def pagina(self, ids=None, offset=0, limit=None, descendente=False):
+        """Claves de los participantes `ids` (todos si es None) en este orden, paginadas.
+
+        Devuelve (total, claves de la página). Sin filtro se corta la lista ya
+        ordenada; con filtro se ordenan solo las claves de los elegidos.
+        """
+        if ids is None:
+            claves = self.claves
+        else:
+            clave_de = self.clave_de
+            claves = sorted(clave_de[id] for id in ids if id in clave_de)
+        total = len(claves)
+        if limit is None:
+            limit = total
+        if descendente:
+            fin = max(0, total - offset)
+            return total, claves[max(0, fin - limit):fin][::-1]
+        return total, claves[offset:offset + limit]
+
+
+class IndiceRanking(IndiceOrden):
+
+    def __init__(self, puntuar):
+        super().__init__(lambda p: (-puntuar(p), p.orden, p.id))
+        self.puntuar = puntuar
+
+    def reconstruir(self, participantes, puntajes=None):
+        """Reordena todo; `puntajes` (id -> puntaje) evita puntuar uno por uno"""
+        if puntajes is None:
+            puntajes = {p.id: self.puntuar(p) for p in participantes}
+        self.clave_de = {p.id: (-puntajes[p.id], p.orden, p.id) for p in participantes}
+        self.participante_de = {p.id: p for p in participantes}
+        self.claves = sorted(self.clave_de.values())
+
+    def __iter__(self):
+        """Recorre (lugar, participante, puntaje) de mayor a menor puntaje"""
+        participante_de = self.participante_de
+        for lugar, (neg_puntaje, _, id) in enumerate(self.claves, start=1):
+            yield lugar, participante_de[id], -neg_puntaje
@@ -0,0 +1,107 @@
+from busqueda import normalizar
+from participantes import _texto, convertir_a_float
+
+# ========== RECARGA DE PLANILLAS ==========
+#
+# Cuando una planilla cambia en disco (inscripciones de última hora), sus
+# registros se comparan con los participantes en vivo y se traducen en
+# registros de cambio normales: "add" para los atletas nuevos y "set" con el
+# BW, la carrera, el nombre o los intentos declarados que cambiaron. Los
+# resultados de los jueces (res_*) y los pesos válidos no salen nunca de la
+# planilla, y un atleta que ya no está en ella no se borra.
+#
+# Con la lectura anterior de la misma planilla (`anteriores`) solo se toma
+# lo que cambió en el archivo desde entonces: si la planilla no tocó un
+# campo, gana lo que los jueces editaron en vivo.
+
+
+def _clave(registro):
+    return normalizar(registro.get("Nombre"))
+
+
+def _emparejar(cat, registros):
+    """(registro, participante o None) para cada registro de la planilla.
+
+    Primero por nombre (los homónimos en el orden de planilla) y, para los
+    que quedan, por N° de planilla si identifica a un solo participante sin
+    pareja: así una corrección del nombre no crea un atleta nuevo.
+    """
+    libres = {}
+    for p in cat:
+        libres.setdefault(normalizar(p.nombre), []).append(p)
+
+    parejas = []
+    sin_pareja = []
+    for registro in registros:
+        candidatos = libres.get(_clave(registro))
+        if candidatos:
+            parejas.append((registro, candidatos.pop(0)))
+        else:
+            sin_pareja.append(registro)
+
+    por_planilla = {}
+    for candidatos in libres.values():
+        for p in candidatos:
+            por_planilla.setdefault(p.id_planilla, []).append(p)
+    for registro in sin_pareja:
+        candidatos = por_planilla.get(registro.get("ID_Planilla"))
+        if registro.get("ID_Planilla") is not None and candidatos and len(candidatos) == 1:
+            parejas.append((registro, candidatos.pop()))
+        else:
+            parejas.append((registro, None))
+    return parejas
+
+
+def _por_clave(registros):
+    """Lectura anterior indexada por nombre (y N° de planilla) para comparar campo a campo"""
+    indice = {}
+    for registro in registros or ():
+        indice.setdefault(("nombre", _clave(registro)), registro)
+        if registro.get("ID_Planilla") is not None:
+            indice.setdefault(("planilla", registro["ID_Planilla"]), registro)
+    return indice
+
+
+def fusionar(cat, registros, anteriores=None):
+    """Registros de cambio que incorporan la planilla `registros` a la categoría en vivo"""
+    previos = _por_clave(anteriores)
+    cambios = []
+
+    for registro, p in _emparejar(cat, registros):
+        if p is None:
+            cambios.append({"op": "add", "participante": dict(registro)})
+            continue
+
+        previo = previos.get(("nombre", _clave(registro)))
+        if previo is None and registro.get("ID_Planilla") is not None:
+            previo = previos.get(("planilla", registro["ID_Planilla"]))
+
+        def cambio_en_planilla(clave, convertir):
+            # Sin lectura anterior cualquier diferencia cuenta
+            nuevo = convertir(registro.get(clave))
+            return previo is None or convertir(previo.get(clave)) != nuevo, nuevo
+
+        campos = {}
+        cambio, nombre = cambio_en_planilla("Nombre", lambda v: str(v).strip() if v else None)
+        if cambio and nombre and nombre != p.nombre.strip():
+            campos["Nombre"] = nombre
+        cambio, carrera = cambio_en_planilla("Carrera", _texto)
+        if cambio and carrera != p.carrera:
+            campos["Carrera"] = carrera
+        cambio, bw = cambio_en_planilla("BW", convertir_a_float)
+        if cambio and bw > 0 and bw != p.bw:
+            campos["BW"] = bw
+
+        for mov in cat.movimientos.values():
+            for i, clave in enumerate(mov.claves_intento, start=1):
+                # Un intento ya juzgado conserva el peso con que se juzgó
+                if mov.resultado(p, i) is not None:
+                    continue
+                cambio, peso = cambio_en_planilla(clave, convertir_a_float)
+                if cambio and peso > 0 and peso != mov.peso(p, i):
+                    campos[clave] = peso
+
+        if campos:
+            cambios.append({"op": "set", "id": p.id, "campos": campos})
+
+    return cambios
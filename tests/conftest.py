@@ -0,0 +1,55 @@
+import glob
+import os
+import shutil
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MOVIMIENTOS = {
+    "sentadilla": {"intento1": 4, "intento2": 5, "intento3": 6, "valido": 7, "nombre": "Sentadilla", "intentos": 3},
+    "press_banca": {"intento1": 8, "intento2": 9, "intento3": 10, "valido": 11, "nombre": "Press Banca", "intentos": 3},
+    "peso_muerto": {"intento1": 12, "intento2": 13, "intento3": 14, "valido": 15, "nombre": "Peso Muerto", "intentos": 3},
+}
+COLUMNAS = 19
+
+
+def copiar_proyecto(directorio):
+    """Copia el código y las páginas a `directorio` (sin planillas ni datos)"""
+    for patron in ("*.py", "*.html"):
+        for archivo in glob.glob(os.path.join(RAIZ, patron)):
+            shutil.copy(archivo, directorio)
+
+
+def escribir_competencia(directorio, categorias, participantes, azar):
+    """Escribe en `directorio` las planillas y el configuracion.py de una competencia sintética.
+
+    Devuelve los cat_id en el orden de FILES_CONFIG.
+    """
+    config = {}
+    for n in range(categorias):
+        cat_id = f"categoria_{n + 1}"
+        archivo = f"{cat_id}.csv"
+        config[cat_id] = {
+            "file": archivo, "sexo": "M" if n % 2 else "F", "formula": "fuerza_relativa",
+            "skiprows": 3, "col_nombre": 1, "movimientos": MOVIMIENTOS
+        }
+        with open(os.path.join(directorio, archivo), "w", encoding="windows-1252") as f:
+            f.write(";CATEGORIA SINTETICA" + ";" * (COLUMNAS - 2) + "\n")
+            f.write(";NOMBRE / APELLIDOS;CARRERA;BW" + ";" * (COLUMNAS - 4) + "\n")
+            f.write(";" * (COLUMNAS - 1) + "\n")
+            for i in range(1, participantes + 1):
+                fila = [""] * COLUMNAS
+                fila[0] = str(i)
+                fila[1] = f"Atleta {n + 1}-{i}"
+                fila[2] = azar.choice(["Kinesiologia", "Derecho", "Fisica"])
+                fila[3] = f"{azar.uniform(50, 120):.1f}"
+                for mov in MOVIMIENTOS.values():
+                    fila[mov["intento1"]] = str(azar.randrange(40, 200, 5))
+                    fila[mov["valido"]] = "0"
+                f.write(";".join(fila) + "\n")
+
+    with open(os.path.join(directorio, "configuracion.py"), "w", encoding="utf-8") as f:
+        f.write(f"FILES_CONFIG = {config!r}\n")
+        f.write("PUNTOS_EQUIPOS = [12, 9, 8, 7, 6, 5, 4, 3, 2, 1]\nALIAS_CARRERAS = {}\n")
+    return list(config)
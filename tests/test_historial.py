@@ -0,0 +1,38 @@
+"""Récords batidos en vivo: quedan en historial.db hasta que se archiva la competencia."""
+from conftest import MOVIMIENTOS
+from historial import Historial
+from participantes import Categoria
+
+
+def test_record_en_vivo_sobrevive_al_reinicio(tmp_path):
+    archivo = str(tmp_path / "historial.db")
+    historial = Historial(archivo)
+    historial.importar("pasada", "Pasada", "2025-10-01", "prueba",
+                       [("varones", "Viejo", None, "M", 80.0, "sentadilla", 150.0)])
+
+    config = {"sexo": "M", "formula": "fuerza_relativa", "movimientos": MOVIMIENTOS}
+    cat = Categoria.desde_registros("varones", config, [{"Nombre": "Nuevo", "BW": 75, "col_7": 160}])
+    p = cat.participantes[0]
+    batidos = historial.comprobar("actual", cat, p, fecha="2026-10-17")
+    assert [(r["movimiento"], r["peso"], r["anterior"]["atleta"]) for r in batidos] == [("sentadilla", 160.0, "Viejo")]
+    historial.cerrar()
+
+    # Otro proceso (o el mismo después de reiniciar) ve el récord en vivo
+    historial = Historial(archivo)
+    assert historial.en_vivo == {("sentadilla", "M"): batidos[0]}
+    assert historial.tabla_records("sentadilla") == batidos
+    assert historial.comprobar("actual", cat, p) == []
+
+    # Un intento borrado que baja el peso devuelve el récord archivado
+    cat.aplicar({"op": "set", "id": p.id, "campos": {"col_7": 140}})
+    historial.comprobar("actual", cat, p)
+    assert Historial(archivo).en_vivo == {}
+    cat.aplicar({"op": "set", "id": p.id, "campos": {"col_7": 160}})
+    assert historial.comprobar("actual", cat, p)
+
+    # Al archivar, el récord pasa a ser una marca de la competencia
+    historial.importar("actual", "Actual", "2026-10-17", "en vivo",
+                       [("varones", "Nuevo", None, "M", 75.0, "sentadilla", 160.0)])
+    assert historial.en_vivo == {}
+    assert Historial(archivo).en_vivo == {}
+    assert [(r["competencia"], r["en_vivo"]) for r in historial.tabla_records("sentadilla")] == [("actual", False)]
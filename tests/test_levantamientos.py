@@ -0,0 +1,56 @@
+"""El orden "turno" de /movimiento contra ordenar toda la tabla por el próximo intento.
+
+La cola de levantamientos y el índice de la tabla se mantienen con cada
+cambio; después de cada mutación al azar se comparan con el orden que
+sale de recorrer a todos: primero los que tienen peso declarado para su
+próximo intento (menor peso, menor intento, orden de planilla), después
+los que no lo declararon y al final los que ya hicieron todos.
+"""
+import random
+
+from conftest import MOVIMIENTOS
+from participantes import Categoria
+
+
+def turno_recalculado(cat, mov):
+    def clave(p):
+        intento = next((i for i in range(1, mov.intentos + 1) if mov.resultado(p, i) is None), None)
+        if intento is None:
+            return (2, 0.0, 0, p.orden)
+        peso = mov.peso(p, intento)
+        if peso <= 0:
+            return (1, 0.0, intento, p.orden)
+        return (0, peso, intento, p.orden)
+    return sorted(cat.participantes, key=clave)
+
+
+def test_turno_con_resultados_pesos_y_bajas():
+    config = {"sexo": "M", "formula": "fuerza_relativa", "movimientos": MOVIMIENTOS}
+    azar = random.Random(5)
+    registros = [{"Nombre": f"Atleta {i}", "BW": 70, "col_4": azar.choice([0, 100, 120])} for i in range(30)]
+    cat = Categoria.desde_registros("turno", config, registros)
+
+    for _ in range(400):
+        mov = cat.movimientos[azar.choice(list(MOVIMIENTOS))]
+        intento = azar.randint(1, mov.intentos)
+        p = azar.choice(cat.participantes)
+        operacion = azar.random()
+        if operacion < 0.03 and len(cat) > 5:
+            cat.aplicar({"op": "del", "id": p.id})
+        elif operacion < 0.06:
+            cat.aplicar({"op": "add", "participante": {"Nombre": "Nuevo", "BW": 80, "col_4": 110}})
+        elif operacion < 0.5:
+            cat.aplicar({"op": "set", "id": p.id, "campos": {
+                mov.claves_res[intento - 1]: azar.choice(["exito", "fallo", None])}})
+        else:
+            cat.aplicar({"op": "set", "id": p.id, "campos": {
+                mov.claves_intento[intento - 1]: azar.choice([0, 90, 100, 110, 120])}})
+
+        for mov in cat.movimientos.values():
+            esperado = [p.id for p in turno_recalculado(cat, mov)]
+            total, participantes = cat.consultar("turno", mov_id=mov.id)
+            assert total == len(cat)
+            assert [p.id for p in participantes] == esperado
+            # Los próximos de /orden son el principio de la tabla
+            siguientes = cat.orden_levantamiento(mov.id, 5)["siguientes"]
+            assert [s["ID"] for s in siguientes] == esperado[:len(siguientes)]
@@ -0,0 +1,152 @@
+"""Varios workers de gunicorn (-k eventlet, como el Procfile) sobre el mismo diario.
+
+Se conectan clientes Socket.IO hasta tener clientes en cada worker, se
+escribe por HTTP (lo atiende uno de ellos) y se comprueba que los clientes
+de todos los workers reciben datos_actualizados con el cambio y que todos
+sirven el estado nuevo.
+"""
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from conftest import RAIZ, copiar_proyecto
+
+simple_websocket = pytest.importorskip("simple_websocket")
+pytest.importorskip("gunicorn")
+
+WORKERS = 2
+CATEGORIA = "varones_overall"
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pedir(puerto, ruta, datos=None):
+    cuerpo = json.dumps(datos).encode() if datos is not None else None
+    peticion = urllib.request.Request(
+        f"http://127.0.0.1:{puerto}{ruta}", data=cuerpo,
+        headers={"Content-Type": "application/json", "Connection": "close"} if cuerpo else {"Connection": "close"}
+    )
+    with urllib.request.urlopen(peticion, timeout=10) as respuesta:
+        return json.loads(respuesta.read())
+
+
+class ClienteSocket:
+    """Cliente Socket.IO mínimo (Engine.IO v4 sobre websocket)"""
+
+    def __init__(self, puerto):
+        self.ws = simple_websocket.Client(f"ws://127.0.0.1:{puerto}/socket.io/?EIO=4&transport=websocket")
+        # No se espera el paquete "open" de Engine.IO: si llega en el mismo
+        # segmento que la respuesta 101, simple_websocket no lo entrega hasta
+        # la próxima lectura del socket (el primer ping, 25 s después)
+        self.ws.send("40")
+        self.mensajes = []
+        self.worker = None
+        self.condicion = threading.Condition()
+        threading.Thread(target=self._escuchar, daemon=True).start()
+        # El ack de suscribir trae el pid del worker que atiende la conexión
+        self.ws.send('421' + json.dumps(["suscribir", {"categorias": [CATEGORIA]}]))
+        with self.condicion:
+            assert self.condicion.wait_for(lambda: self.worker is not None, 10), "suscribir sin respuesta"
+
+    def _escuchar(self):
+        while True:
+            try:
+                paquete = self.ws.receive()
+            except simple_websocket.ConnectionClosed:
+                return
+            with self.condicion:
+                if paquete == "2":
+                    self.ws.send("3")
+                elif paquete.startswith("431"):
+                    self.worker = json.loads(paquete[3:])[0]["worker"]
+                elif paquete.startswith("42"):
+                    evento, mensaje = json.loads(paquete[2:])[:2]
+                    if evento == "datos_actualizados":
+                        self.mensajes.append(mensaje)
+                self.condicion.notify_all()
+
+    def esperar(self, condicion, limite=10):
+        with self.condicion:
+            return self.condicion.wait_for(lambda: any(condicion(m) for m in self.mensajes), limite)
+
+    def cerrar(self):
+        self.ws.close()
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    directorio = str(tmp_path)
+    copiar_proyecto(directorio)
+    for archivo in os.listdir(RAIZ):
+        if archivo.endswith(".csv"):
+            shutil.copy(os.path.join(RAIZ, archivo), directorio)
+
+    puerto = puerto_libre()
+    entorno = dict(os.environ, WORKERS=str(WORKERS), RECARGAR_PLANILLAS_MS="0", PYTHONUNBUFFERED="1")
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "eventlet", "-w", str(WORKERS),
+         "-b", f"127.0.0.1:{puerto}", "--graceful-timeout", "2", "app:app"],
+        cwd=directorio, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(300):
+            try:
+                pedir(puerto, "/salas")
+                break
+            except OSError:
+                time.sleep(0.05)
+        else:
+            pytest.fail("gunicorn no respondió")
+        yield puerto
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+
+
+def test_escritura_llega_a_todos_los_workers(servidor):
+    clientes = []
+    try:
+        # El kernel reparte las conexiones entre los workers que ya están
+        # aceptando (alguno puede estar todavía importando la app): se abren
+        # hasta tener clientes en todos
+        limite = time.monotonic() + 30
+        while len({c.worker for c in clientes}) < WORKERS:
+            assert time.monotonic() < limite, f"los clientes solo quedaron en {sorted({c.worker for c in clientes})}"
+            clientes.append(ClienteSocket(servidor))
+            time.sleep(0.05)
+
+        estado = pedir(servidor, f"/categoria/{CATEGORIA}")
+        version = estado["version"]
+        participante = estado["ranking"][0]
+        nuevo_bw = participante["BW"] + 7.5
+        assert pedir(servidor, "/editar_bw", {"cat_id": CATEGORIA, "id": participante["ID"], "bw": nuevo_bw})["status"] == "exito"
+
+        def con_el_cambio(mensaje):
+            return mensaje["version"] > version and any(
+                cambio.get("id") == participante["ID"] and cambio.get("campos", {}).get("BW") == nuevo_bw
+                for cambio in mensaje["cambios"])
+
+        for cliente in clientes:
+            assert cliente.esperar(con_el_cambio), f"el worker {cliente.worker} no difundió el cambio de BW"
+
+        # Cualquier worker que atienda la lectura ya tiene el estado nuevo
+        for _ in range(4 * WORKERS):
+            estado = pedir(servidor, f"/categoria/{CATEGORIA}")
+            assert estado["version"] > version
+            fila = next(f for f in estado["ranking"] if f["ID"] == participante["ID"])
+            assert fila["BW"] == nuevo_bw
+    finally:
+        for cliente in clientes:
+            cliente.cerrar()
@@ -0,0 +1,47 @@
+"""Snapshot por categoría: se carga sin decodificar y se reescribe tal cual si nadie lo tocó."""
+import json
+
+from persistencia import Diario, RegistrosSnapshot
+
+
+def registros(n, prefijo):
+    return [{"ID": i, "Nombre": f"{prefijo} {i}", "BW": 60.0 + i} for i in range(1, n + 1)]
+
+
+def test_snapshot_por_categoria(tmp_path):
+    archivo = str(tmp_path / "competencia_backup.json")
+    diario = Diario(archivo)
+    datos = {"varones": registros(3, "Atleta"), "damas": registros(2, "Atleta ñ")}
+    diario.registrar({"op": "set", "cat": "varones", "id": 1, "campos": {"BW": 70.0}})
+    diario.compactar(datos)
+    diario.cerrar()
+
+    snapshot, cola = Diario(archivo).cargar()
+    assert cola == []
+    assert list(snapshot) == ["varones", "damas"]
+    assert all(isinstance(lista, RegistrosSnapshot) for lista in snapshot.values())
+    assert {cat_id: len(lista) for cat_id, lista in snapshot.items()} == {"varones": 3, "damas": 2}
+    assert {cat_id: list(lista) for cat_id, lista in snapshot.items()} == datos
+
+    # Sin decodificar: la línea de la categoría que no cambió se copia igual
+    lineas = open(archivo, encoding="utf-8").read().splitlines()
+    otro = Diario(archivo)
+    otro.cargar()
+    otro.compactar(dict(snapshot, varones=registros(4, "Otro")))
+    otro.cerrar()
+    nuevas = open(archivo, encoding="utf-8").read().splitlines()
+    assert nuevas[2] == lineas[2]
+    assert json.loads(nuevas[0])["categorias"] == {"varones": 4, "damas": 2}
+
+
+def test_snapshot_en_un_solo_json(tmp_path):
+    """Los backups escritos antes del formato por líneas se siguen leyendo"""
+    archivo = tmp_path / "competencia_backup.json"
+    datos = {"varones": registros(2, "Atleta")}
+    archivo.write_text(json.dumps({"seq": 7, "datos": datos}), encoding="utf-8")
+    diario = Diario(str(archivo))
+    assert diario.cargar() == (datos, [])
+    assert diario.seq == 7
+
+    archivo.write_text(json.dumps(datos), encoding="utf-8")
+    assert Diario(str(archivo)).cargar() == (datos, [])
@@ -0,0 +1,62 @@
+"""El lector de planillas con csv contra el lector anterior con pandas.
+
+Ambos tienen que entregar los mismos registros (una celda vacía es None o
+NaN según el lector; 1 y 1.0 cuentan como iguales) y los mismos
+participantes. Una columna numérica con algún texto no entra en la
+comparación: pandas la deja entera como texto y el lector con csv convierte
+celda por celda. Sin pandas instalado se omite.
+"""
+import math
+import os
+import random
+
+import pytest
+
+from conftest import RAIZ, escribir_competencia
+from configuracion import FILES_CONFIG
+from participantes import Participante
+from planillas import cargar_csv_pandas, leer_planilla
+
+pytest.importorskip("pandas")
+
+
+def vacio(valor):
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def mismo_valor(a, b):
+    if vacio(a) or vacio(b):
+        return vacio(a) and vacio(b)
+    return a == b
+
+
+def comparar(archivo, skiprows, col_nombre):
+    nuevos = list(leer_planilla(archivo, skiprows, col_nombre))
+    anteriores = cargar_csv_pandas(archivo, skiprows, col_nombre)
+    assert len(nuevos) == len(anteriores)
+    for i, (nuevo, anterior) in enumerate(zip(nuevos, anteriores)):
+        assert nuevo.keys() == anterior.keys(), f"fila {i}"
+        for clave in anterior:
+            assert mismo_valor(nuevo[clave], anterior[clave]), f"fila {i} {clave}: {nuevo[clave]!r} != {anterior[clave]!r}"
+        assert Participante.desde_dict(nuevo, i).a_dict() == Participante.desde_dict(anterior, i).a_dict(), f"fila {i}"
+    return nuevos
+
+
+@pytest.mark.parametrize("cat_id", list(FILES_CONFIG))
+def test_planillas_de_la_competencia(cat_id):
+    config = FILES_CONFIG[cat_id]
+    comparar(os.path.join(RAIZ, config["file"]), config["skiprows"], config["col_nombre"])
+
+
+def test_planilla_con_celdas_raras(tmp_path):
+    """Vacíos, textos que pandas toma por nulos, decimales, nombres vacíos y filas cortas"""
+    directorio = str(tmp_path)
+    escribir_competencia(directorio, 1, 5, random.Random(0))
+    archivo = os.path.join(directorio, "categoria_1.csv")
+    with open(archivo, "a", encoding="windows-1252") as f:
+        f.write("6;Peña Núñez;NA;72.5;100;;n/a;1" + ";" * 11 + "\n")
+        f.write("7;;Derecho;80" + ";" * 15 + "\n")
+        f.write("8;nan;Derecho;80" + ";" * 15 + "\n")
+        f.write("9;Corta;Fisica\n")
+    nuevos = comparar(archivo, 3, 1)
+    assert [r["Nombre"] for r in nuevos][-3:] == ["Atleta 1-5", "Peña Núñez", "Corta"]
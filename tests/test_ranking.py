@@ -0,0 +1,209 @@
+"""El ranking incremental (ranking.IndiceRanking) contra recalcular y ordenar toda la categoría.
+
+Se aplican mutaciones al azar y después de cada una se compara con el
+cálculo anterior: calcular_fuerza_relativa_total para cada participante en
+orden de planilla y un sort estable por puntaje.
+"""
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+
+import pytest
+
+from conftest import MOVIMIENTOS, RAIZ, copiar_proyecto, escribir_competencia
+
+
+@pytest.fixture(scope="module")
+def app_modulo(tmp_path_factory):
+    """app.py importado en una copia del proyecto con una competencia sintética"""
+    directorio = str(tmp_path_factory.mktemp("competencia_ranking"))
+    copiar_proyecto(directorio)
+    categorias = escribir_competencia(directorio, 2, 40, random.Random(0))
+
+    entorno = {"RECARGAR_PLANILLAS_MS": "0", "COALESCER_MS": "0"}
+    previo = {clave: os.environ.get(clave) for clave in entorno}
+    os.environ.update(entorno)
+    # La configuración y la app tienen que ser las de la copia
+    modulos = {nombre: sys.modules.pop(nombre) for nombre in ("app", "configuracion") if nombre in sys.modules}
+    os.chdir(directorio)
+    sys.path.insert(0, directorio)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+        app.categorias_sinteticas = categorias
+        yield app
+    finally:
+        os.chdir(RAIZ)
+        sys.path.remove(directorio)
+        sys.modules.pop("app", None)
+        sys.modules.pop("configuracion", None)
+        sys.modules.update(modulos)
+        for clave, valor in previo.items():
+            if valor is None:
+                os.environ.pop(clave, None)
+            else:
+                os.environ[clave] = valor
+
+
+def ranking_recalculado(app, cat_id):
+    """Como el /ranking original: puntúa a cada participante y ordena toda la lista"""
+    ranking = []
+    with app.app.app_context():
+        # calcular_fuerza_relativa_total lee la competencia de la petición
+        app.g.competencia = app.principal
+        for c in app.principal.datos[cat_id]:
+            ranking.append({
+                "Nombre": c.nombre,
+                "Carrera": c.carrera,
+                "BW": c.bw,
+                "Total_Fuerza_Relativa": app.calcular_fuerza_relativa_total(cat_id, c)
+            })
+    ranking.sort(key=lambda x: x.get("Total_Fuerza_Relativa", 0), reverse=True)
+    for i, fila in enumerate(ranking):
+        fila["Lugar"] = i + 1
+    return ranking
+
+
+def csv_recalculado(ranking):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['Lugar', 'Nombre', 'Carrera', 'BW', 'F.R._Total'])
+    writer.writeheader()
+    for fila in ranking:
+        writer.writerow({
+            'Lugar': fila["Lugar"],
+            'Nombre': fila["Nombre"],
+            'Carrera': fila["Carrera"],
+            'BW': round(fila["BW"], 1),
+            'F.R._Total': round(fila["Total_Fuerza_Relativa"], 4)
+        })
+    return output.getvalue()
+
+
+def mutar(cliente, cat, cat_id, azar):
+    """Aplica una operación al azar por su ruta; devuelve (ruta, respuesta)"""
+    movimientos = list(MOVIMIENTOS)
+    ids = [c.id for c in cat]
+    operacion = azar.choice(["agregar", "editar_bw", "eliminar", "actualizar_peso", "actualizar_peso",
+                             "editar_intento1", "registrar_intento", "registrar_intento", "borrar_intento"])
+
+    if operacion == "agregar" or not ids:
+        nombre = f"Nuevo {azar.randrange(1000)}"
+        if ids and azar.random() < 0.2:
+            # Homónimo de alguien que ya está
+            nombre = cat.por_id[azar.choice(ids)].nombre
+        datos = {
+            "cat_id": cat_id, "nombre": nombre, "carrera": azar.choice(["Kinesiologia", "Derecho", ""]),
+            "bw": round(azar.uniform(50, 120), 1),
+            "intentos": {mov: {"intento1": azar.randrange(40, 200, 5)} for mov in movimientos},
+        }
+        return "/agregar_completo", cliente.post("/agregar_completo", json=datos)
+
+    base = {"cat_id": cat_id, "id": azar.choice(ids)}
+    if operacion == "editar_bw":
+        # A veces 0: puntaje 0 y empates con los que no levantaron nada
+        bw = 0 if azar.random() < 0.1 else round(azar.uniform(50, 120), 1)
+        return "/editar_bw", cliente.post("/editar_bw", json=dict(base, bw=bw))
+    if operacion == "eliminar":
+        return "/eliminar_participante", cliente.post("/eliminar_participante", json=base)
+
+    base.update(mov_id=azar.choice(movimientos), intento=azar.randint(1, 3))
+    if operacion == "actualizar_peso":
+        return "/actualizar_peso", cliente.post("/actualizar_peso", json=dict(base, peso=azar.randrange(40, 250, 5)))
+    if operacion == "editar_intento1":
+        return "/editar_intento1", cliente.post("/editar_intento1", json=dict(base, nuevo_peso=azar.randrange(40, 250, 5)))
+    if operacion == "registrar_intento":
+        resultado = azar.choice(["exito", "exito", "fallo"])
+        return "/registrar_intento", cliente.post("/registrar_intento", json=dict(base, resultado=resultado))
+    return "/borrar_intento", cliente.post("/borrar_intento", json=base)
+
+
+def comprobar(app, cliente, cat_id, contexto):
+    esperado = ranking_recalculado(app, cat_id)
+    obtenido = [
+        {clave: fila[clave] for clave in ("Lugar", "Nombre", "Carrera", "BW", "Total_Fuerza_Relativa")}
+        for fila in cliente.get(f"/ranking/{cat_id}").get_json()
+    ]
+    assert obtenido == esperado, f"/ranking/{cat_id} después de {contexto}"
+
+    respuesta = cliente.get(f"/descargar/{cat_id}")
+    if esperado:
+        assert respuesta.status_code == 200
+        assert respuesta.get_data(as_text=True) == csv_recalculado(esperado), f"/descargar/{cat_id} después de {contexto}"
+    else:
+        assert respuesta.status_code == 404
+
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_rutas_coinciden_con_recalcular(app_modulo, semilla):
+    azar = random.Random(semilla)
+    cliente = app_modulo.app.test_client()
+    categorias = app_modulo.categorias_sinteticas
+
+    for cat_id in categorias:
+        comprobar(app_modulo, cliente, cat_id, "la carga")
+
+    for n in range(1, 201):
+        cat_id = azar.choice(categorias)
+        ruta, respuesta = mutar(cliente, app_modulo.principal.datos[cat_id], cat_id, azar)
+        assert respuesta.status_code < 400, f"{ruta}: {respuesta.get_data(as_text=True)}"
+        comprobar(app_modulo, cliente, cat_id, f"la mutación {n} ({ruta})")
+
+
+def test_indice_con_empates_y_bajas():
+    """Directo sobre Categoria: empates de puntaje, BW 0 y bajas conservan el desempate por planilla"""
+    from participantes import Categoria
+
+    config = {"sexo": "M", "formula": "fuerza_relativa", "movimientos": MOVIMIENTOS}
+    azar = random.Random(3)
+    registros = [{"Nombre": f"Atleta {i}", "BW": azar.choice([0, 60, 80]), "col_7": azar.choice([0, 100])}
+                 for i in range(30)]
+    cat = Categoria.desde_registros("empates", config, registros)
+
+    for _ in range(300):
+        p = azar.choice(cat.participantes)
+        if azar.random() < 0.05 and len(cat) > 5:
+            cat.aplicar({"op": "del", "id": p.id})
+        else:
+            cat.aplicar({"op": "set", "id": p.id, "campos": {
+                azar.choice(["col_7", "col_11", "BW"]): azar.choice([0, 60, 80, 100])}})
+
+        esperado = sorted(cat.participantes, key=cat.fuerza_relativa, reverse=True)
+        assert [p.id for _, p, _ in cat.ranking] == [p.id for p in esperado]
+        assert [puntaje for _, _, puntaje in cat.ranking] == [cat.fuerza_relativa(p) for p in esperado]
+
+
+def test_cambio_sin_diario_no_se_ve(app_modulo, monkeypatch):
+    """El diario se escribe antes de tocar la memoria: si falla, nadie llega a ver el cambio"""
+    cliente = app_modulo.app.test_client()
+    cat_id = app_modulo.categorias_sinteticas[0]
+    cat = app_modulo.principal.datos[cat_id]
+    p = cat.participantes[0]
+    bw, version = p.bw, cat.version
+    antes = cliente.get(f"/ranking/{cat_id}").get_json()
+    vistos = []
+
+    def registrar(registro):
+        # Una lectura mientras se espera el fsync ve el estado anterior
+        vistos.append(cliente.get(f"/ranking/{cat_id}").get_json())
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(app_modulo.principal.diario, "registrar", registrar)
+    respuesta = cliente.post("/editar_bw", json={"cat_id": cat_id, "id": p.id, "bw": bw + 10})
+    assert respuesta.status_code == 503
+    operaciones = [{"tipo": "editar_bw", "cat_id": cat_id, "id": p.id, "bw": bw + 20},
+                   {"tipo": "actualizar_peso", "cat_id": cat_id, "id": p.id,
+                    "mov_id": next(iter(MOVIMIENTOS)), "intento": 2, "peso": 150}]
+    assert cliente.post("/lote", json={"operaciones": operaciones}).status_code == 503
+
+    assert vistos == [antes, antes]
+    assert (p.bw, cat.version) == (bw, version)
+    assert cliente.get(f"/ranking/{cat_id}").get_json() == antes
+
+    monkeypatch.undo()
+    respuesta = cliente.post("/lote", json={"operaciones": operaciones}).get_json()
+    assert respuesta["status"] == "exito"
+    assert [r["version"] for r in respuesta["resultados"]] == [p.version - 1, p.version]
+    assert p.bw == bw + 20